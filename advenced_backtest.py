@@ -5,99 +5,145 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from data.fetch_binance import fetch_binance_ohlcv
-from strategies.rsi_strategy import compute_rsi_signal
-from strategies.sma_crossover import compute_sma_crossover_signal
-from db import supabase, get_strategies
+from strategies.rsi_strategy import compute_rsi_signal, rsi_signal_from_value
+from strategies.sma_crossover import compute_sma_crossover_signal, sma_crossover_signal_from_values
+from feature_cache import feature_cache, compute_feature, closes_from_ohlcv
+from db import get_client, update_strategy_performances
+from strategy_generator import load_strategy_variants
+from backtest_cache import get_backtest_cache, make_key, data_fingerprint
+from trade_log import TradeLog, LONG, SHORT
+from results_store import get_results_store
+from monte_carlo import run_monte_carlo
+from chunked_backtest import StreamingFeatures, EquityStats
+from data.candle_store import CandleStore, get_candle_store
 import json
 
-class AdvancedBacktester:
-    def __init__(self, initial_balance=10000, fee_rate=0.001, slippage=0.001):
-        self.initial_balance = initial_balance
-        self.fee_rate = fee_rate
-        self.slippage = slippage
-        
-        # Performans metrikleri
-        self.trades = []
-        self.portfolio_values = []
-        self.drawdowns = []
-        
-    def backtest_strategy(self, 
-                         strategy: Dict[str, Any], 
-                         symbol: str = "BTC/USDT", 
-                         timeframe: str = "1h", 
-                         lookback_days: int = 90) -> Dict[str, Any]:
-        """Gelişmiş backtest gerçekleştir"""
-        
-        print(f"[BACKTEST] {strategy['name']} stratejisi test ediliyor...")
-        print(f"[PARAMS] Symbol: {symbol}, Timeframe: {timeframe}, Days: {lookback_days}")
-        
-        # Veri çek
-        ohlcv = fetch_binance_ohlcv(symbol, timeframe, limit=lookback_days*24)
-        if not ohlcv or len(ohlcv) < 100:
-            return {"error": "Yetersiz veri"}
-        
-        df = pd.DataFrame(ohlcv)
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        
-        # Backtest değişkenleri
-        balance = self.initial_balance
-        position = None  # None, 'long', 'short'
-        position_size = 0
-        entry_price = 0
-        peak_balance = self.initial_balance
-        
-        # Performans tracking
-        trades = []
-        daily_returns = []
-        portfolio_values = [self.initial_balance]
-        
-        strategy_params = strategy.get('parameters', {})
-        
-        # Her veri noktası için döngü
-        for i in range(50, len(df)):  # İlk 50 veri teknik indikatörler için
-            current_data = df.iloc[:i+1].to_dict(orient='records')
-            current_price = df.iloc[i]['close']
-            current_time = df.iloc[i]['timestamp']
+# Backtest mantığı sonuçları değiştirecek şekilde değiştiğinde artırılır (cache anahtarının parçası)
+ENGINE_VERSION = 4
+
+# Hiç işlem yapılmayan backtestlerin metrikleri
+EMPTY_METRICS = {
+    'win_rate': 0,
+    'profit_factor': 0,
+    'sharpe_ratio': 0,
+    'max_drawdown': 0,
+    'max_drawdown_pct': 0,
+    'avg_trade_pnl': 0,
+    'avg_trade_return_pct': 0,
+    'avg_hold_time_hours': 0,
+    'volatility': 0,
+    'calmar_ratio': 0
+}
+
+class AbortRules:
+    """
+    Umutsuz varyantlarda backtest'i erken durdurma kuralları (hepsi opsiyonel).
+
+    max_drawdown_pct:  Zirveden düşüş bu yüzdeyi aşarsa dur (örn. 40)
+    min_equity_pct:    Portföy değeri başlangıcın bu yüzdesinin altına inerse dur (örn. 60)
+    min_trades:        min_trades_by_bar barı işlendiğinde en az bu kadar işlem yoksa dur
+    """
+
+    def __init__(self, max_drawdown_pct: Optional[float] = None, min_equity_pct: Optional[float] = None,
+                 min_trades: Optional[int] = None, min_trades_by_bar: Optional[int] = None):
+        self.max_drawdown_pct = max_drawdown_pct
+        self.min_equity_pct = min_equity_pct
+        self.min_trades = min_trades
+        self.min_trades_by_bar = min_trades_by_bar
+
+        # Döngüde None kontrolü yapmamak için eşikler önceden sayıya çevrilir
+        self._peak_factor = 1 - max_drawdown_pct / 100 if max_drawdown_pct is not None else -np.inf
+        self._equity_factor = min_equity_pct / 100 if min_equity_pct is not None else -np.inf
+        self._trade_check_bar = min_trades_by_bar if min_trades is not None and min_trades_by_bar else -1
+
+    def check(self, bars: int, value: float, peak: float, trade_count: int,
+              initial_balance: float) -> Optional[str]:
+        """İhlal edilen kuralın açıklaması, yoksa None"""
+        if value < peak * self._peak_factor:
+            return f"max_drawdown: zirveden %{(1 - value / peak) * 100:.1f} düşüş"
+        if value < initial_balance * self._equity_factor:
+            return f"min_equity: portföy başlangıcın %{value / initial_balance * 100:.1f}'i"
+        if bars == self._trade_check_bar and trade_count < self.min_trades:
+            return f"min_trades: {bars}. barda {trade_count} işlem (< {self.min_trades})"
+        return None
+
+class BacktestRun:
+    """
+    Bir backtest'in bar döngüsü durumu: bakiye, açık pozisyon, zirve ve işlemler.
+    advance() barları parça parça işleyebilir; durum parçalar arasında taşındığı
+    için seriyi tek seferde veya bloklar halinde işlemek aynı sonucu verir.
+    """
+
+    def __init__(self, backtester: "AdvancedBacktester", strategy: Dict[str, Any],
+                 abort_rules: Optional[AbortRules] = None):
+        self.backtester = backtester
+        self.strategy_name = strategy['name']
+        self.params = strategy.get('parameters', {})
+        self.abort_rules = abort_rules
+        
+        self.balance = backtester.initial_balance
+        self.position = None  # None, 'long', 'short'
+        self.position_size = 0
+        self.entry_price = 0
+        self.peak_balance = backtester.initial_balance
+        self.entry_i = 0
+        self.entry_time = 0
+        self.entry_indicator = None
+        
+        self.trades = TradeLog()
+        self.abort_reason = None
+        self.last_i = None
+        self.last_price = None
+
+    def advance(self, closes: np.ndarray, times_ms: np.ndarray, features: Dict[str, np.ndarray],
+                begin: int, end: int, offset: int = 0, portfolio_values: Optional[list] = None,
+                total_bars: Optional[int] = None) -> bool:
+        """
+        Global [begin, end) barlarını işle. Diziler global `offset` barından başlar
+        (SMA kesişimi için bir önceki bar da dizide olmalı). Her barın portföy değeri
+        portfolio_values'a eklenir. Erken durdurma kuralına takılırsa False döner.
+        """
+        bt = self.backtester
+        slippage, fee_rate = bt.slippage, bt.fee_rate
+        initial_balance = bt.initial_balance
+        abort_rules = self.abort_rules
+        trades = self.trades
+        values = portfolio_values if portfolio_values is not None else []
+        
+        balance, position, position_size = self.balance, self.position, self.position_size
+        entry_price, peak_balance = self.entry_price, self.peak_balance
+        entry_i, entry_time, entry_indicator = self.entry_i, self.entry_time, self.entry_indicator
+        last_i = end - 1
+        
+        for i in range(begin, end):
+            k = i - offset
+            current_price = closes[k]
             
             # Strateji sinyalini hesapla
-            signal, indicator_value = self._get_strategy_signal(
-                strategy['name'], current_data, strategy_params
-            )
+            signal, indicator_value = bt._signal_at(self.strategy_name, features, k, self.params)
             
             # Trade execution logic
             if signal == "buy" and position is None:
                 # Long pozisyon aç
                 position = "long"
                 position_size = (balance * 0.95) / current_price  # %95'ini kullan
-                entry_price = current_price * (1 + self.slippage)  # Slippage ekle
-                fee = position_size * entry_price * self.fee_rate
-                balance -= fee
-                
-                trade_record = {
-                    'entry_time': current_time,
-                    'entry_price': entry_price,
-                    'position_size': position_size,
-                    'side': 'long',
-                    'strategy': strategy['name'],
-                    'indicator_value': indicator_value
-                }
+                entry_price = current_price * (1 + slippage)  # Slippage ekle
+                fee = position_size * entry_price * fee_rate
+                balance -= fee + entry_price * position_size  # Teminat kapanışta geri eklenir
+                entry_i, entry_time = i, times_ms[k]
+                entry_indicator = indicator_value
                 
             elif signal == "sell" and position == "long":
                 # Long pozisyonu kapat
-                exit_price = current_price * (1 - self.slippage)
-                fee = position_size * exit_price * self.fee_rate
+                exit_price = current_price * (1 - slippage)
+                fee = position_size * exit_price * fee_rate
                 pnl = (exit_price - entry_price) * position_size - fee
                 balance += pnl + (entry_price * position_size)
                 
                 # Trade'i kaydet
-                trade_record.update({
-                    'exit_time': current_time,
-                    'exit_price': exit_price,
-                    'pnl': pnl,
-                    'return_pct': (pnl / (entry_price * position_size)) * 100,
-                    'hold_time': (current_time - trade_record['entry_time']).total_seconds() / 3600  # saat
-                })
-                trades.append(trade_record)
+                trades.append(entry_i, i, entry_time, times_ms[k], entry_price, exit_price,
+                              position_size, LONG, pnl, (pnl / (entry_price * position_size)) * 100,
+                              entry_indicator)
                 
                 position = None
                 position_size = 0
@@ -106,34 +152,22 @@ class AdvancedBacktester:
                 # Short pozisyon aç (eğer destekleniyorsa)
                 position = "short"
                 position_size = (balance * 0.95) / current_price
-                entry_price = current_price * (1 - self.slippage)
-                fee = position_size * entry_price * self.fee_rate
-                balance -= fee
-                
-                trade_record = {
-                    'entry_time': current_time,
-                    'entry_price': entry_price,
-                    'position_size': position_size,
-                    'side': 'short',
-                    'strategy': strategy['name'],
-                    'indicator_value': indicator_value
-                }
+                entry_price = current_price * (1 - slippage)
+                fee = position_size * entry_price * fee_rate
+                balance -= fee + entry_price * position_size  # Teminat kapanışta geri eklenir
+                entry_i, entry_time = i, times_ms[k]
+                entry_indicator = indicator_value
                 
             elif signal == "buy" and position == "short":
                 # Short pozisyonu kapat
-                exit_price = current_price * (1 + self.slippage)
-                fee = position_size * exit_price * self.fee_rate
+                exit_price = current_price * (1 + slippage)
+                fee = position_size * exit_price * fee_rate
                 pnl = (entry_price - exit_price) * position_size - fee
                 balance += pnl + (entry_price * position_size)
                 
-                trade_record.update({
-                    'exit_time': current_time,
-                    'exit_price': exit_price,
-                    'pnl': pnl,
-                    'return_pct': (pnl / (entry_price * position_size)) * 100,
-                    'hold_time': (current_time - trade_record['entry_time']).total_seconds() / 3600
-                })
-                trades.append(trade_record)
+                trades.append(entry_i, i, entry_time, times_ms[k], entry_price, exit_price,
+                              position_size, SHORT, pnl, (pnl / (entry_price * position_size)) * 100,
+                              entry_indicator)
                 
                 position = None
                 position_size = 0
@@ -146,23 +180,124 @@ class AdvancedBacktester:
             else:
                 portfolio_value = balance
                 
-            portfolio_values.append(portfolio_value)
+            values.append(portfolio_value)
             
             # Peak tracking (drawdown için)
             if portfolio_value > peak_balance:
                 peak_balance = portfolio_value
+            
+            # Erken durdurma kuralları
+            if abort_rules is not None:
+                abort_reason = abort_rules.check(i - 49, portfolio_value, peak_balance,
+                                                 len(trades), initial_balance)
+                if abort_reason:
+                    last_i = i
+                    self.abort_reason = abort_reason
+                    print(f"[ABORT] {self.strategy_name} {i - 49}/{total_bars}. barda durduruldu: {abort_reason}")
+                    break
+        
+        self.balance, self.position, self.position_size = balance, position, position_size
+        self.entry_price, self.peak_balance = entry_price, peak_balance
+        self.entry_i, self.entry_time, self.entry_indicator = entry_i, entry_time, entry_indicator
+        if end > begin:
+            self.last_i, self.last_price = last_i, closes[last_i - offset]
+        return self.abort_reason is None
+
+    def close_open_position(self):
+        """Son pozisyonu son işlenen barın fiyatından kapat (işlem kaydı tutulmaz)"""
+        if self.position is None:
+            return
+        slippage = self.backtester.slippage
+        if self.position == "long":
+            exit_price = self.last_price * (1 - slippage)
+            pnl = (exit_price - self.entry_price) * self.position_size
+        else:
+            exit_price = self.last_price * (1 + slippage)
+            pnl = (self.entry_price - exit_price) * self.position_size
+        self.balance += pnl + (self.entry_price * self.position_size)
+
+class AdvancedBacktester:
+    def __init__(self, initial_balance=10000, fee_rate=0.001, slippage=0.001, use_cache=True):
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.cache = get_backtest_cache() if use_cache else None
         
-        # Son pozisyonu kapat
-        if position is not None:
-            current_price = df.iloc[-1]['close']
-            if position == "long":
-                exit_price = current_price * (1 - self.slippage)
-                pnl = (exit_price - entry_price) * position_size
-                balance += pnl + (entry_price * position_size)
-            elif position == "short":
-                exit_price = current_price * (1 + self.slippage)
-                pnl = (entry_price - exit_price) * position_size
-                balance += pnl + (entry_price * position_size)
+        # Performans metrikleri
+        self.trades = []
+        self.portfolio_values = []
+        self.drawdowns = []
+        
+    def backtest_strategy(self, 
+                         strategy: Dict[str, Any], 
+                         symbol: str = "BTC/USDT", 
+                         timeframe: str = "1h", 
+                         lookback_days: int = 90,
+                         abort_rules: Optional[AbortRules] = None,
+                         ohlcv: Optional[List[Dict]] = None,
+                         max_bars: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Gelişmiş backtest gerçekleştir.
+        abort_rules verilirse kurallar her barda kontrol edilir; ihlalde döngü durur
+        ve 'aborted': True ile işaretli kısmi sonuç döner (DB'ye kaydedilmez).
+        max_bars ile sadece ilk max_bars bar işlenir (successive halving için).
+        """
+        
+        print(f"[BACKTEST] {strategy['name']} stratejisi test ediliyor...")
+        print(f"[PARAMS] Symbol: {symbol}, Timeframe: {timeframe}, Days: {lookback_days}")
+        
+        # Veri çek
+        if ohlcv is None:
+            ohlcv = fetch_binance_ohlcv(symbol, timeframe, limit=lookback_days*24)
+        if not ohlcv or len(ohlcv) < 100:
+            return {"error": "Yetersiz veri"}
+        
+        # Aynı girdilerle daha önce çalıştıysa sonucu cache'ten döndür
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_key(
+                engine=ENGINE_VERSION,
+                strategy=strategy['name'],
+                parameters=strategy.get('parameters', {}),
+                symbol=symbol,
+                timeframe=timeframe,
+                data=data_fingerprint(ohlcv),
+                initial_balance=self.initial_balance,
+                fee_rate=self.fee_rate,
+                slippage=self.slippage,
+                abort_rules=vars(abort_rules) if abort_rules is not None else None,
+                max_bars=max_bars
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"[CACHE] {strategy['name']} sonucu cache'ten alındı")
+                result = dict(cached, strategy_id=strategy.get('id'))
+                # Cache'ten dönen sonuç da DB'ye kaydedilir (aynı koşul, aynı kayıt)
+                if strategy.get('id') is not None and not result['partial']:
+                    self._save_backtest_result(result, result['trade_log'])
+                return result
+        
+        df = pd.DataFrame(ohlcv)
+        times_ms = df['timestamp'].to_numpy(dtype=np.int64)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        
+        strategy_params = strategy.get('parameters', {})
+        
+        # İndikatörler tüm seri için bir kez hesaplanır (bar i'deki değer, ilk i+1 barla
+        # hesaplanan değerle aynıdır); aynı periyodu kullanan varyantlar cache'i paylaşır
+        features = self._compute_features(strategy['name'], ohlcv, strategy_params,
+                                          cache_key=(symbol, timeframe))
+        closes = df['close'].to_numpy()
+        
+        end = len(df) if max_bars is None else min(len(df), 50 + max_bars)
+        
+        # Her veri noktası için döngü (İlk 50 veri teknik indikatörler için)
+        run = BacktestRun(self, strategy, abort_rules)
+        portfolio_values = [self.initial_balance]
+        run.advance(closes, times_ms, features, 50, end, portfolio_values=portfolio_values,
+                    total_bars=len(df) - 50)
+        run.close_open_position()
+        balance, trades, last_i, abort_reason = run.balance, run.trades, run.last_i, run.abort_reason
         
         # Performans metriklerini hesapla
         metrics = self._calculate_performance_metrics(trades, portfolio_values, df)
@@ -174,18 +309,130 @@ class AdvancedBacktester:
             'symbol': symbol,
             'timeframe': timeframe,
             'start_date': df.iloc[50]['timestamp'].isoformat(),
-            'end_date': df.iloc[-1]['timestamp'].isoformat(),
+            'end_date': df['timestamp'].iloc[last_i].isoformat(),
+            'initial_balance': self.initial_balance,
+            'final_balance': balance,
+            'total_return': balance - self.initial_balance,
+            'total_return_pct': ((balance - self.initial_balance) / self.initial_balance) * 100,
+            'total_trades': len(trades),
+            'parameters': strategy_params,
+            'aborted': abort_reason is not None,
+            'abort_reason': abort_reason,
+            'partial': last_i < len(df) - 1,
+            'bars_processed': last_i - 49,
+            'total_bars': len(df) - 50,
+            'trade_log': trades,
+            **metrics
+        }
+        
+        # Veritabanına kaydet (yerel grid varyantlarının ve kısmi sonuçların DB kaydı yok)
+        if strategy.get('id') is not None and not result['partial']:
+            self._save_backtest_result(result, trades)
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, result)
+        
+        return result
+    
+    def backtest_strategy_chunked(self,
+                                  strategy: Dict[str, Any],
+                                  symbol: str = "BTC/USDT",
+                                  timeframe: str = "1m",
+                                  chunk_size: int = 100_000,
+                                  start_ts: Optional[int] = None,
+                                  end_ts: Optional[int] = None,
+                                  abort_rules: Optional[AbortRules] = None,
+                                  max_bars: Optional[int] = None,
+                                  store: Optional[CandleStore] = None) -> Dict[str, Any]:
+        """
+        Yerel mum deposundaki geçmişi chunk_size'lık bloklar halinde backtest et
+        (yıllarca 1 dakikalık veri gibi belleğe sığmayan seriler için).
+        İndikatör durumları ve açık pozisyon bloklar arasında taşınır; işlemler ve
+        bakiye, aynı mumlarla backtest_strategy'nin sonucuyla bire bir aynıdır.
+        Bellekte aynı anda tek blok ve işlem kaydı bulunur; portföy serisi yerine
+        akış istatistikleri tutulur. Sonuç cache'lenmez.
+        """
+        store = store or get_candle_store()
+        total = store.count(symbol, timeframe, start_ts, end_ts)
+        
+        print(f"[BACKTEST] {strategy['name']} stratejisi test ediliyor (blok: {chunk_size} bar)...")
+        print(f"[PARAMS] Symbol: {symbol}, Timeframe: {timeframe}, Bars: {total}")
+        
+        if total < 100:
+            return {"error": "Yetersiz veri"}
+        
+        strategy_params = strategy.get('parameters', {})
+        feature_stream = StreamingFeatures(strategy['name'], strategy_params)
+        run = BacktestRun(self, strategy, abort_rules)
+        equity = EquityStats(self.initial_balance)
+        
+        end = total if max_bars is None else min(total, 50 + max_bars)
+        start_time = end_time = None
+        chunk_start = 0
+        chunks = 0
+        previous = None  # Önceki bloğun son barı: SMA kesişimi bir önceki barın değerine bakar
+        
+        for chunk in store.iter_chunks(symbol, timeframe, chunk_size, start_ts, end_ts):
+            closes, times_ms = chunk['close'], chunk['timestamp']
+            chunk_end = chunk_start + len(closes)
+            features = feature_stream.update(closes)
+            chunks += 1
+            if chunk_start <= 50 < chunk_end:
+                start_time = times_ms[50 - chunk_start]
+            
+            offset = chunk_start
+            last_bar = (closes[-1], times_ms[-1], {name: values[-1] for name, values in features.items()})
+            if previous is not None:
+                offset -= 1
+                closes = np.concatenate(([previous[0]], closes))
+                times_ms = np.concatenate(([previous[1]], times_ms))
+                features = {name: np.concatenate(([previous[2][name]], values))
+                            for name, values in features.items()}
+            previous = last_bar
+            
+            begin, stop = max(chunk_start, 50), min(chunk_end, end)
+            if begin < stop:
+                portfolio_values = []
+                completed = run.advance(closes, times_ms, features, begin, stop, offset=offset,
+                                        portfolio_values=portfolio_values, total_bars=total - 50)
+                equity.update(portfolio_values)
+                end_time = times_ms[run.last_i - offset]
+                if not completed:
+                    break
+            
+            chunk_start = chunk_end
+            if chunk_start >= end:
+                break
+        
+        run.close_open_position()
+        balance, trades, last_i, abort_reason = run.balance, run.trades, run.last_i, run.abort_reason
+        metrics = self._with_trade_metrics(trades, equity.metrics()) if trades else dict(EMPTY_METRICS)
+        
+        result = {
+            'strategy_id': strategy.get('id'),
+            'strategy_name': strategy['name'],
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'start_date': pd.Timestamp(int(start_time), unit='ms').isoformat(),
+            'end_date': pd.Timestamp(int(end_time), unit='ms').isoformat(),
             'initial_balance': self.initial_balance,
             'final_balance': balance,
             'total_return': balance - self.initial_balance,
             'total_return_pct': ((balance - self.initial_balance) / self.initial_balance) * 100,
             'total_trades': len(trades),
             'parameters': strategy_params,
+            'aborted': abort_reason is not None,
+            'abort_reason': abort_reason,
+            'partial': last_i < total - 1,
+            'bars_processed': last_i - 49,
+            'total_bars': total - 50,
+            'chunks': chunks,
+            'trade_log': trades,
             **metrics
         }
         
-        # Veritabanına kaydet
-        self._save_backtest_result(result, trades)
+        if strategy.get('id') is not None and not result['partial']:
+            self._save_backtest_result(result, trades)
         
         return result
     
@@ -208,34 +455,37 @@ class AdvancedBacktester:
         except Exception as e:
             return "hold", None
     
-    def _calculate_performance_metrics(self, trades: List[Dict], portfolio_values: List[float], df: pd.DataFrame) -> Dict:
-        """Performans metriklerini hesapla"""
-        if not trades:
+    def _compute_features(self, strategy_name: str, ohlcv: List[Dict], params: Dict,
+                          cache_key: Optional[tuple] = None) -> Dict[str, np.ndarray]:
+        """Strateji için gereken indikatör serilerini tüm veri üzerinde bir kez hesapla"""
+        def feature(indicator, **feature_params):
+            if cache_key:
+                return feature_cache.get(*cache_key, indicator, ohlcv, **feature_params)
+            return compute_feature(indicator, closes_from_ohlcv(ohlcv), **feature_params)
+        
+        if "RSI" in strategy_name:
+            return {"rsi": feature("rsi", period=params.get('rsi_period', 14))}
+        elif "SMA" in strategy_name:
             return {
-                'win_rate': 0,
-                'profit_factor': 0,
-                'sharpe_ratio': 0,
-                'max_drawdown': 0,
-                'max_drawdown_pct': 0,
-                'avg_trade_pnl': 0,
-                'avg_trade_return_pct': 0,
-                'avg_hold_time_hours': 0,
-                'volatility': 0,
-                'calmar_ratio': 0
+                "sma_short": feature("sma", period=params.get('short_period', 10)),
+                "sma_long": feature("sma", period=params.get('long_period', 50))
             }
-        
-        trade_pnls = [t['pnl'] for t in trades]
-        trade_returns = [t['return_pct'] for t in trades]
-        
-        # Win rate
-        winning_trades = [pnl for pnl in trade_pnls if pnl > 0]
-        losing_trades = [pnl for pnl in trade_pnls if pnl <= 0]
-        win_rate = len(winning_trades) / len(trades) if trades else 0
-        
-        # Profit factor
-        gross_profit = sum(winning_trades) if winning_trades else 0
-        gross_loss = abs(sum(losing_trades)) if losing_trades else 1
-        profit_factor = gross_profit / gross_loss if gross_loss > 0 else 0
+        return {}
+    
+    def _signal_at(self, strategy_name: str, features: Dict[str, np.ndarray], i: int, params: Dict) -> tuple:
+        """Önceden hesaplanmış serilerden bar i'nin sinyali"""
+        if "rsi" in features:
+            return rsi_signal_from_value(features["rsi"][i], params.get('overbought', 70),
+                                         params.get('oversold', 30))
+        elif "sma_short" in features and i >= 1:
+            short, long = features["sma_short"], features["sma_long"]
+            return sma_crossover_signal_from_values(short[i-1], long[i-1], short[i], long[i])
+        return "hold", None
+    
+    def _calculate_performance_metrics(self, trades: TradeLog, portfolio_values: List[float], df: pd.DataFrame) -> Dict:
+        """Performans metriklerini hesapla"""
+        if not trades:
+            return dict(EMPTY_METRICS)
         
         # Drawdown hesaplama
         peak = portfolio_values[0]
@@ -272,22 +522,45 @@ class AdvancedBacktester:
         annual_return = ((portfolio_values[-1] / portfolio_values[0]) ** (252 / len(portfolio_values))) - 1
         calmar_ratio = annual_return / (max_drawdown_pct / 100) if max_drawdown_pct > 0 else 0
         
-        return {
-            'win_rate': win_rate,
-            'profit_factor': profit_factor,
+        return self._with_trade_metrics(trades, {
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': max_drawdown,
             'max_drawdown_pct': max_drawdown_pct,
+            'volatility': std_return * np.sqrt(252),  # Yıllık volatilite
+            'calmar_ratio': calmar_ratio
+        })
+    
+    def _with_trade_metrics(self, trades: TradeLog, equity_metrics: Dict) -> Dict:
+        """İşlem bazlı metrikleri portföy serisi metrikleriyle birleştir"""
+        trade_pnls = trades['pnl']
+        trade_returns = trades['return_pct']
+        
+        # Win rate
+        winning_trades = trade_pnls[trade_pnls > 0]
+        losing_trades = trade_pnls[trade_pnls <= 0]
+        win_rate = len(winning_trades) / len(trades)
+        
+        # Profit factor
+        gross_profit = winning_trades.sum() if len(winning_trades) else 0
+        gross_loss = abs(losing_trades.sum()) if len(losing_trades) else 1
+        profit_factor = gross_profit / gross_loss if gross_loss > 0 else 0
+        
+        return {
+            'win_rate': win_rate,
+            'profit_factor': profit_factor,
+            'sharpe_ratio': equity_metrics['sharpe_ratio'],
+            'max_drawdown': equity_metrics['max_drawdown'],
+            'max_drawdown_pct': equity_metrics['max_drawdown_pct'],
             'avg_trade_pnl': np.mean(trade_pnls),
             'avg_trade_return_pct': np.mean(trade_returns),
-            'avg_hold_time_hours': np.mean([t['hold_time'] for t in trades]),
-            'volatility': std_return * np.sqrt(252),  # Yıllık volatilite
-            'calmar_ratio': calmar_ratio,
-            'total_fees': sum([abs(t['pnl']) * self.fee_rate for t in trades])
+            'avg_hold_time_hours': np.mean(trades.hold_time_hours),
+            'volatility': equity_metrics['volatility'],
+            'calmar_ratio': equity_metrics['calmar_ratio'],
+            'total_fees': np.abs(trade_pnls).sum() * self.fee_rate
         }
     
-    def _save_backtest_result(self, result: Dict, trades: List[Dict]):
-        """Backtest sonucunu veritabanına kaydet"""
+    def _save_backtest_result(self, result: Dict, trades: TradeLog):
+        """Backtest sonucunu veritabanına kaydet (trade_log: TradeLog.to_base64, sıkıştırılmış)"""
         try:
             # Ana result'ı kaydet
             backtest_data = {
@@ -304,15 +577,83 @@ class AdvancedBacktester:
                 'total_trades': result['total_trades'],
                 'profit_factor': result['profit_factor'],
                 'parameters': result['parameters'],
-                'trade_log': trades
+                'trade_log': trades.to_base64()
             }
             
-            supabase.table("backtest_results").insert(backtest_data).execute()
+            get_client().table("backtest_results").insert(backtest_data).execute()
             print(f"[BACKTEST] Sonuç veritabanına kaydedildi: {result['strategy_name']}")
             
         except Exception as e:
             print(f"[BACKTEST ERROR] Sonuç kaydedilemedi: {e}")
     
+    def successive_halving(self, strategies: List[Dict], symbol: str = "BTC/USDT",
+                           timeframe: str = "1h", lookback_days: int = 90,
+                           rungs: tuple = (0.25, 0.5, 1.0), keep_ratio: float = 0.5,
+                           abort_rules: Optional[AbortRules] = None) -> List[Dict[str, Any]]:
+        """
+        Varyantları önce verinin küçük bir kısmında çalıştır, her aşamada en iyi
+        keep_ratio kadarını bir sonraki (daha uzun) aşamaya taşı. Kurallara takılan
+        varyantlar elenir; tam veriyi sadece umut vadeden varyantlar görür.
+        """
+        ohlcv = fetch_binance_ohlcv(symbol, timeframe, limit=lookback_days*24)
+        if not ohlcv or len(ohlcv) < 100:
+            return []
+        
+        total_bars = len(ohlcv) - 50
+        candidates = list(strategies)
+        results = []
+        
+        for rung, fraction in enumerate(rungs):
+            max_bars = max(1, int(total_bars * fraction))
+            results = []
+            for strategy in candidates:
+                result = self.backtest_strategy(strategy, symbol, timeframe, lookback_days,
+                                                abort_rules=abort_rules, ohlcv=ohlcv, max_bars=max_bars)
+                if 'error' not in result and not result['aborted']:
+                    results.append((strategy, result))
+            
+            results.sort(key=lambda x: x[1]['total_return_pct'], reverse=True)
+            print(f"[HALVING] Aşama {rung+1}/{len(rungs)} ({max_bars} bar): "
+                  f"{len(candidates)} varyant, {len(candidates) - len(results)} elendi")
+            
+            if rung < len(rungs) - 1:
+                keep = max(1, int(np.ceil(len(results) * keep_ratio)))
+                candidates = [strategy for strategy, _ in results[:keep]]
+        
+        return [result for _, result in results]
+    
+    def combinatorial_cv(self, strategies: List[Dict], symbol: str = "BTC/USDT",
+                         timeframe: str = "1h", lookback_days: int = 90, n_groups: int = 6,
+                         n_test_groups: int = 2, purge: int = 50,
+                         embargo: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Varyantlar arasında purged combinatorial CV: her bölmede eğitimde en iyi
+        varyant seçilir, test sonucu raporlanır (bkz. cross_validation.py)
+        """
+        from cross_validation import combinatorial_purged_cv, strategy_returns_matrix
+        from scheduler import interval_to_seconds
+        
+        ohlcv = fetch_binance_ohlcv(symbol, timeframe, limit=lookback_days*24)
+        if not ohlcv or len(ohlcv) < 100:
+            return {"error": "Yetersiz veri"}
+        
+        names, returns = strategy_returns_matrix(strategies, closes_from_ohlcv(ohlcv), self.fee_rate)
+        if not names:
+            return {"error": "Değerlendirilebilir strateji yok"}
+        
+        result = combinatorial_purged_cv(
+            returns, names, n_groups=n_groups, n_test_groups=n_test_groups, purge=purge,
+            embargo=embargo, start=50,
+            periods_per_year=365 * 24 * 3600 / interval_to_seconds(timeframe)
+        )
+        
+        pbo = f"{result['pbo']:.2f}" if result['pbo'] is not None else "-"
+        print(f"[CPCV] {len(names)} varyant, {result['n_splits']} bölme "
+              f"(purge: {purge}, embargo: {result['embargo']} bar) | "
+              f"OOS Sharpe: {result['oos_sharpe_mean']:.2f} ± {result['oos_sharpe_std']:.2f} | "
+              f"OOS getiri: {result['oos_return_mean_pct']:+.2f}% | PBO: {pbo}")
+        return result
+    
     def walk_forward_analysis(self, strategy: Dict, symbol: str = "BTC/USDT", 
                              train_days: int = 30, test_days: int = 7, 
                              total_periods: int = 12) -> Dict[str, Any]:
@@ -364,8 +705,14 @@ class AdvancedBacktester:
         }
     
     def monte_carlo_simulation(self, strategy: Dict, symbol: str = "BTC/USDT", 
-                              simulations: int = 1000) -> Dict[str, Any]:
-        """Monte Carlo simulasyonu"""
+                              simulations: int = 1000, seed: Optional[int] = None,
+                              n_jobs: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Monte Carlo simulasyonu: getiriler bootstrap ile yeniden örneklenir, her
+        sentetik fiyat yolunda strateji hızlı backtest'ten geçer. Simülasyonlar
+        n_jobs süreçte bloklar halinde çalışır (bkz. monte_carlo.run_monte_carlo);
+        aynı seed süreç sayısından bağımsız olarak aynı sonucu verir.
+        """
         print(f"[MONTE CARLO] {simulations} simulasyon çalıştırılıyor...")
         
         # Önce gerçek backtest yap
@@ -375,88 +722,27 @@ class AdvancedBacktester:
         
         # Veriyi al
         ohlcv = fetch_binance_ohlcv(symbol, "1h", limit=2000)
-        df = pd.DataFrame(ohlcv)
-        
-        # Returns hesapla
-        df['returns'] = df['close'].pct_change().dropna()
-        daily_returns = df['returns'].dropna().values
-        
-        simulation_results = []
-        
-        for i in range(simulations):
-            # Returns'ları shuffle et
-            shuffled_returns = np.random.choice(daily_returns, size=len(daily_returns), replace=True)
-            
-            # Yeni fiyat serisi oluştur
-            synthetic_prices = [df['close'].iloc[0]]
-            for ret in shuffled_returns:
-                new_price = synthetic_prices[-1] * (1 + ret)
-                synthetic_prices.append(new_price)
-            
-            # Synthetic data ile backtest
-            synthetic_ohlcv = []
-            for j, price in enumerate(synthetic_prices[1:]):
-                synthetic_ohlcv.append({
-                    'timestamp': df['timestamp'].iloc[j] if j < len(df) else df['timestamp'].iloc[-1],
-                    'open': synthetic_prices[j],
-                    'high': max(synthetic_prices[j], price),
-                    'low': min(synthetic_prices[j], price),
-                    'close': price,
-                    'volume': df['volume'].iloc[j] if j < len(df) else df['volume'].iloc[-1]
-                })
-            
-            # Mini backtest
-            sim_result = self._mini_backtest(strategy, synthetic_ohlcv)
-            simulation_results.append(sim_result['total_return_pct'])
+        closes = closes_from_ohlcv(ohlcv)
+        returns = np.diff(closes) / closes[:-1]
         
-        # Sonuçları analiz et
-        sorted_returns = sorted(simulation_results)
+        result = run_monte_carlo(returns, closes[0], strategy, simulations, seed=seed, n_jobs=n_jobs)
+        print(f"[MONTE CARLO] {result['n_jobs']} süreç | VaR 95: {result['var_95']:.2f}% | "
+              f"VaR 99: {result['var_99']:.2f}%")
         
         return {
             'strategy_name': strategy['name'],
-            'simulations': simulations,
-            'mean_return': np.mean(simulation_results),
-            'std_return': np.std(simulation_results),
-            'var_95': np.percentile(sorted_returns, 5),  # %95 VaR
-            'var_99': np.percentile(sorted_returns, 1),  # %99 VaR
-            'max_return': max(simulation_results),
-            'min_return': min(simulation_results),
-            'positive_scenarios': len([r for r in simulation_results if r > 0]) / len(simulation_results),
+            **result,
             'actual_return': base_result['total_return_pct']
         }
-    
-    def _mini_backtest(self, strategy: Dict, ohlcv_data: List[Dict]) -> Dict:
-        """Monte Carlo için hızlı backtest"""
-        balance = self.initial_balance
-        position = None
-        entry_price = 0
-        
-        strategy_params = strategy.get('parameters', {})
-        
-        for i in range(50, len(ohlcv_data)):
-            current_data = ohlcv_data[:i+1]
-            current_price = ohlcv_data[i]['close']
-            
-            signal, _ = self._get_strategy_signal(strategy['name'], current_data, strategy_params)
-            
-            if signal == "buy" and position is None:
-                position = "long"
-                entry_price = current_price
-            elif signal == "sell" and position == "long":
-                balance += (current_price - entry_price) / entry_price * balance * 0.95
-                position = None
-        
-        return {
-            'final_balance': balance,
-            'total_return_pct': ((balance - self.initial_balance) / self.initial_balance) * 100
-        }
 
-def run_comprehensive_backtest(strategy_name: str = None):
-    """Kapsamlı backtest çalıştır"""
+def run_comprehensive_backtest(strategy_name: str = None, abort_rules: Optional[AbortRules] = None):
+    """Kapsamlı backtest çalıştır (kurallara takılan varyantlar için WF/MC atlanır)"""
     backtester = AdvancedBacktester()
+    store = get_results_store()
+    store.start_run("backtest", note=strategy_name)
     
-    # Stratejileri al
-    strategies = get_strategies()
+    # Stratejileri al (DB yoksa yerel parametre gridi ile offline çalışır)
+    strategies = load_strategy_variants()
     if strategy_name:
         strategies = [s for s in strategies if strategy_name.lower() in s['name'].lower()]
     
@@ -467,17 +753,36 @@ def run_comprehensive_backtest(strategy_name: str = None):
         print(f"[COMPREHENSIVE] {strategy['name']} stratejisi test ediliyor...")
         
         # 1. Normal backtest
-        normal_result = backtester.backtest_strategy(strategy)
-        if 'error' not in normal_result:
+        normal_result = backtester.backtest_strategy(strategy, abort_rules=abort_rules)
+        if 'error' not in normal_result and not normal_result['aborted']:
             all_results.append(normal_result)
+            store.record("backtest", normal_result, strategy)
             
             # 2. Walk-forward analizi
             wf_result = backtester.walk_forward_analysis(strategy)
             print(f"[WF] Consistency Score: {wf_result['consistency_score']:.2f}")
+            store.record("walk_forward", wf_result, strategy, symbol="BTC/USDT", timeframe="1h")
             
             # 3. Monte Carlo (daha az simulasyon)
             mc_result = backtester.monte_carlo_simulation(strategy, simulations=100)
             print(f"[MC] VaR 95%: {mc_result['var_95']:.2f}%")
+            store.record("monte_carlo", mc_result, strategy, symbol="BTC/USDT", timeframe="1h")
+    
+    # Varyant seçiminin örneklem dışı tutarlılığı
+    if len(strategies) > 1:
+        backtester.combinatorial_cv(strategies)
+    
+    # DB'deki stratejilerin performance_score'u tek toplu istekle güncellenir
+    scores = [
+        {"id": r['strategy_id'], "name": r['strategy_name'],
+         "performance_score": r.get('sharpe_ratio', 0) * r.get('total_return_pct', 0)}
+        for r in all_results if r.get('strategy_id') is not None
+    ]
+    if scores:
+        try:
+            update_strategy_performances(scores)
+        except Exception as e:
+            print(f"[BACKTEST ERROR] Performans skorları güncellenemedi: {e}")
     
     # En iyi stratejileri listele
     if all_results:
@@ -0,0 +1,129 @@
+# agents/background_writer.py
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+class BackgroundWriter:
+    """
+    Karar yolunu bekletmemesi gereken yazma işlemleri (audit log, DB insert vb.)
+    için arka plan kuyruğu. submit() hemen döner; kayıtlar ayrı bir thread'de
+    toplu halde write_batch fonksiyonuna verilir.
+    """
+
+    _instances: List["BackgroundWriter"] = []
+
+    def __init__(self, name: str, write_batch: Callable[[List[Any]], None],
+                 max_queue: int = 10000, batch_size: int = 100, flush_interval: float = 1.0,
+                 linger: float = 0.0, urgent: Optional[Callable[[Any], bool]] = None):
+        self.name = name
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.linger = linger  # İlk kayıttan sonra partiyi doldurmak için bekleme süresi
+        self.urgent = urgent  # True dönen bir kayıt partiye girince linger beklenmez
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._flushing = threading.Event()  # flush sırasında linger beklenmez
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+
+        BackgroundWriter._instances.append(self)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=f"writer-{self.name}", daemon=True)
+                self._thread.start()
+
+    def submit(self, item: Any) -> bool:
+        """Kaydı kuyruğa ekle (bloklamaz). Kuyruk doluysa kayıt düşürülür."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._drain(timeout=self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def _drain(self, timeout: float) -> List[Any]:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.linger
+        urgent = self.urgent is not None and self.urgent(batch[0])
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            hurry = urgent or self._stop.is_set() or self._flushing.is_set()
+            try:
+                if remaining > 0 and not hurry:
+                    item = self._queue.get(timeout=min(remaining, 0.1))
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                if remaining <= 0 or hurry:
+                    break
+                continue
+            batch.append(item)
+            urgent = urgent or (self.urgent is not None and self.urgent(item))
+        return batch
+
+    def _write(self, batch: List[Any]):
+        try:
+            self.write_batch(batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.errors += 1
+            print(f"[WRITER ERROR] {self.name}: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Kuyruktaki tüm kayıtlar yazılana kadar bekle"""
+        if self._thread is None:
+            return True
+        self._flushing.set()
+        try:
+            deadline = time.monotonic() + timeout
+            while self._queue.unfinished_tasks and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return self._queue.unfinished_tasks == 0
+        finally:
+            self._flushing.clear()
+
+    def close(self, timeout: float = 10.0):
+        """Kalan kayıtları yaz ve thread'i durdur"""
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @classmethod
+    def flush_all(cls, timeout: float = 10.0):
+        """Tüm arka plan yazıcılarını boşalt (kapanışta çağrılır)"""
+        for writer in list(cls._instances):
+            writer.close(timeout)
+
+atexit.register(BackgroundWriter.flush_all)
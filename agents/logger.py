@@ -2,17 +2,112 @@
 import csv
 import os
 from datetime import datetime
+from typing import Any, List, Optional
+from agents.background_writer import BackgroundWriter
 
-LOG_FILE = "logs/decisions.csv"
+LOG_DIR = "logs"
+LOG_FILE = "logs/decisions.csv"  # Eski tek dosyalık log (sadece okuma için)
 
-os.makedirs("logs", exist_ok=True)
+HEADER = ["timestamp", "strategy", "signal", "price", "notes"]
+
+class DecisionLogger:
+    """
+    Tamponlu karar logu.
+
+    Satırlar bellekte biriktirilir ve boyut (batch_size) ya da süre
+    (flush_interval) dolunca arka planda tek seferde yazılır.
+    Dosyalar güne ve boyuta göre döner:
+        csv:     logs/decisions-2025-08-10.csv, logs/decisions-2025-08-10.1.csv, ...
+        parquet: logs/decisions/date=2025-08-10/part-<zaman>.parquet (zstd sıkıştırmalı)
+    """
+
+    def __init__(self, directory: str = LOG_DIR, fmt: str = "csv",
+                 batch_size: int = 1000, flush_interval: float = 5.0,
+                 max_file_bytes: int = 50 * 1024 * 1024):
+        self.directory = directory
+        self.format = fmt
+        self.max_file_bytes = max_file_bytes
+
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print("[LOG] pyarrow yüklü değil, CSV formatına geçiliyor")
+                self.format = "csv"
+        elif fmt != "csv":
+            raise ValueError(f"Geçersiz log formatı: {fmt}")
+
+        os.makedirs(directory, exist_ok=True)
+        self._segment = 0
+        self.writer = BackgroundWriter("decisions", self._write_rows, batch_size=batch_size,
+                                       linger=flush_interval)
+
+    def log(self, strategy, signal, price, notes=""):
+        """Satırı tampona ekle (bloklamaz)"""
+        self.writer.submit([datetime.now().isoformat(), strategy, signal, price, notes])
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        return self.writer.flush(timeout)
+
+    # --- Yazma (arka plan thread'i) ---
+
+    def _write_rows(self, rows: List[List[Any]]):
+        # Gün değişimi parti içinde olabilir, satırları güne göre ayır
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row[0][:10], []).append(row)
+
+        for day, day_rows in by_day.items():
+            if self.format == "parquet":
+                self._write_parquet(day, day_rows)
+            else:
+                self._write_csv(day, day_rows)
+
+    def _csv_path(self, day: str) -> str:
+        """Günün boyut sınırını aşmamış son CSV dosyası"""
+        index = 0
+        while True:
+            suffix = f".{index}" if index else ""
+            path = os.path.join(self.directory, f"decisions-{day}{suffix}.csv")
+            if not os.path.exists(path) or os.path.getsize(path) < self.max_file_bytes:
+                return path
+            index += 1
+
+    def _write_csv(self, day: str, rows: List[List[Any]]):
+        path = self._csv_path(day)
+        file_exists = os.path.exists(path)
+        with open(path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(HEADER)
+            writer.writerows(rows)
+
+    def _write_parquet(self, day: str, rows: List[List[Any]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = list(zip(*rows))
+        table = pa.table({
+            "timestamp": pa.array(columns[0], pa.string()).cast(pa.timestamp("us")),
+            "strategy": pa.array(columns[1], pa.string()).dictionary_encode(),
+            "signal": pa.array(columns[2], pa.string()).dictionary_encode(),
+            "price": pa.array(columns[3], pa.float64()),
+            "notes": pa.array([str(n) for n in columns[4]], pa.string())
+        })
+
+        partition = os.path.join(self.directory, "decisions", f"date={day}")
+        os.makedirs(partition, exist_ok=True)
+        self._segment += 1
+        name = f"part-{datetime.now().strftime('%H%M%S%f')}-{self._segment}.parquet"
+        pq.write_table(table, os.path.join(partition, name), compression="zstd")
+
+_decision_logger: Optional[DecisionLogger] = None
+
+def get_decision_logger() -> DecisionLogger:
+    global _decision_logger
+    if _decision_logger is None:
+        _decision_logger = DecisionLogger(fmt=os.getenv("DECISION_LOG_FORMAT", "csv"))
+    return _decision_logger
 
 def log_decision(strategy, signal, price, notes=""):
-    header = ["timestamp", "strategy", "signal", "price", "notes"]
-    row = [datetime.now().isoformat(), strategy, signal, price, notes]
-    file_exists = os.path.exists(LOG_FILE)
-    with open(LOG_FILE, "a", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(header)
-        writer.writerow(row)
+    get_decision_logger().log(strategy, signal, price, notes)
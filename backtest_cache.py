@@ -0,0 +1,162 @@
+# backtest_cache.py - İçerik adresli backtest sonuç cache'i
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", "state/backtest_cache")
+
+def data_fingerprint(ohlcv: List[Dict]) -> str:
+    """OHLCV içeriğinin hash'i; tek bir mum değişse bile farklı sonuç verir"""
+    fields = ("timestamp", "open", "high", "low", "close", "volume")
+    matrix = np.array([[c[f] for f in fields] for c in ohlcv], dtype=float)
+    return hashlib.sha256(matrix.tobytes()).hexdigest()
+
+def make_key(**parts) -> str:
+    """
+    Anahtar parçalarının (strateji adı + parametreler, sembol, zaman dilimi, veri
+    hash'i, ücret/slippage, motor versiyonu ...) kanonik JSON'unun SHA-256'sı
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class BacktestCache:
+    """
+    İki katmanlı LRU cache: bellekte max_entries sonuç, diskte max_disk_bytes'a
+    kadar pickle dosyası. Anahtar girdilerin hash'i olduğu için herhangi bir girdi
+    değişince eski kayıt kendiliğinden kullanılmaz hale gelir; eski dosyalar
+    boyut sınırı aşıldığında en eski erişim zamanına göre silinir.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_entries: int = 512,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # LRU için erişim zamanını güncelle
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._remember(key, value)
+
+        try:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Aynı anahtarın üzerine yazılıyorsa eski dosyanın boyutu düşülür
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes += os.path.getsize(path) - old_size
+            self._evict_disk()
+        except OSError as e:
+            print(f"[CACHE ERROR] Sonuç diske yazılamadı: {e}")
+
+    def _remember(self, key: str, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".pkl"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict_disk(self):
+        """Disk boyutu sınırı aşıldıysa en eski erişilen dosyaları sil"""
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for _, _, path in self._disk_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self._memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses
+        }
+
+_backtest_cache: Optional[BacktestCache] = None
+
+def get_backtest_cache() -> BacktestCache:
+    global _backtest_cache
+    if _backtest_cache is None:
+        _backtest_cache = BacktestCache()
+    return _backtest_cache
@@ -1,76 +1,372 @@
 # backtest_engine.py
 
-import pandas as pd
-from db import get_strategies, insert_result
+import numpy as np
+from typing import Any, Dict, List, Optional
+from db import get_strategies, insert_result, update_strategy_performances
 from data.fetch_binance import fetch_binance_ohlcv
-from strategies.rsi_strategy import compute_rsi_signal
-from strategies.sma_crossover import compute_sma_crossover_signal
+from strategies import signal_series, strategy_type
+from feature_cache import closes_from_ohlcv
+from results_store import get_results_store
 
 FEE_RATE = 0.001  # %0.1 Binance spot fee
 
+def extract_trades(signals: np.ndarray, start: int = 0, end: Optional[int] = None):
+    """
+    Sinyal dizisinden (+1 al, -1 sat, 0 bekle) işlemleri çıkar.
+    Kurallar bar bazlı döngüyle aynıdır: pozisyon yokken gelen sinyal o yönde
+    pozisyon açar, pozisyon sadece ters sinyalle kapanır (kapanış barı yeni
+    pozisyon açmaz). Döngü bar başına değil işlem başına döner.
+    Döner: (giriş indeksleri, çıkış indeksleri, yönler); kapanmamış pozisyon dahil edilmez.
+    """
+    end = len(signals) if end is None else end
+    idx = np.flatnonzero(signals[start:end]) + start
+    sig = signals[idx]
+    buys, sells = idx[sig > 0], idx[sig < 0]
+
+    entries, exits, directions = [], [], []
+    k = 0
+    while k < len(idx):
+        entry, direction = idx[k], sig[k]
+        opposite = sells if direction > 0 else buys
+        j = np.searchsorted(opposite, entry, side="right")
+        if j == len(opposite):
+            break
+        exit_ = opposite[j]
+        entries.append(entry)
+        exits.append(exit_)
+        directions.append(direction)
+        k = np.searchsorted(idx, exit_, side="right")
+
+    return (np.asarray(entries, dtype=np.int64), np.asarray(exits, dtype=np.int64),
+            np.asarray(directions, dtype=np.int8))
+
+# Çıkış nedenleri
+EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_TRAILING = 0, 1, 2, 3
+EXIT_REASONS = {EXIT_SIGNAL: "signal", EXIT_STOP_LOSS: "stop_loss",
+                EXIT_TAKE_PROFIT: "take_profit", EXIT_TRAILING: "trailing_stop"}
+STOP_PARAMS = ("stop_loss", "take_profit", "trailing_stop")
+
+def _stop_levels(values, k: int, disabled: float) -> np.ndarray:
+    """None/tek değer/dizi -> (k,) oran dizisi; None kapalı demektir"""
+    if values is None:
+        return np.full(k, disabled)
+    levels = np.broadcast_to(np.asarray(values, dtype=float), (k,)).copy()
+    levels[np.isnan(levels)] = disabled
+    return levels
+
+def _directional(entry_price: float, direction: int, open_: np.ndarray, high: np.ndarray,
+                 low: np.ndarray):
+    """Yön düzeltilmiş getiriler: bar içi en kötü, en iyi ve açılış"""
+    if direction > 0:
+        return low / entry_price - 1, high / entry_price - 1, open_ / entry_price - 1
+    return 1 - high / entry_price, 1 - low / entry_price, 1 - open_ / entry_price
+
+def _resolve_touch(stop_at: np.ndarray, take_at: np.ndarray, stop_level: np.ndarray,
+                   trailing: np.ndarray, stop_loss: np.ndarray, take_profit: np.ndarray,
+                   opening: np.ndarray, width: int):
+    """İlk stop / take-profit barlarından çıkış barı, getiri (gap'te açılış) ve neden"""
+    bar = np.minimum(stop_at, take_at)
+    safe_bar = np.minimum(bar, width - 1)
+    is_stop = stop_at <= take_at
+
+    stop_fill = np.minimum(stop_level, opening[safe_bar])
+    take_fill = np.maximum(take_profit, opening[safe_bar])
+    exit_ret = np.where(is_stop, stop_fill, take_fill)
+    reason = np.where(is_stop, np.where(trailing > -stop_loss, EXIT_TRAILING, EXIT_STOP_LOSS),
+                      EXIT_TAKE_PROFIT).astype(np.int8)
+
+    touched = bar < width
+    return np.where(touched, bar, -1), np.where(touched, exit_ret, np.nan), np.where(touched, reason, EXIT_SIGNAL)
+
+def _touch_fixed(adverse: np.ndarray, favourable: np.ndarray, opening: np.ndarray,
+                 stop_loss: np.ndarray, take_profit: np.ndarray):
+    """
+    Sabit seviyeler: kümülatif en kötü / en iyi getiri monoton olduğu için tüm
+    konfigürasyonların ilk tetiklenme barı tek searchsorted ile bulunur.
+    """
+    width = len(adverse)
+    stop_at = np.searchsorted(-np.minimum.accumulate(adverse), stop_loss, side="left")
+    take_at = np.searchsorted(np.maximum.accumulate(favourable), take_profit, side="left")
+    no_trailing = np.full(len(stop_loss), -np.inf)
+    return _resolve_touch(stop_at, take_at, -stop_loss, no_trailing, stop_loss, take_profit,
+                          opening, width)
+
+def _touch_trailing(direction: int, adverse: np.ndarray, favourable: np.ndarray,
+                    opening: np.ndarray, stop_loss: np.ndarray, take_profit: np.ndarray,
+                    trailing_stop: np.ndarray, peak_start: float):
+    """Trailing stop'lu pencere adımı (K x W); ayrıca pencere sonundaki tepe getiriyi döndürür"""
+    width = len(adverse)
+
+    # Trailing stop önceki barların en iyi seviyesini izler (bar içi sıra bilinmediği için)
+    peak = np.maximum.accumulate(np.concatenate(([peak_start], favourable[:-1])))
+    with np.errstate(invalid="ignore"):
+        if direction > 0:
+            trail = (1 + peak) * (1 - trailing_stop[:, None]) - 1
+        else:
+            trail = 1 - (1 - peak) * (1 + trailing_stop[:, None])
+    trail = np.where(np.isnan(trail), -np.inf, trail)
+
+    stop = np.maximum(-stop_loss[:, None], trail)           # (K, W) en sıkı stop seviyesi
+    stop_hit = adverse <= stop
+    take_hit = favourable >= take_profit[:, None]
+    stop_at = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), width)
+    take_at = np.where(take_hit.any(axis=1), take_hit.argmax(axis=1), width)
+
+    rows, safe_bar = np.arange(len(stop_loss)), np.minimum(stop_at, width - 1)
+    touch = _resolve_touch(stop_at, take_at, stop[rows, safe_bar], trail[rows, safe_bar],
+                           stop_loss, take_profit, opening, width)
+    return touch + (max(peak_start, favourable.max()),)
+
+def first_touch(entry_price: float, direction: int, open_: np.ndarray, high: np.ndarray,
+                low: np.ndarray, stop_loss: np.ndarray, take_profit: np.ndarray,
+                trailing_stop: np.ndarray, chunk: int = 64):
+    """
+    Girişten sonraki bar penceresinde (open_/high/low dilimleri) K stop konfigürasyonu
+    için ilk tetiklenme. Oranlar giriş fiyatına göredir (0.02 = %2).
+    Aynı barda hem stop hem take-profit değerse stop'un önce olduğu varsayılır;
+    fiyat seviyenin ötesinde açıldıysa (gap) açılış fiyatından dolar.
+    Trailing stop yoksa tüm pencere tek adımda çözülür; varsa pencere büyüyen
+    parçalar halinde taranır ve tüm konfigürasyonlar tetiklenince durulur.
+    Döner: (pencere içi bar indeksi, -1 = tetiklenmedi), yön düzeltilmiş çıkış getirisi, neden
+    """
+    k = len(stop_loss)
+    if len(low) == 0:
+        return np.full(k, -1), np.full(k, np.nan), np.full(k, EXIT_SIGNAL, dtype=np.int8)
+
+    if np.isnan(trailing_stop).all():
+        adverse, favourable, opening = _directional(entry_price, direction, open_, high, low)
+        return _touch_fixed(adverse, favourable, opening, stop_loss, take_profit)
+
+    bar = np.full(k, -1)
+    exit_ret = np.full(k, np.nan)
+    reason = np.full(k, EXIT_SIGNAL, dtype=np.int8)
+
+    pending = np.arange(k)
+    peak, lo = 0.0, 0
+    while len(pending) and lo < len(low):
+        hi = min(lo + chunk, len(low))
+        adverse, favourable, opening = _directional(entry_price, direction, open_[lo:hi],
+                                                    high[lo:hi], low[lo:hi])
+        b, r, why, peak = _touch_trailing(direction, adverse, favourable, opening, stop_loss[pending],
+                                          take_profit[pending], trailing_stop[pending], peak)
+        hit = b >= 0
+        bar[pending[hit]] = lo + b[hit]
+        exit_ret[pending[hit]] = r[hit]
+        reason[pending[hit]] = why[hit]
+        pending = pending[~hit]
+        lo, chunk = hi, chunk * 4
+    return bar, exit_ret, reason
+
+def extract_trades_with_stops(signals: np.ndarray, close: np.ndarray, high: np.ndarray,
+                              low: np.ndarray, open_: Optional[np.ndarray] = None,
+                              stop_loss=None, take_profit=None, trailing_stop=None,
+                              start: int = 0, end: Optional[int] = None) -> List[Dict[str, np.ndarray]]:
+    """
+    extract_trades'in bar içi stop'lu hali. stop_loss / take_profit / trailing_stop
+    tek değer veya aynı uzunlukta diziler olabilir; her eleman ayrı bir konfigürasyondur.
+    Her giriş için tüm konfigürasyonların ilk tetiklenmesi tek seferde (K x pencere)
+    hesaplanır ve konfigürasyonlar arasında paylaşılır; bu yüzden stop gridi tek
+    backtest'e yakın maliyettedir.
+
+    Kurallar: pozisyon ters sinyal barının kapanışında veya ondan önce bar içinde
+    stop/take-profit seviyesinde kapanır. Stop ile kapanan barın kapanışında gelen
+    sinyal yeni pozisyon açabilir. Hiç kapanmayan pozisyon dahil edilmez.
+    Döner: konfigürasyon başına {entries, exits, directions, exit_prices, reasons}
+    """
+    close = np.asarray(close, dtype=float)
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    open_ = close if open_ is None else np.asarray(open_, dtype=float)
+    end = len(signals) if end is None else end
+
+    k = max(np.size(v) for v in (stop_loss, take_profit, trailing_stop) if v is not None) \
+        if any(v is not None for v in (stop_loss, take_profit, trailing_stop)) else 1
+    sl = _stop_levels(stop_loss, k, np.inf)
+    tp = _stop_levels(take_profit, k, np.inf)
+    ts = _stop_levels(trailing_stop, k, np.nan)
+
+    idx = np.flatnonzero(signals[start:end]) + start
+    sig = signals[idx]
+    buys, sells = idx[sig > 0], idx[sig < 0]
+
+    # Aday giriş (sinyal barı) x konfigürasyon: çıkış barı, fiyatı ve nedeni.
+    # Satırlar sadece bir konfigürasyon o girişe ulaştığında hesaplanır.
+    n = len(idx)
+    exit_bar = np.full((n, k), -1, dtype=np.int64)
+    exit_price = np.full((n, k), np.nan)
+    exit_reason = np.zeros((n, k), dtype=np.int8)
+    resolved = np.zeros(n, dtype=bool)
+
+    def resolve(row):
+        entry, direction = idx[row], sig[row]
+        opposite = sells if direction > 0 else buys
+        j = np.searchsorted(opposite, entry, side="right")
+        signal_exit = opposite[j] if j < len(opposite) else -1
+        last = signal_exit if signal_exit >= 0 else end - 1
+
+        lo, hi = entry + 1, last + 1
+        bar, ret, reason = first_touch(close[entry], direction, open_[lo:hi], high[lo:hi],
+                                       low[lo:hi], sl, tp, ts)
+        touched = bar >= 0
+        exit_bar[row] = np.where(touched, lo + bar, signal_exit)
+        exit_price[row] = np.where(touched, close[entry] * (1 + ret * direction), close[last])
+        exit_reason[row] = reason
+        resolved[row] = True
+
+    # Tüm konfigürasyonlar işlem işlem birlikte ilerler (adım başına vektörel)
+    pos = np.zeros(k, dtype=np.int64)
+    active = np.full(k, n > 0)
+    steps_cfg, steps_row = [], []
+    while active.any():
+        cfg = np.flatnonzero(active)
+        rows = pos[cfg]
+        for row in np.unique(rows[~resolved[rows]]):
+            resolve(row)
+
+        exits = exit_bar[rows, cfg]
+        closed = exits >= 0
+        active[cfg[~closed]] = False
+        cfg, rows, exits = cfg[closed], rows[closed], exits[closed]
+        steps_cfg.append(cfg)
+        steps_row.append(rows)
+
+        # Sinyalle kapanan barda yeni giriş olmaz; stop ile kapanan barın kapanışında olabilir
+        by_signal = exit_reason[rows, cfg] == EXIT_SIGNAL
+        pos[cfg] = np.where(by_signal, np.searchsorted(idx, exits, side="right"),
+                            np.searchsorted(idx, exits, side="left"))
+        active[cfg] &= pos[cfg] < n
+
+    cfg_all = np.concatenate(steps_cfg) if steps_cfg else np.empty(0, dtype=np.int64)
+    row_all = np.concatenate(steps_row) if steps_row else np.empty(0, dtype=np.int64)
+    order = np.argsort(cfg_all, kind="stable")
+    cfg_all, row_all = cfg_all[order], row_all[order]
+    bounds = np.searchsorted(cfg_all, np.arange(k + 1))
+
+    results = []
+    for c in range(k):
+        rows = row_all[bounds[c]:bounds[c + 1]]
+        results.append({
+            "entries": idx[rows].astype(np.int64),
+            "exits": exit_bar[rows, c],
+            "directions": sig[rows].astype(np.int8),
+            "exit_prices": exit_price[rows, c],
+            "reasons": exit_reason[rows, c]
+        })
+    return results
+
+def _summarize(returns: np.ndarray, initial_balance: float, fee_rate: float) -> Dict[str, Any]:
+    growth = 1.0 + returns - np.abs(returns) * fee_rate
+    balances = initial_balance * np.cumprod(growth)
+    profits = np.diff(np.concatenate(([initial_balance], balances)))
+
+    final_balance = float(balances[-1]) if len(balances) else float(initial_balance)
+    return {
+        "profit_loss": final_balance - initial_balance,
+        "return_pct": (final_balance - initial_balance) / initial_balance * 100,
+        "final_balance": final_balance,
+        "win_rate": float((profits > 0).mean()) if len(profits) else 0,
+        "trades_count": int(len(profits)),
+        "trade_returns": returns
+    }
+
+def backtest_strategy(close, signals: Optional[np.ndarray] = None, initial_balance: float = 1000,
+                      fee_rate: float = FEE_RATE, start: int = 0, end: Optional[int] = None,
+                      high: Optional[np.ndarray] = None, low: Optional[np.ndarray] = None,
+                      open_: Optional[np.ndarray] = None, stop_loss: Optional[float] = None,
+                      take_profit: Optional[float] = None,
+                      trailing_stop: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Vektörel backtest. close bir DataFrame ise ('close' ve 'signal' sütunlu,
+    strategies.run_strategy çıktısı) sinyaller oradan alınır.
+    Her işlemde bakiye (1 + r - |r| * fee) ile çarpılır (backtest() ile aynı).
+    stop_loss / take_profit / trailing_stop (oran, örn. 0.02) verilirse çıkışlar
+    high/low'a göre bar içinde değerlendirilir; high/low yoksa kapanış kullanılır.
+    """
+    if signals is None:
+        df = close
+        signals = df["signal"].to_numpy()
+        close = df["close"].to_numpy()
+        if "high" in df and "low" in df:
+            high, low = df["high"].to_numpy(), df["low"].to_numpy()
+        if "open" in df:
+            open_ = df["open"].to_numpy()
+    close = np.asarray(close, dtype=float)
+
+    if stop_loss is None and take_profit is None and trailing_stop is None:
+        entries, exits, directions = extract_trades(signals, start, end)
+        returns = (close[exits] - close[entries]) / close[entries] * directions
+        return _summarize(returns, initial_balance, fee_rate)
+
+    trades = extract_trades_with_stops(
+        signals, close, close if high is None else high, close if low is None else low, open_,
+        stop_loss, take_profit, trailing_stop, start, end
+    )[0]
+    return _with_stop_stats(trades, close, initial_balance, fee_rate)
+
+def _with_stop_stats(trades: Dict[str, np.ndarray], close: np.ndarray, initial_balance: float,
+                     fee_rate: float) -> Dict[str, Any]:
+    entry_prices = close[trades["entries"]]
+    returns = (trades["exit_prices"] - entry_prices) / entry_prices * trades["directions"]
+    result = _summarize(returns, initial_balance, fee_rate)
+    result["exit_reasons"] = {name: int((trades["reasons"] == code).sum())
+                              for code, name in EXIT_REASONS.items()}
+    return result
+
+def backtest_stop_grid(close: np.ndarray, signals: np.ndarray, high: np.ndarray, low: np.ndarray,
+                       open_: Optional[np.ndarray] = None, stop_loss=None, take_profit=None,
+                       trailing_stop=None, initial_balance: float = 1000, fee_rate: float = FEE_RATE,
+                       start: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Aynı sinyaller üzerinde bir stop gridi: stop_loss / take_profit / trailing_stop
+    aynı uzunlukta diziler (eleman başına bir konfigürasyon). Sonuçlar aynı sırada döner.
+    """
+    close = np.asarray(close, dtype=float)
+    all_trades = extract_trades_with_stops(signals, close, high, low, open_, stop_loss,
+                                           take_profit, trailing_stop, start, end)
+    k = len(all_trades)
+    levels = {name: None if values is None else np.broadcast_to(np.asarray(values, dtype=float), (k,))
+              for name, values in zip(STOP_PARAMS, (stop_loss, take_profit, trailing_stop))}
+
+    results = []
+    for c, trades in enumerate(all_trades):
+        result = _with_stop_stats(trades, close, initial_balance, fee_rate)
+        result["stops"] = {name: None if values is None or np.isnan(values[c]) else float(values[c])
+                           for name, values in levels.items()}
+        results.append(result)
+    return results
+
 def backtest(strategy, symbol="BTC/USDT", interval="1h", initial_balance=1000):
     """Verilen stratejiyi geçmiş veride test eder"""
-    params = strategy.get("parameters", {})
+    params = dict(strategy.get("parameters", {}))
+    stops = {name: params.pop(name) for name in STOP_PARAMS if name in params}
     ohlcv = fetch_binance_ohlcv(symbol, interval, limit=500)
-    df = pd.DataFrame(ohlcv)
-
-    balance = initial_balance
-    position = None
-    entry_price = 0
-    trades = []
-
-    for i in range(len(df)):
-        window_data = df.iloc[:i+1].to_dict(orient="records")
-
-        if "RSI" in strategy["name"]:
-            signal, _ = compute_rsi_signal(window_data, rsi_period=params.get("rsi_period", 14))
-        elif "SMA_Crossover" in strategy["name"]:
-            signal, _ = compute_sma_crossover_signal(
-                window_data,
-                short_period=params.get("short_period", 10),
-                long_period=params.get("long_period", 50)
-            )
-        else:
-            continue
-
-        price = df.iloc[i]["close"]
-
-        # Long ve Short pozisyon yönetimi
-        if signal == "buy" and position is None:
-            position = "long"
-            entry_price = price
-        elif signal == "sell" and position == "long":
-            profit = (price - entry_price) / entry_price * balance
-            profit -= abs(profit) * FEE_RATE
-            balance += profit
-            trades.append(profit)
-            position = None
-
-        elif signal == "sell" and position is None:
-            position = "short"
-            entry_price = price
-        elif signal == "buy" and position == "short":
-            profit = (entry_price - price) / entry_price * balance
-            profit -= abs(profit) * FEE_RATE
-            balance += profit
-            trades.append(profit)
-            position = None
-
-    total_profit = balance - initial_balance
-    win_rate = sum(1 for p in trades if p > 0) / len(trades) if trades else 0
+    closes = closes_from_ohlcv(ohlcv)
+
+    if strategy_type(strategy["name"]) is None:
+        signals = np.zeros(len(closes), dtype=np.int8)
+    else:
+        signals = signal_series(strategy["name"], closes, **params)
+
+    if stops:
+        stops.update(high=np.array([c["high"] for c in ohlcv], dtype=float),
+                     low=np.array([c["low"] for c in ohlcv], dtype=float),
+                     open_=np.array([c["open"] for c in ohlcv], dtype=float))
+    result = backtest_strategy(closes, signals, initial_balance=initial_balance, **stops)
 
     return {
         "strategy_id": strategy["id"],
         "strategy": strategy["name"],
         "symbol": symbol,
-        "profit_loss": total_profit,
-        "win_rate": win_rate,
-        "trades_count": len(trades)
+        "profit_loss": result["profit_loss"],
+        "win_rate": result["win_rate"],
+        "trades_count": result["trades_count"]
     }
 
 def run_backtests():
     strategies = get_strategies()
     all_results = []
+    store = get_results_store()
+    store.start_run("basic")
 
     for strat in strategies:
         result = backtest(strat)
@@ -82,6 +378,15 @@ def run_backtests():
             "strategy_id": result["strategy_id"],
             "profit_loss": result["profit_loss"]
         })
+        store.record("basic", result, strat, timeframe="1h")
+
+    try:
+        update_strategy_performances([
+            {"id": r["strategy_id"], "name": r["strategy"], "performance_score": r["profit_loss"]}
+            for r in all_results
+        ])
+    except Exception as e:
+        print(f"[BACKTEST ERROR] Performans skorları güncellenemedi: {e}")
 
     # En iyi 10 stratejiyi raporla
     sorted_results = sorted(all_results, key=lambda x: x["profit_loss"], reverse=True)[:10]
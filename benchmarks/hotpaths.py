@@ -0,0 +1,270 @@
+# benchmarks/hotpaths.py - Backtest, indikatör ve canlı döngü sıcak yollarının benchmark'ı
+"""
+Seed'li sentetik OHLCV üzerinde (1k, 10k, 100k, 1M bar) sıcak yolların süresini ve
+tepe belleğini ölçer. Binance ve Supabase yerel stub'larla değiştirilir; ağ veya
+DB bağlantısı gerekmez.
+
+    python benchmarks/hotpaths.py
+    python benchmarks/hotpaths.py --sizes 1000,10000 --only rsi,sma
+    python benchmarks/hotpaths.py --save benchmarks/baseline.json
+    python benchmarks/hotpaths.py --baseline benchmarks/baseline.json --threshold 0.25
+
+Baseline'a göre süre veya bellek threshold oranından fazla artarsa çıkış kodu 1'dir.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEED = 42
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# --- Sentetik veri ve stub'lar ---
+
+_datasets: Dict[int, List[Dict]] = {}
+
+def synthetic_ohlcv(n_bars: int, seed: int = SEED) -> List[Dict]:
+    """Seed'li geometrik rastgele yürüyüş; fetch_binance_ohlcv ile aynı format"""
+    if n_bars not in _datasets:
+        rng = np.random.default_rng(seed)
+        close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.004, n_bars)))
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        spread = np.abs(rng.normal(0, 0.002, n_bars)) * close
+        high = np.maximum(open_, close) + spread
+        low = np.minimum(open_, close) - spread
+        volume = rng.lognormal(3, 1, n_bars)
+        timestamps = 1_600_000_000_000 + np.arange(n_bars, dtype=np.int64) * 3_600_000
+
+        _datasets[n_bars] = [
+            {"timestamp": int(t), "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for t, o, h, l, c, v in zip(timestamps.tolist(), open_.tolist(), high.tolist(),
+                                        low.tolist(), close.tolist(), volume.tolist())
+        ]
+    return _datasets[n_bars]
+
+class _StubResponse:
+    data: List = []
+
+class _StubSupabase:
+    """Supabase client yerine geçen, her sorguya boş cevap dönen stub"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return _StubResponse()
+
+def install_stubs():
+    import db
+    import advenced_backtest
+    import backtest_engine
+
+    db._client = _StubSupabase()
+    current = {"n": DEFAULT_SIZES[0]}
+
+    def fetch(symbol="BTC/USDT", interval="1h", limit=500, start_time=None):
+        return synthetic_ohlcv(current["n"])
+
+    advenced_backtest.fetch_binance_ohlcv = fetch
+    backtest_engine.fetch_binance_ohlcv = fetch
+    return current
+
+# --- Benchmark'lar ---
+
+RSI_STRATEGY = {"id": None, "name": "RSI_rsi_period14_overbought70_oversold30",
+                "parameters": {"rsi_period": 14, "overbought": 70, "oversold": 30}}
+SMA_STRATEGY = {"id": None, "name": "SMA_Crossover_short_period10_long_period50",
+                "parameters": {"short_period": 10, "long_period": 50}}
+
+def bench_rsi(ohlcv):
+    from strategies.rsi_strategy import compute_rsi_signal
+    return lambda: compute_rsi_signal(ohlcv, rsi_period=14)
+
+def bench_sma(ohlcv):
+    from strategies.sma_crossover import compute_sma_crossover_signal
+    return lambda: compute_sma_crossover_signal(ohlcv, 10, 50)
+
+def bench_backtest_engine(ohlcv):
+    from backtest_engine import backtest
+    return lambda: backtest(dict(RSI_STRATEGY, id=1))
+
+def bench_stop_grid(ohlcv):
+    from backtest_engine import backtest_stop_grid
+    from strategies import signal_series
+
+    o, h, l, c = (np.array([x[k] for x in ohlcv]) for k in ("open", "high", "low", "close"))
+    signals = signal_series("RSI", c, rsi_period=14, overbought=70, oversold=30)
+    stop_loss = np.repeat([0.005, 0.01, 0.02, 0.03, 0.05], 5)
+    take_profit = np.tile([0.01, 0.02, 0.04, 0.08, np.nan], 5)
+    return lambda: backtest_stop_grid(c, signals, h, l, o, stop_loss=stop_loss, take_profit=take_profit)
+
+def bench_portfolio_backtest(ohlcv):
+    from portfolio_backtest import PortfolioBacktester
+
+    # 36 sembol: her biri farklı seed'li rastgele yürüyüş
+    rng = np.random.default_rng(SEED)
+    n = len(ohlcv)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (36, n)), axis=1))
+    timestamps = 1_600_000_000_000 + np.arange(n, dtype=np.int64) * 3_600_000
+    symbols = [f"S{i}/USDT" for i in range(36)]
+    backtester = PortfolioBacktester()
+    return lambda: backtester.backtest(RSI_STRATEGY, symbols, close=close, timestamps=timestamps)
+
+def bench_advanced_backtest(ohlcv):
+    from advenced_backtest import AdvancedBacktester
+    backtester = AdvancedBacktester(use_cache=False)
+    return lambda: backtester.backtest_strategy(RSI_STRATEGY)
+
+def bench_chunked_backtest(ohlcv):
+    from advenced_backtest import AdvancedBacktester
+    from data.candle_store import CandleStore
+
+    # Geçici mum deposu; backtest 10k barlık bloklarla okur
+    store = CandleStore(os.path.join(tempfile.mkdtemp(), "candles.db"))
+    store.upsert("BTC/USDT", "1m", ohlcv)
+    backtester = AdvancedBacktester(use_cache=False)
+    return lambda: backtester.backtest_strategy_chunked(RSI_STRATEGY, "BTC/USDT", "1m",
+                                                        chunk_size=10_000, store=store)
+
+def bench_monte_carlo(ohlcv):
+    from advenced_backtest import AdvancedBacktester
+    backtester = AdvancedBacktester(use_cache=False)
+
+    return lambda: backtester.monte_carlo_simulation(RSI_STRATEGY, simulations=100, seed=SEED, n_jobs=1)
+
+def bench_performance_metrics(ohlcv):
+    import pandas as pd
+    from advenced_backtest import AdvancedBacktester
+    from trade_log import TradeLog
+
+    rng = np.random.default_rng(SEED)
+    n = len(ohlcv)
+    portfolio_values = (10000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))).tolist()
+    trades = TradeLog()
+    for k, pnl in enumerate(rng.normal(5, 50, max(1, n // 20))):
+        trades.append(k * 20, k * 20 + 5, k * 72_000_000, k * 72_000_000 + 18_000_000,
+                      30000.0, 30000.0 + pnl, 1.0, 1, pnl, pnl / 100)
+    df = pd.DataFrame({"close": [c["close"] for c in ohlcv]})
+    backtester = AdvancedBacktester(use_cache=False)
+    return lambda: backtester._calculate_performance_metrics(trades, portfolio_values, df)
+
+# ad -> (kurulum fonksiyonu, desteklenen en büyük bar sayısı)
+BENCHMARKS: Dict[str, tuple] = {
+    "rsi": (bench_rsi, 1_000_000),
+    "sma": (bench_sma, 1_000_000),
+    "backtest_engine": (bench_backtest_engine, 1_000_000),
+    "stop_grid": (bench_stop_grid, 100_000),
+    "portfolio_backtest": (bench_portfolio_backtest, 100_000),
+    "advanced_backtest": (bench_advanced_backtest, 100_000),
+    "chunked_backtest": (bench_chunked_backtest, 1_000_000),
+    "monte_carlo": (bench_monte_carlo, 10_000),
+    "performance_metrics": (bench_performance_metrics, 1_000_000),
+}
+
+def measure(fn: Callable, min_time: float = 0.2, max_repeats: int = 5) -> Dict[str, float]:
+    """Süre (tracemalloc kapalı, birkaç tekrar) ve tepe bellek (ayrı bir çalıştırma)"""
+    fn()  # Isınma: lazy import'lar ve ilk çağrı maliyetleri ölçüme girmesin
+
+    times = []
+    while len(times) < max_repeats and (not times or sum(times) < min_time):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "min_ms": min(times) * 1000,
+        "median_ms": statistics.median(times) * 1000,
+        "repeats": len(times),
+        "peak_mb": peak / 1024 ** 2
+    }
+
+def run_suite(sizes, only=None) -> Dict[str, Dict[str, float]]:
+    current = install_stubs()
+    results = {}
+    for name, (setup, max_size) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        for n in sizes:
+            if n > max_size:
+                continue
+            current["n"] = n
+            ohlcv = synthetic_ohlcv(n)
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn = setup(ohlcv)
+                result = measure(fn)
+            results[f"{name}[{n}]"] = result
+            print(f"{name + f'[{n}]':<32} {result['min_ms']:10.2f}ms {result['median_ms']:10.2f}ms "
+                  f"{result['peak_mb']:9.1f}MB  x{result['repeats']}", flush=True)
+    return results
+
+def compare(results, baseline, threshold: float) -> List[str]:
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if r["min_ms"] > base["min_ms"] * (1 + threshold):
+            regressions.append(f"{key}: süre {base['min_ms']:.2f}ms -> {r['min_ms']:.2f}ms")
+        # Küçük ölçümlerde gürültüyü önlemek için 1 MB altı bellek farkları yok sayılır
+        if r["peak_mb"] > base["peak_mb"] * (1 + threshold) and r["peak_mb"] - base["peak_mb"] > 1:
+            regressions.append(f"{key}: bellek {base['peak_mb']:.1f}MB -> {r['peak_mb']:.1f}MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Sıcak yol benchmark'ları")
+    parser.add_argument("--sizes", type=str, default=",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--only", type=str, help=f"Virgülle ayrılmış: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--save", type=str, help="Sonuçları baseline olarak JSON'a yaz")
+    parser.add_argument("--baseline", type=str, help="Karşılaştırılacak baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="İzin verilen yavaşlama / bellek artışı oranı")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = set(args.only.split(",")) if args.only else None
+
+    print(f"{'Benchmark':<32} {'Min':>12} {'Medyan':>12} {'Tepe bellek':>11}")
+    results = run_suite(sizes, only)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {"python": platform.python_version(), "numpy": np.__version__,
+                         "machine": platform.machine(), "seed": SEED},
+                "results": results
+            }, f, indent=2)
+        print(f"\n[BENCH] Baseline yazıldı: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n[BENCH] Gerileme (>%{args.threshold * 100:.0f}):")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n[BENCH] Baseline'a göre gerileme yok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/startup.py - CLI modlarının soğuk başlangıç (import) süresi
+"""
+Her mod için gereken modülleri ayrı, temiz bir Python sürecinde import eder
+ve süreyi ölçer. Ağır bağımlılıkların (pandas, pandas_ta, scipy, supabase)
+hangi modda yüklendiğini ve DB client'ının import sırasında oluşturulup
+oluşturulmadığını da raporlar.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --json benchmarks/startup.json
+    python benchmarks/startup.py --baseline benchmarks/startup.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mod -> run.py'nin o modda import ettiği modüller
+MODES = {
+    "cli": ["run"],
+    "live": ["run", "main"],
+    "backtest": ["run", "advenced_backtest"],
+    "portfolio": ["run", "paper_trading", "risk_manager"],
+    "scan": ["run", "scanner"],
+}
+
+HEAVY_MODULES = ["pandas", "pandas_ta", "scipy", "supabase", "sklearn"]
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+db = sys.modules.get("db")
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+    "db_connected": bool(db is not None and getattr(db, "_client", None) is not None)
+}}))
+"""
+
+def measure(modules, runs: int):
+    """Modülleri runs kez ayrı süreçlerde import et"""
+    code = _CHILD.format(modules=modules, heavy=HEAVY_MODULES)
+    samples, info = [], {}
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                             text=True, check=True)
+        info = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(info["seconds"])
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "heavy": info["heavy"],
+        "db_connected": info["db_connected"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI soğuk başlangıç benchmark'ı")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", type=str, default=",".join(MODES))
+    parser.add_argument("--json", type=str, help="Sonuçları JSON olarak yaz")
+    parser.add_argument("--baseline", type=str, help="Karşılaştırılacak önceki JSON sonucu")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Baseline'a göre izin verilen yavaşlama oranı")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        results[mode] = measure(MODES[mode], args.runs)
+
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'Mod':<10} {'Medyan':>10} {'Min':>10} {'Baseline':>10}  DB  Ağır modüller")
+    regressions = []
+    for mode, r in results.items():
+        base = baseline.get(mode, {}).get("median_ms")
+        base_str = f"{base:8.1f}ms" if base else f"{'-':>10}"
+        print(f"{mode:<10} {r['median_ms']:8.1f}ms {r['min_ms']:8.1f}ms {base_str}  "
+              f"{'✗' if r['db_connected'] else '-':<3} {', '.join(r['heavy']) or '-'}")
+        if base and r["median_ms"] > base * (1 + args.threshold):
+            regressions.append(mode)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[BENCH] Sonuçlar yazıldı: {args.json}")
+
+    if regressions:
+        print(f"\n[BENCH] Yavaşlama (>%{args.threshold*100:.0f}): {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# chunked_backtest.py - Parça parça (out-of-core) backtest için akış durumları
+
+from typing import Dict
+
+import numpy as np
+
+from indicators import ewm_recursive
+from monte_carlo import RunningMoments
+
+class StreamingRSI:
+    """
+    indicators.rsi'nin parça parça hesaplanan hali. Önceki kapanış ve iki
+    Wilder ortalaması taşındığı için sonuç tüm seri üzerindeki rsi ile bire bir aynıdır.
+    """
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.deltas = 0  # Şimdiye kadar görülen fiyat değişimi sayısı
+
+    def update(self, close: np.ndarray) -> np.ndarray:
+        """Yeni barların RSI değerleri (ilk `period` bar NaN)"""
+        out = np.full(len(close), np.nan)
+        if len(close) == 0:
+            return out
+
+        # Parçanın ilk barı, önceki parçanın son kapanışıyla fark alınır
+        first = 1 if self.prev_close is None else 0
+        delta = np.diff(close) if first else np.diff(close, prepend=self.prev_close)
+        self.prev_close = close[-1]
+        if self.period <= 0 or len(delta) == 0:
+            return out
+
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        avg_gain = ewm_recursive(gain, 1.0 / self.period, prev=self.avg_gain)
+        avg_loss = ewm_recursive(loss, 1.0 / self.period, prev=self.avg_loss)
+        self.avg_gain, self.avg_loss = avg_gain[-1], avg_loss[-1]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = 100.0 * avg_gain / (avg_gain + avg_loss)
+
+        # Fark indeksi period-1'den itibaren geçerli (bar indeksi = fark indeksi + 1)
+        valid = np.arange(self.deltas, self.deltas + len(delta)) >= self.period - 1
+        out[first:][valid] = values[valid]
+        self.deltas += len(delta)
+        return out
+
+class StreamingSMA:
+    """
+    indicators.sma'nın parça parça hesaplanan hali. Aynı ötelenmiş kümülatif
+    toplam (ilk kapanışa göre) kullanılır ve son `period` toplam taşınır; np.cumsum
+    sıralı topladığı için değerler tüm seri üzerindeki sma ile bire bir aynıdır.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.base = None
+        self.tail = np.empty(0)  # Son `period` kümülatif toplam
+        self.seen = 0
+
+    def update(self, close: np.ndarray) -> np.ndarray:
+        """Yeni barların SMA değerleri (ilk period-1 bar NaN)"""
+        n, period = len(close), self.period
+        out = np.full(n, np.nan)
+        if n == 0:
+            return out
+        if self.base is None:
+            self.base = close[:1]
+            csum = np.cumsum(close - self.base)
+        else:
+            csum = np.cumsum(np.concatenate((self.tail[-1:], close - self.base)))[1:]
+
+        if period > 0:
+            # ext[k], global bar (seen - len(tail) + k)'nın kümülatif toplamı
+            ext = np.concatenate((self.tail, csum))
+            ext_start = self.seen - len(self.tail)
+            bars = np.arange(self.seen, self.seen + n)
+            valid = bars >= period - 1
+            window_sum = ext[bars[valid] - ext_start].copy()
+            has_prev = bars[valid] >= period
+            window_sum[has_prev] -= ext[bars[valid][has_prev] - period - ext_start]
+            out[valid] = window_sum / period + self.base
+            self.tail = ext[-period:]
+        else:
+            self.tail = csum[-1:]
+        self.seen += n
+        return out
+
+class StreamingFeatures:
+    """AdvancedBacktester._compute_features'ın parça parça karşılığı"""
+
+    def __init__(self, strategy_name: str, params: Dict):
+        if "RSI" in strategy_name:
+            self.streams = {"rsi": StreamingRSI(params.get('rsi_period', 14))}
+        elif "SMA" in strategy_name:
+            self.streams = {
+                "sma_short": StreamingSMA(params.get('short_period', 10)),
+                "sma_long": StreamingSMA(params.get('long_period', 50))
+            }
+        else:
+            self.streams = {}
+
+    def update(self, close: np.ndarray) -> Dict[str, np.ndarray]:
+        return {name: stream.update(close) for name, stream in self.streams.items()}
+
+class EquityStats:
+    """
+    Portföy değeri serisinin akış istatistikleri: zirve, maksimum düşüş ve bar
+    getirilerinin ortalama/standart sapması. Seri bellekte tutulmaz; sonuçlar
+    _calculate_performance_metrics ile aynı formüllerden (float yuvarlama farkıyla) çıkar.
+    """
+
+    def __init__(self, initial_value: float):
+        self.first = initial_value
+        self.last = initial_value
+        self.count = 1
+        self.peak = initial_value
+        self.max_drawdown = 0
+        self.max_drawdown_pct = 0
+        self.returns = RunningMoments()
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        peaks = np.maximum.accumulate(np.concatenate(([self.peak], values)))[1:]
+        drawdown = peaks - values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown_pct = np.where(peaks > 0, drawdown / peaks * 100, 0)
+        self.max_drawdown = max(self.max_drawdown, drawdown.max())
+        self.max_drawdown_pct = max(self.max_drawdown_pct, drawdown_pct.max())
+
+        previous = np.concatenate(([self.last], values[:-1]))
+        self.returns.update((values - previous) / previous)
+        self.peak, self.last = peaks[-1], values[-1]
+        self.count += len(values)
+
+    def metrics(self) -> Dict[str, float]:
+        std_return = self.returns.std
+        sharpe_ratio = (self.returns.mean / std_return) * np.sqrt(252) if std_return > 0 else 0
+        annual_return = ((self.last / self.first) ** (252 / self.count)) - 1
+        calmar_ratio = annual_return / (self.max_drawdown_pct / 100) if self.max_drawdown_pct > 0 else 0
+        return {
+            'sharpe_ratio': sharpe_ratio,
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_pct': self.max_drawdown_pct,
+            'volatility': std_return * np.sqrt(252),
+            'calmar_ratio': calmar_ratio
+        }
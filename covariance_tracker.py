@@ -0,0 +1,259 @@
+# covariance_tracker.py
+
+import json
+import os
+import numpy as np
+from typing import Dict, List, Any, Optional
+
+from agents.background_writer import BackgroundWriter
+
+class EWMACovarianceTracker:
+    """
+    İzlenen tüm semboller için üstel ağırlıklı (RiskMetrics) kovaryans/korelasyon takibi.
+
+    Her yeni bar için kovaryans matrisi O(k²) ile güncellenir:
+        Σ_t = λ Σ_{t-1} + (1 - λ) r_t r_tᵀ
+    Geçmiş hiçbir zaman baştan hesaplanmaz; durum diske yazıldığı için
+    yeniden başlatmada geçmişi tekrar oynatmaya gerek kalmaz. Checkpoint her
+    güncellemede değil, arka plan yazıcısıyla en fazla checkpoint_interval
+    saniyede bir (ve kapanışta) yazılır.
+    """
+
+    def __init__(self, decay=0.94, min_periods=20,
+                 checkpoint_path: Optional[str] = "state/ewma_covariance.json",
+                 max_pending_bars=1000, checkpoint_interval: float = 30.0):
+        self.decay = decay
+        self.min_periods = min_periods
+        self.checkpoint_path = checkpoint_path
+        self.max_pending_bars = max_pending_bars
+
+        self.symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.cov = np.zeros((0, 0))
+        self.observations = np.zeros(0, dtype=np.int64)
+        self.last_update_ts: Optional[int] = None
+
+        # Sembol bazlı son kapanış / zaman damgası
+        self._last_close: Dict[str, float] = {}
+        self._last_ts: Dict[str, int] = {}
+
+        # Tüm sembollerin getirisi henüz gelmemiş barlar: ts -> {symbol: return}
+        self._pending: Dict[int, Dict[str, float]] = {}
+
+        self._checkpoint_writer = None
+        if checkpoint_path:
+            self.load_checkpoint()
+            # Aradaki durumlar atlanır, sadece partideki en son durum yazılır
+            self._checkpoint_writer = BackgroundWriter(
+                "covariance", lambda states: self._write_state(states[-1]),
+                batch_size=100_000, linger=checkpoint_interval)
+
+    # --- Güncelleme ---
+
+    def add_symbol(self, symbol: str):
+        """Yeni sembol için matrisi bir satır/sütun büyüt"""
+        if symbol in self._index:
+            return
+
+        k = len(self.symbols)
+        self._index[symbol] = k
+        self.symbols.append(symbol)
+
+        cov = np.zeros((k + 1, k + 1))
+        cov[:k, :k] = self.cov
+        self.cov = cov
+        self.observations = np.append(self.observations, 0)
+
+    def watch(self, symbols: List[str]):
+        """
+        İzlenecek sembolleri önceden kaydet.
+        Böylece ilk sembolün geçmişi, diğerlerinin getirileri gelene kadar bekletilir
+        ve tüm semboller aynı barlar üzerinden birlikte ısınır.
+        """
+        for symbol in symbols:
+            self.add_symbol(symbol)
+
+    def update(self, symbol: str, ohlcv: List[Dict]):
+        """Mumlardan sadece son bilinen zaman damgasından sonraki barları işle"""
+        self.add_symbol(symbol)
+
+        last_ts = self._last_ts.get(symbol)
+        last_close = self._last_close.get(symbol)
+        updated = False
+
+        for candle in ohlcv:
+            ts = int(candle["timestamp"])
+            close = float(candle["close"])
+
+            if last_ts is not None and ts <= last_ts:
+                continue
+
+            if last_close is not None and last_close > 0:
+                self._pending.setdefault(ts, {})[symbol] = close / last_close - 1
+
+            last_ts = ts
+            last_close = close
+            updated = True
+
+        if last_ts is not None:
+            self._last_ts[symbol] = last_ts
+            self._last_close[symbol] = last_close
+
+        if updated:
+            self._apply_complete_bars()
+            if self._checkpoint_writer is not None:
+                self._checkpoint_writer.submit(self._state())
+
+    def _apply_complete_bars(self):
+        """Tüm semboller için getirisi tamamlanan barları sırayla uygula"""
+        k = len(self.symbols)
+
+        for ts in sorted(self._pending):
+            if self.last_update_ts is not None and ts <= self.last_update_ts:
+                # Daha yeni bir bar uygulanmış, bu bar artık tamamlanamaz
+                del self._pending[ts]
+                continue
+
+            returns = self._pending[ts]
+            if len(returns) < k:
+                continue
+
+            r = np.array([returns[s] for s in self.symbols])
+            self._update_bar(r)
+            self.last_update_ts = ts
+            del self._pending[ts]
+
+        # Hiç tamamlanmayacak eski barları sınırla
+        if len(self._pending) > self.max_pending_bars:
+            for ts in sorted(self._pending)[:-self.max_pending_bars]:
+                del self._pending[ts]
+
+    def _update_bar(self, r: np.ndarray):
+        """Tek bar için O(k²) EWMA güncellemesi"""
+        outer = np.outer(r, r)
+
+        # İlk gözlemde varyansı doğrudan getiri karesiyle başlat
+        fresh = self.observations == 0
+        if fresh.any():
+            self.cov[fresh, :] = outer[fresh, :]
+            self.cov[:, fresh] = outer[:, fresh]
+
+        seasoned = ~fresh
+        mask = np.outer(seasoned, seasoned)
+        self.cov[mask] = self.decay * self.cov[mask] + (1 - self.decay) * outer[mask]
+        self.observations += 1
+
+    # --- Sorgular ---
+
+    def is_ready(self, symbols: Optional[List[str]] = None) -> bool:
+        symbols = symbols if symbols is not None else self.symbols
+        return bool(symbols) and all(
+            s in self._index and self.observations[self._index[s]] >= self.min_periods
+            for s in symbols
+        )
+
+    def correlation_matrix(self) -> np.ndarray:
+        std = np.sqrt(np.diag(self.cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self.cov / np.outer(std, std)
+        corr = np.nan_to_num(corr)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    def correlation(self, symbol_a: str, symbol_b: str) -> Optional[float]:
+        if not self.is_ready([symbol_a, symbol_b]):
+            return None
+        i, j = self._index[symbol_a], self._index[symbol_b]
+        return float(self.correlation_matrix()[i, j])
+
+    def correlated_exposure(self, symbol: str, exposures: Dict[str, float]) -> Optional[float]:
+        """
+        Bir varlığın korelasyon ayarlı pozisyonu: Σ_j max(ρ_ij, 0) * x_j.
+        Yüksek korelasyonlu pozisyonlar aynı riski taşıdığı için birlikte sayılır.
+        """
+        held = [s for s, v in exposures.items() if v]
+        if not self.is_ready(list(set(held + [symbol]))):
+            return None
+
+        corr = self.correlation_matrix()
+        i = self._index[symbol]
+        return float(sum(max(corr[i, self._index[s]], 0.0) * exposures[s] for s in held))
+
+    def diversified_exposure(self, exposures: Dict[str, float]) -> Optional[float]:
+        """Korelasyonla çeşitlendirilmiş toplam pozisyon: sqrt(xᵀ ρ x)"""
+        held = [s for s, v in exposures.items() if v]
+        if not self.is_ready(held):
+            return None
+
+        corr = self.correlation_matrix()
+        idx = [self._index[s] for s in held]
+        x = np.array([exposures[s] for s in held])
+        return float(np.sqrt(max(x @ corr[np.ix_(idx, idx)] @ x, 0.0)))
+
+    # --- Checkpoint ---
+
+    def _state(self) -> Dict[str, Any]:
+        """Checkpoint içeriği (o anki durumun kopyası)"""
+        return {
+            "decay": self.decay,
+            "symbols": list(self.symbols),
+            "cov": self.cov.tolist(),
+            "observations": self.observations.tolist(),
+            "last_update_ts": self.last_update_ts,
+            "last_close": dict(self._last_close),
+            "last_ts": dict(self._last_ts),
+            "pending": {str(ts): dict(r) for ts, r in self._pending.items()}
+        }
+
+    def save_checkpoint(self):
+        """Durumu hemen diske yaz"""
+        self._write_state(self._state())
+
+    def _write_state(self, state: Dict[str, Any]):
+        """Durumu diske yaz (atomik)"""
+        try:
+            directory = os.path.dirname(self.checkpoint_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.checkpoint_path)
+        except Exception as e:
+            print(f"[COV ERROR] Checkpoint yazılamadı: {e}")
+
+    def load_checkpoint(self) -> bool:
+        """Diskteki durumu yükle"""
+        if not os.path.exists(self.checkpoint_path):
+            return False
+
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+
+            if state.get("decay") != self.decay:
+                print(f"[COV] Checkpoint decay farklı ({state.get('decay')}), yok sayıldı")
+                return False
+
+            self.symbols = list(state["symbols"])
+            self._index = {s: i for i, s in enumerate(self.symbols)}
+            self.cov = np.array(state["cov"], dtype=float).reshape(len(self.symbols), len(self.symbols))
+            self.observations = np.array(state["observations"], dtype=np.int64)
+            self.last_update_ts = state["last_update_ts"]
+            self._last_close = {s: float(v) for s, v in state["last_close"].items()}
+            self._last_ts = {s: int(v) for s, v in state["last_ts"].items()}
+            self._pending = {int(ts): r for ts, r in state.get("pending", {}).items()}
+
+            print(f"[COV] Checkpoint yüklendi: {len(self.symbols)} sembol")
+            return True
+
+        except Exception as e:
+            print(f"[COV ERROR] Checkpoint okunamadı: {e}")
+            return False
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "symbols": self.symbols,
+            "observations": dict(zip(self.symbols, self.observations.tolist())),
+            "correlation": self.correlation_matrix().round(4).tolist() if self.symbols else []
+        }
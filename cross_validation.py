@@ -0,0 +1,196 @@
+# cross_validation.py - Purged combinatorial cross-validation (CPCV)
+
+"""
+Geçmiş veri K ardışık gruba bölünür; her k'lı grup kombinasyonu bir kez test
+kümesi olur (C(K, k) bölme). Test sınırlarının önündeki `purge` bar ve
+arkasındaki `embargo` bar eğitim kümesinden çıkarılır; böylece indikatör
+penceresi / açık pozisyon üzerinden test verisi eğitime sızmaz.
+
+Her varyantın bar getirileri bir kez hesaplanır ve kümülatif toplamları
+(log getiri, getiri, getiri²) saklanır. Herhangi bir bölmenin eğitim/test
+istatistiği, kümenin ardışık parçalarının uç noktalarındaki farklardan O(1)
+ile çıkar; yüzlerce bölme tek bir backtest maliyetine yakın kalır.
+
+Her bölmede eğitimde en iyi Sharpe'a sahip varyant seçilir ve test
+performansı kaydedilir (gerçek out-of-sample seçim). Seçilen varyantın
+testteki sırası medyanın altındaysa bölme "overfit" sayılır; oranı PBO'dur
+(probability of backtest overfitting).
+"""
+
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from backtest_engine import extract_trades
+from strategies import signal_series
+
+Segment = Tuple[int, int]  # [start, end)
+
+def position_series(signals: np.ndarray) -> np.ndarray:
+    """
+    Sinyallerden her barın kapanışından sonra taşınan pozisyon (+1 long, -1 short, 0 nakit).
+    backtest_engine ile aynı kurallar: giriş barının kapanışında girilir, çıkış
+    barının kapanışında çıkılır; getiri giriş sonrası bardan çıkış barına kadar işler.
+    """
+    n = len(signals)
+    entries, exits, directions = extract_trades(signals)
+    change = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(change, entries, directions)
+    np.add.at(change, exits, -directions.astype(np.int64))
+
+    # Kapanmamış son pozisyon seri sonuna kadar taşınır
+    idx = np.flatnonzero(signals)
+    if len(idx):
+        last_exit = exits[-1] if len(exits) else -1
+        open_idx = idx[idx > last_exit]
+        if len(open_idx):
+            change[open_idx[0]] += signals[open_idx[0]]
+
+    return np.cumsum(change[:n]).astype(np.int8)
+
+def bar_returns(close: np.ndarray, signals: np.ndarray, fee_rate: float = 0.001) -> np.ndarray:
+    """Stratejinin bar getirileri; pozisyon her değiştiğinde fee_rate kadar komisyon düşülür"""
+    close = np.asarray(close, dtype=float)
+    position = position_series(signals)
+
+    returns = np.zeros(len(close))
+    returns[1:] = position[:-1] * (close[1:] / close[:-1] - 1)
+    turnover = np.abs(np.diff(position, prepend=0))
+    returns -= turnover * fee_rate
+    return returns
+
+class PrefixStats:
+    """Varyant x bar getiri matrisinin kümülatif toplamları"""
+
+    def __init__(self, returns: np.ndarray):
+        returns = np.atleast_2d(np.asarray(returns, dtype=float))
+        zeros = np.zeros((returns.shape[0], 1))
+        self.n_bars = returns.shape[1]
+        self.log = np.hstack([zeros, np.cumsum(np.log1p(np.maximum(returns, -0.999999)), axis=1)])
+        self.s1 = np.hstack([zeros, np.cumsum(returns, axis=1)])
+        self.s2 = np.hstack([zeros, np.cumsum(returns ** 2, axis=1)])
+
+    def stats(self, segments: List[Segment], periods_per_year: float) -> Dict[str, np.ndarray]:
+        """Parçaların birleşimi için her varyantın toplam getirisi ve Sharpe'ı"""
+        if not segments:
+            empty = np.full(self.s1.shape[0], np.nan)
+            return {"return": empty, "sharpe": empty, "bars": 0}
+
+        starts = np.array([s for s, _ in segments])
+        ends = np.array([e for _, e in segments])
+        bars = int((ends - starts).sum())
+
+        log_sum = (self.log[:, ends] - self.log[:, starts]).sum(axis=1)
+        s1 = (self.s1[:, ends] - self.s1[:, starts]).sum(axis=1)
+        s2 = (self.s2[:, ends] - self.s2[:, starts]).sum(axis=1)
+
+        mean = s1 / bars
+        std = np.sqrt(np.maximum(s2 / bars - mean ** 2, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), 0.0)
+
+        return {"return": np.expm1(log_sum), "sharpe": sharpe, "bars": bars}
+
+def _merge(segments: List[Segment]) -> List[Segment]:
+    merged = []
+    for start, end in sorted(segments):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def cpcv_splits(n_bars: int, n_groups: int = 6, n_test_groups: int = 2, purge: int = 0,
+                embargo: int = 0, start: int = 0) -> List[Dict[str, Any]]:
+    """
+    [start, n_bars) aralığını n_groups gruba böl ve tüm test kombinasyonları için
+    (test parçaları, purge/embargo uygulanmış eğitim parçaları) üret.
+    """
+    edges = np.linspace(start, n_bars, n_groups + 1).astype(int)
+    groups = list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+    splits = []
+    for test_ids in combinations(range(n_groups), n_test_groups):
+        test = _merge([groups[g] for g in test_ids])
+
+        # Eğitimden çıkarılacak aralıklar: test + önündeki purge + arkasındaki embargo
+        excluded = _merge([(max(start, s - purge), min(n_bars, e + embargo)) for s, e in test])
+        train, cursor = [], start
+        for s, e in excluded:
+            if s > cursor:
+                train.append((cursor, s))
+            cursor = max(cursor, e)
+        if cursor < n_bars:
+            train.append((cursor, n_bars))
+
+        splits.append({"test_groups": test_ids, "test": test, "train": train})
+    return splits
+
+def combinatorial_purged_cv(returns: np.ndarray, names: List[str], n_groups: int = 6,
+                            n_test_groups: int = 2, purge: int = 50, embargo: Optional[int] = None,
+                            start: int = 0, periods_per_year: float = 365 * 24) -> Dict[str, Any]:
+    """
+    returns: (varyant x bar) bar getirileri. Her bölmede eğitim Sharpe'ı en iyi
+    varyant seçilir ve test sonucu raporlanır.
+    embargo verilmezse toplam barın %1'i kullanılır.
+    """
+    returns = np.atleast_2d(returns)
+    n_variants, n_bars = returns.shape
+    if embargo is None:
+        embargo = max(1, int((n_bars - start) * 0.01))
+
+    prefix = PrefixStats(returns)
+    splits = cpcv_splits(n_bars, n_groups, n_test_groups, purge, embargo, start)
+
+    folds = []
+    test_sharpes = np.empty((len(splits), n_variants))
+    for k, split in enumerate(splits):
+        train = prefix.stats(split["train"], periods_per_year)
+        test = prefix.stats(split["test"], periods_per_year)
+        test_sharpes[k] = test["sharpe"]
+
+        best = int(np.argmax(train["sharpe"]))
+        # Seçilen varyantın testteki göreli sırası (0 = en kötü, 1 = en iyi)
+        rank = (test["sharpe"] < test["sharpe"][best]).sum() / max(n_variants - 1, 1)
+
+        folds.append({
+            "test_groups": split["test_groups"],
+            "train_bars": train["bars"],
+            "test_bars": test["bars"],
+            "selected": names[best],
+            "train_sharpe": float(train["sharpe"][best]),
+            "test_sharpe": float(test["sharpe"][best]),
+            "test_return_pct": float(test["return"][best] * 100),
+            "test_rank": float(rank)
+        })
+
+    oos_sharpe = np.array([f["test_sharpe"] for f in folds])
+    oos_return = np.array([f["test_return_pct"] for f in folds])
+    ranks = np.array([f["test_rank"] for f in folds])
+
+    return {
+        "n_splits": len(splits),
+        "n_variants": n_variants,
+        "purge": purge,
+        "embargo": embargo,
+        "oos_sharpe_mean": float(oos_sharpe.mean()),
+        "oos_sharpe_std": float(oos_sharpe.std()),
+        "oos_return_mean_pct": float(oos_return.mean()),
+        "oos_positive_ratio": float((oos_return > 0).mean()),
+        "pbo": float((ranks < 0.5).mean()) if n_variants > 1 else None,
+        "variant_test_sharpe_mean": dict(zip(names, test_sharpes.mean(axis=0).tolist())),
+        "folds": folds
+    }
+
+def strategy_returns_matrix(strategies: List[Dict], close: np.ndarray,
+                            fee_rate: float = 0.001) -> Tuple[List[str], np.ndarray]:
+    """Strateji listesi için (isimler, varyant x bar getiri matrisi)"""
+    names, rows = [], []
+    for strategy in strategies:
+        try:
+            signals = signal_series(strategy["name"], close, **strategy.get("parameters", {}))
+        except ValueError:
+            continue
+        names.append(strategy["name"])
+        rows.append(bar_returns(close, signals, fee_rate))
+    return names, np.array(rows).reshape(len(rows), len(close))
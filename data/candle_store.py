@@ -0,0 +1,286 @@
+# data/candle_store.py
+
+import os
+import sqlite3
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from data.fetch_binance import fetch_binance_ohlcv
+from scheduler import interval_to_seconds, next_candle_close
+
+DEFAULT_DB_PATH = os.getenv("CANDLE_STORE_PATH", "data/candles.db")
+
+class CandleStore:
+    """
+    Yerel SQLite mum deposu.
+    Binance'ten bir kez çekilen mumlar burada tutulur; tarama ve backtestler
+    her sembol için ağa gitmek yerine buradan toplu okur.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS candles (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, interval, ts)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_candles_interval_ts ON candles (interval, ts)")
+        conn.commit()
+
+    # --- Yazma ---
+
+    def upsert(self, symbol: str, interval: str, ohlcv: List[Dict]) -> int:
+        """Mumları ekle veya güncelle (son mum kapanmamış olabilir)"""
+        rows = [
+            (symbol, interval, int(c["timestamp"]), c["open"], c["high"], c["low"], c["close"], c["volume"])
+            for c in ohlcv
+        ]
+        if not rows:
+            return 0
+
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+        return len(rows)
+
+    def sync(self, symbol: str, interval: str = "1h", limit: int = 500) -> int:
+        """Sadece son kayıtlı mumdan sonrasını Binance'ten çek"""
+        last_ts = self.last_timestamp(symbol, interval)
+        if last_ts is None:
+            ohlcv = fetch_binance_ohlcv(symbol, interval, limit=limit)
+        else:
+            ohlcv = fetch_binance_ohlcv(symbol, interval, limit=1000, start_time=last_ts)
+        return self.upsert(symbol, interval, ohlcv)
+
+    def backfill(self, symbol: str, interval: str = "1h", start_ts: int = 0) -> int:
+        """
+        start_ts'ten depodaki ilk muma kadar olan geçmişi 1000'erlik sayfalarla çek.
+        sync sadece son mumdan ileriye gittiği için eski geçmiş bununla doldurulur;
+        depo boşsa son muma kadar çekilir.
+        """
+        first_ts = self.first_timestamp(symbol, interval)
+        end_ts = first_ts - 1 if first_ts is not None else None
+        cursor, total = int(start_ts), 0
+        while end_ts is None or cursor <= end_ts:
+            ohlcv = fetch_binance_ohlcv(symbol, interval, limit=1000, start_time=cursor, end_time=end_ts)
+            total += self.upsert(symbol, interval, ohlcv)
+            if len(ohlcv) < 1000:
+                break
+            cursor = int(ohlcv[-1]["timestamp"]) + 1
+        return total
+
+    def sync_many(self, symbols: List[str], interval: str = "1h", limit: int = 500,
+                  max_workers: int = 8) -> Dict[str, int]:
+        """Birden fazla sembolü paralel senkronize et"""
+        results = {}
+
+        def run(symbol):
+            try:
+                return symbol, self.sync(symbol, interval, limit)
+            except Exception as e:
+                print(f"[STORE ERROR] {symbol} senkronize edilemedi: {e}")
+                return symbol, 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for symbol, count in pool.map(run, symbols):
+                results[symbol] = count
+
+        return results
+
+    # --- Okuma ---
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT MAX(ts) FROM candles WHERE symbol = ? AND interval = ?", (symbol, interval)
+        ).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def first_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT MIN(ts) FROM candles WHERE symbol = ? AND interval = ?", (symbol, interval)
+        ).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def symbols(self, interval: str = "1h", quote: Optional[str] = "USDT") -> List[str]:
+        rows = self._conn().execute(
+            "SELECT DISTINCT symbol FROM candles WHERE interval = ? ORDER BY symbol", (interval,)
+        ).fetchall()
+        symbols = [r[0] for r in rows]
+        if quote:
+            symbols = [s for s in symbols if s.endswith(f"/{quote}")]
+        return symbols
+
+    def load(self, symbol: str, interval: str = "1h", limit: int = 500) -> List[Dict]:
+        """Bir sembolün son `limit` mumu (fetch_binance_ohlcv ile aynı format)"""
+        rows = self._conn().execute(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE symbol = ? AND interval = ? ORDER BY ts DESC LIMIT ?",
+            (symbol, interval, limit)
+        ).fetchall()
+        return [
+            {"timestamp": ts, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for ts, o, h, l, c, v in reversed(rows)
+        ]
+
+    @staticmethod
+    def last_closed_open_ts(interval: str, now: Optional[float] = None) -> int:
+        """Kapanmış son mumun açılış zamanı (ms); sync'in sakladığı açık mum bundan sonradır"""
+        return int((next_candle_close(interval, now) - 2 * interval_to_seconds(interval)) * 1000)
+
+    def load_matrix(self, symbols: Optional[List[str]] = None, interval: str = "1h",
+                    limit: int = 500, field: str = "close") -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Son `limit` kapanmış barı tek sorguda (semboller x barlar) matrisine yükle.
+        Tüm semboller aynı zaman eksenine hizalanır (portföy backtest'i için);
+        eksik barlar NaN olarak kalır.
+        Dönüş: (semboller, zaman damgaları, matris)
+        """
+        if field not in ("open", "high", "low", "close", "volume"):
+            raise ValueError(f"Geçersiz alan: {field}")
+
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT MAX(ts) FROM candles WHERE interval = ? AND ts <= ?",
+            (interval, self.last_closed_open_ts(interval))
+        ).fetchone()
+        if not row or row[0] is None:
+            return [], np.empty(0, dtype=np.int64), np.empty((0, 0))
+
+        step = interval_to_seconds(interval) * 1000
+        timestamps = row[0] - step * np.arange(limit - 1, -1, -1, dtype=np.int64)
+
+        rows = conn.execute(
+            f"SELECT symbol, ts, {field} FROM candles WHERE interval = ? AND ts >= ? AND ts <= ?",
+            (interval, int(timestamps[0]), int(timestamps[-1]))
+        ).fetchall()
+
+        if symbols is None:
+            symbols = sorted({r[0] for r in rows})
+        index = {s: i for i, s in enumerate(symbols)}
+
+        matrix = np.full((len(symbols), limit), np.nan)
+        if rows:
+            sym_col = np.fromiter((index.get(r[0], -1) for r in rows), dtype=np.int64, count=len(rows))
+            ts_col = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+            val_col = np.fromiter((r[2] for r in rows), dtype=float, count=len(rows))
+
+            bar_col = (ts_col - timestamps[0]) // step
+            valid = (sym_col >= 0) & (bar_col >= 0) & (bar_col < limit)
+            matrix[sym_col[valid], bar_col[valid]] = val_col[valid]
+
+        return list(symbols), timestamps, matrix
+
+    def load_latest_matrix(self, symbols: Optional[List[str]] = None, interval: str = "1h",
+                           limit: int = 500, field: str = "close"
+                           ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Her sembolün kendi son `limit` kapanmış barını (semboller x barlar) matrisine yükle.
+        Pencere sembolün kendi son barına hizalanır; bir sembolün daha yeni bir barı
+        olması diğerlerini eksik göstermez. Sembol içindeki boşluklar NaN kalır.
+        Dönüş: (semboller, her sembolün son bar zamanı (yoksa -1), matris)
+        """
+        if field not in ("open", "high", "low", "close", "volume"):
+            raise ValueError(f"Geçersiz alan: {field}")
+
+        step = interval_to_seconds(interval) * 1000
+        rows = self._conn().execute(
+            f"SELECT c.symbol, c.ts, c.{field}, m.last_ts FROM candles c "
+            "JOIN (SELECT symbol, MAX(ts) AS last_ts FROM candles "
+            "      WHERE interval = ? AND ts <= ? GROUP BY symbol) m ON c.symbol = m.symbol "
+            "WHERE c.interval = ? AND c.ts > m.last_ts - ? AND c.ts <= m.last_ts",
+            (interval, self.last_closed_open_ts(interval), interval, limit * step)
+        ).fetchall()
+
+        if symbols is None:
+            symbols = sorted({r[0] for r in rows})
+        index = {s: i for i, s in enumerate(symbols)}
+
+        matrix = np.full((len(symbols), limit), np.nan)
+        last_ts = np.full(len(symbols), -1, dtype=np.int64)
+        if rows:
+            sym_col = np.fromiter((index.get(r[0], -1) for r in rows), dtype=np.int64, count=len(rows))
+            ts_col = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+            val_col = np.fromiter((r[2] for r in rows), dtype=float, count=len(rows))
+            end_col = np.fromiter((r[3] for r in rows), dtype=np.int64, count=len(rows))
+
+            bar_col = limit - 1 - (end_col - ts_col) // step
+            valid = (sym_col >= 0) & (bar_col >= 0)
+            matrix[sym_col[valid], bar_col[valid]] = val_col[valid]
+            last_ts[sym_col[valid]] = end_col[valid]
+
+        return list(symbols), last_ts, matrix
+
+    def count(self, symbol: str, interval: str = "1h", start_ts: Optional[int] = None,
+              end_ts: Optional[int] = None) -> int:
+        """[start_ts, end_ts] aralığındaki mum sayısı"""
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM candles WHERE symbol = ? AND interval = ? AND ts >= ? AND ts <= ?",
+            (symbol, interval, start_ts if start_ts is not None else -1,
+             end_ts if end_ts is not None else 2 ** 62)
+        ).fetchone()
+        return row[0]
+
+    def iter_chunks(self, symbol: str, interval: str = "1h", chunk_size: int = 100_000,
+                    start_ts: Optional[int] = None, end_ts: Optional[int] = None
+                    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Bir sembolün mumlarını eskiden yeniye chunk_size'lık bloklar halinde oku.
+        Her blok alan adı -> dizi sözlüğüdür ("timestamp" int64, diğerleri float).
+        Sayfalama son zaman damgasından devam ettiği için (OFFSET yok) her sorgu
+        indeksten okur; bellekte aynı anda tek blok bulunur.
+        """
+        conn = self._conn()
+        last_ts = start_ts - 1 if start_ts is not None else -1
+        end_ts = end_ts if end_ts is not None else 2 ** 62
+        while True:
+            rows = conn.execute(
+                "SELECT ts, open, high, low, close, volume FROM candles "
+                "WHERE symbol = ? AND interval = ? AND ts > ? AND ts <= ? ORDER BY ts LIMIT ?",
+                (symbol, interval, last_ts, end_ts, chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+
+            values = np.array(rows, dtype=float)
+            chunk = {"timestamp": np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))}
+            for col, field in enumerate(("open", "high", "low", "close", "volume"), start=1):
+                chunk[field] = values[:, col]
+            del rows, values
+            last_ts = int(chunk["timestamp"][-1])
+            yield chunk
+            if len(chunk["timestamp"]) < chunk_size:
+                return
+
+# Varsayılan depo
+candle_store = None
+
+def get_candle_store() -> CandleStore:
+    global candle_store
+    if candle_store is None:
+        candle_store = CandleStore()
+    return candle_store
@@ -1,16 +1,34 @@
+import threading
 import requests
+import metrics
 
-def fetch_binance_ohlcv(symbol="BTC/USDT", interval="1h", limit=500):
+KLINES_URL = "https://api.binance.com/api/v3/klines"
+EXCHANGE_INFO_URL = "https://api.binance.com/api/v3/exchangeInfo"
+
+# Bağlantılar döngüler arasında yeniden kullanılır (keep-alive)
+_session = requests.Session()
+
+# (symbol, interval) -> son mumlar; daemon modunda tam yeniden çekmeyi önler
+_candle_cache = {}
+_cache_lock = threading.Lock()
+
+@metrics.timed("binance.fetch_ohlcv")
+def fetch_binance_ohlcv(symbol="BTC/USDT", interval="1h", limit=500, start_time=None, end_time=None):
     # Binance API, slash yerine bitişik format bekliyor
     symbol = symbol.replace("/", "")
 
-    url = "https://api.binance.com/api/v3/klines"
     params = {
         "symbol": symbol,
         "interval": interval,
         "limit": limit
     }
-    r = requests.get(url, params=params)
+    if start_time is not None:
+        params["startTime"] = int(start_time)
+    if end_time is not None:
+        params["endTime"] = int(end_time)
+
+    metrics.count("binance.requests")
+    r = _session.get(KLINES_URL, params=params, timeout=10)
     r.raise_for_status()
     data = r.json()
 
@@ -26,3 +44,42 @@ def fetch_binance_ohlcv(symbol="BTC/USDT", interval="1h", limit=500):
         for item in data
     ]
     return ohlcv
+
+def fetch_usdt_symbols():
+    """İşlemde olan tüm USDT spot çiftleri (BTC/USDT formatında)"""
+    metrics.count("binance.requests")
+    r = _session.get(EXCHANGE_INFO_URL, timeout=30)
+    r.raise_for_status()
+    return sorted(
+        f"{s['baseAsset']}/{s['quoteAsset']}"
+        for s in r.json()["symbols"]
+        if s["quoteAsset"] == "USDT" and s["status"] == "TRADING"
+    )
+
+def fetch_binance_ohlcv_cached(symbol="BTC/USDT", interval="1h", limit=500):
+    """
+    Son `limit` mumu döndürür; ilk çağrıdan sonra sadece son bilinen mumdan
+    itibaren olanları çeker ve cache ile birleştirir.
+    Son mum (henüz kapanmamış olabilir) her seferinde yenisiyle değiştirilir.
+    """
+    key = (symbol, interval)
+
+    with _cache_lock:
+        cached = _candle_cache.get(key)
+
+    if not cached or len(cached) < limit:
+        candles = fetch_binance_ohlcv(symbol, interval, limit=limit)
+    else:
+        new_candles = fetch_binance_ohlcv(symbol, interval, limit=1000,
+                                          start_time=cached[-1]["timestamp"])
+        if len(new_candles) >= 1000:
+            # Aradaki boşluk çok büyük, baştan çek
+            new_candles = fetch_binance_ohlcv(symbol, interval, limit=limit)
+        first_new = new_candles[0]["timestamp"] if new_candles else None
+        candles = [c for c in cached if first_new is None or c["timestamp"] < first_new] + new_candles
+        candles = candles[-limit:]
+
+    with _cache_lock:
+        _candle_cache[key] = candles
+
+    return list(candles)
@@ -1,89 +1,165 @@
 # db.py
-from supabase import create_client, Client
-from dotenv import load_dotenv
 import os
-from typing import Optional, Dict, Any
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Set
+import metrics
 
-load_dotenv()
+_client = None
+_client_lock = threading.Lock()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise Exception("SUPABASE_URL veya SUPABASE_KEY .env içinde tanımlı değil")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def get_client():
+    """
+    Paylaşılan Supabase client'ı (ilk kullanımda oluşturulur).
+    Böylece DB'ye ihtiyaç duymayan modlar bağlantı ve env değişkeni olmadan açılır.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from dotenv import load_dotenv
+                from supabase import create_client
+
+                load_dotenv()
+                url = os.getenv("SUPABASE_URL")
+                key = os.getenv("SUPABASE_KEY")
+                if not url or not key:
+                    raise Exception("SUPABASE_URL veya SUPABASE_KEY .env içinde tanımlı değil")
+
+                _client = create_client(url, key)
+    return _client
+
+def __getattr__(name):
+    # Eski `from db import supabase` kullanımları için
+    if name == "supabase":
+        return get_client()
+    raise AttributeError(f"module 'db' has no attribute '{name}'")
 
 # --- Assets ---
 
+@metrics.timed("db.get_asset_id")
 def get_asset_id(symbol: str):
-    response = supabase.table("assets").select("id").eq("symbol", symbol).execute()
+    response = get_client().table("assets").select("id").eq("symbol", symbol).execute()
     # debug çıktısı (gerektiğinde yorum satırı yap)
     print(f"[DEBUG] get_asset_id select response for symbol '{symbol}': {response.data}")
     if response.data and len(response.data) > 0:
         return response.data[0]['id']
     else:
-        insert_resp = supabase.table("assets").insert({"symbol": symbol, "name": symbol}).execute()
+        insert_resp = get_client().table("assets").insert({"symbol": symbol, "name": symbol}).execute()
         print(f"[DEBUG] get_asset_id insert response: {insert_resp.data}")
         if insert_resp.data and len(insert_resp.data) > 0:
             return insert_resp.data[0]['id']
         else:
             raise Exception("Asset eklenirken hata oluştu")
 
+@metrics.timed("db.get_assets")
 def get_assets():
-    res = supabase.table("assets").select("*").execute()
+    res = get_client().table("assets").select("*").execute()
     return res.data
 
+@metrics.timed("db.get_asset_by_symbol")
 def get_asset_by_symbol(symbol: str) -> Optional[Dict[str, Any]]:
-    res = supabase.table("assets").select("*").eq("symbol", symbol).limit(1).execute()
+    res = get_client().table("assets").select("*").eq("symbol", symbol).limit(1).execute()
     data = res.data
     return data[0] if data else None
 
+@metrics.timed("db.create_asset")
 def create_asset(symbol: str, name: str = ""):
     payload = {"symbol": symbol, "name": name}
-    return supabase.table("assets").insert(payload).execute()
+    res = get_client().table("assets").insert(payload).execute()
+    metrics.count("db.rows_written")
+    return res
 
 # --- Strategies ---
 
+@metrics.timed("db.get_strategies")
 def get_strategies():
-    res = supabase.table("strategies").select("*").execute()
+    res = get_client().table("strategies").select("*").execute()
     return res.data
 
+@metrics.timed("db.get_strategy_by_name")
 def get_strategy_by_name(name: str):
-    res = supabase.table("strategies").select("*").eq("name", name).limit(1).execute()
+    res = get_client().table("strategies").select("*").eq("name", name).limit(1).execute()
     data = res.data
     return data[0] if data else None
 
+@metrics.timed("db.create_strategy")
 def create_strategy(name: str, description: str = "", parameters: dict = None):
     payload = {"name": name, "description": description, "parameters": parameters or {}}
-    return supabase.table("strategies").insert(payload).execute()
-
-def update_strategy_performance(strategy_id: str, performance_score: float):
+    res = get_client().table("strategies").insert(payload).execute()
+    metrics.count("db.rows_written")
+    return res
+
+@metrics.timed("db.get_strategy_names")
+def get_strategy_names(page_size: int = 1000) -> Set[str]:
+    """Kayıtlı tüm strateji isimleri (PostgREST satır limiti için sayfalı okunur)"""
+    names = set()
+    start = 0
+    while True:
+        res = get_client().table("strategies").select("name").order("name") \
+            .range(start, start + page_size - 1).execute()
+        names.update(row["name"] for row in res.data)
+        if len(res.data) < page_size:
+            return names
+        start += page_size
+
+@metrics.timed("db.upsert_strategies")
+def upsert_strategies(rows: List[Dict[str, Any]], chunk_size: int = 500) -> int:
     """
-    strategies.performance_score ve last_backtested değerlerini günceller
+    Stratejileri `name` üzerinde toplu upsert eder (var olanlar değişmez).
+    Her chunk tek bir istektir. on_conflict="name", strategies.name üzerinde
+    unique index gerektirir (README: Veritabanı Şeması).
     """
-    payload = {
-        "performance_score": performance_score,
-        "last_backtested": "now()"
-    }
-    # note: using RPC-like expression for now() is not supported via insert, so use raw SQL
-    sql = f"""
-    UPDATE public.strategies
-    SET performance_score = {performance_score}, last_backtested = timezone('utc'::text, now())
-    WHERE id = '{strategy_id}';
-    """
-    # execute raw SQL
-    return supabase.rpc("sql", {"q": sql}) if False else supabase.postgrest.send("POST", "/rpc/sql", json={"q": sql})  # fallback, may not work in all clients
-
-# Safer generic update using PostgREST:
-def update_strategy_performance_simple(strategy_id: str, performance_score: float):
-    return supabase.table("strategies").update({
+    client = get_client()
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        client.table("strategies").upsert(chunk, on_conflict="name", ignore_duplicates=True).execute()
+        metrics.count("db.rows_written", len(chunk))
+    return len(rows)
+
+@metrics.timed("db.update_strategy_performance")
+def update_strategy_performance(strategy_id: str, performance_score: float):
+    """strategies.performance_score ve last_backtested değerlerini günceller"""
+    res = get_client().table("strategies").update({
         "performance_score": performance_score,
-        "last_backtested": None  # we'll set last_backtested with SQL below if needed
+        "last_backtested": datetime.now(timezone.utc).isoformat()
     }).eq("id", strategy_id).execute()
+    metrics.count("db.rows_written")
+    return res
+
+@metrics.timed("db.update_strategy_performances")
+def update_strategy_performances(scores: List[Dict[str, Any]], chunk_size: int = 500) -> int:
+    """
+    Birden fazla stratejinin performance_score'unu chunk başına iki istekle günceller.
+    scores: [{"id": ..., "name": ..., "performance_score": ...}, ...]
+    Önce chunk'taki id'lerden hâlâ var olanlar seçilir, sadece onlar `id` üzerinde
+    upsert edilir; böylece bu arada silinmiş stratejiler için yeni satır oluşmaz.
+    Sadece gönderilen sütunlar güncellenir (name, NOT NULL kısıtı için gönderilir).
+    Dönüş: güncellenen strateji sayısı.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {"id": s["id"], "name": s["name"], "performance_score": float(s["performance_score"]),
+         "last_backtested": now}
+        for s in scores
+    ]
+    client = get_client()
+    updated = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        existing = client.table("strategies").select("id").in_("id", [r["id"] for r in chunk]).execute()
+        existing_ids = {str(r["id"]) for r in existing.data or []}
+        chunk = [r for r in chunk if str(r["id"]) in existing_ids]
+        if not chunk:
+            continue
+        client.table("strategies").upsert(chunk, on_conflict="id").execute()
+        metrics.count("db.rows_written", len(chunk))
+        updated += len(chunk)
+    return updated
 
 # --- Backtests / Results helper ---
 
+@metrics.timed("db.insert_backtest_result")
 def insert_backtest_result(strategy_id: str, symbol: str, profit_loss: float, win_rate: float, trades_count: int):
     payload = {
         "strategy_id": strategy_id,
@@ -92,10 +168,13 @@ def insert_backtest_result(strategy_id: str, symbol: str, profit_loss: float, wi
         "win_rate": win_rate,
         "trades_count": trades_count
     }
-    return supabase.table("backtests").insert(payload).execute()
+    res = get_client().table("backtests").insert(payload).execute()
+    metrics.count("db.rows_written")
+    return res
 
 # --- Signals & Trades ---
 
+@metrics.timed("db.insert_signal")
 def insert_signal(signal_dict: dict):
     # Eğer 'symbol' verilirse asset_id'ye çevir
     if "symbol" in signal_dict:
@@ -113,10 +192,18 @@ def insert_signal(signal_dict: dict):
         print("[DEBUG] signal_dict içinde 'symbol' yok")
 
     # Eğer rsi_value / sma_value gelmiyorsa bırak (DB nullable ise sorun yok)
-    return supabase.table("signals").insert(signal_dict).execute()
+    res = get_client().table("signals").insert(signal_dict).execute()
+    metrics.count("db.rows_written")
+    return res
 
+@metrics.timed("db.insert_trade")
 def insert_trade(trade_dict: dict):
-    return supabase.table("trades").insert(trade_dict).execute()
+    res = get_client().table("trades").insert(trade_dict).execute()
+    metrics.count("db.rows_written")
+    return res
 
+@metrics.timed("db.insert_result")
 def insert_result(result_dict: dict):
-    return supabase.table("results").insert(result_dict).execute()
+    res = get_client().table("results").insert(result_dict).execute()
+    metrics.count("db.rows_written")
+    return res
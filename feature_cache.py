@@ -0,0 +1,118 @@
+# feature_cache.py
+
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Tuple
+import metrics
+import indicators
+
+def closes_from_ohlcv(ohlcv) -> np.ndarray:
+    """OHLCV listesinden (dict veya liste formatı) kapanış dizisi"""
+    if len(ohlcv) == 0:
+        return np.empty(0)
+    if isinstance(ohlcv[0], dict):
+        return np.fromiter((c["close"] for c in ohlcv), dtype=float, count=len(ohlcv))
+    return np.fromiter((c[4] for c in ohlcv), dtype=float, count=len(ohlcv))
+
+# İndikatör adı -> kapanış dizisinden tam seri hesaplayan fonksiyon
+INDICATORS: Dict[str, Callable[..., np.ndarray]] = {
+    "rsi": indicators.rsi,
+    "sma": indicators.sma,
+    "ema": indicators.ema
+}
+
+def compute_feature(indicator: str, close: np.ndarray, **params) -> np.ndarray:
+    """Cache kullanmadan indikatör serisini hesapla"""
+    return INDICATORS[indicator](close, **params)
+
+class FeatureCache:
+    """
+    (symbol, interval, indicator, params) anahtarlı indikatör serisi cache'i.
+
+    Her seri, hesaplandığı barların imzasıyla (uzunluk, ilk/son zaman damgası,
+    son kapanış) saklanır; yeni bar gelene kadar aynı indikatörü isteyen tüm
+    strateji varyantları aynı diziyi paylaşır. Toplam bellek max_bytes'ı
+    aşınca en az kullanılan girdiler atılır.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[Tuple, np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _bar_signature(ohlcv) -> Tuple:
+        first, last = ohlcv[0], ohlcv[-1]
+        if isinstance(last, dict):
+            return (len(ohlcv), first["timestamp"], last["timestamp"], last["close"])
+        return (len(ohlcv), first[0], last[0], last[4])
+
+    def get(self, symbol: str, interval: str, indicator: str, ohlcv, **params) -> np.ndarray:
+        """İndikatör serisini döndür; bu bar için daha önce hesaplandıysa yeniden hesaplama"""
+        if len(ohlcv) == 0:
+            return np.empty(0)
+
+        key = (symbol, interval, indicator, tuple(sorted(params.items())))
+        signature = self._bar_signature(ohlcv)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.count("feature_cache.hits")
+                return entry[1]
+
+        if indicator == "close":
+            values = closes_from_ohlcv(ohlcv)
+        else:
+            close = self.get(symbol, interval, "close", ohlcv)
+            with metrics.span(f"indicators.{indicator}"):
+                values = compute_feature(indicator, close, **params)
+        values.flags.writeable = False  # Paylaşılan dizi, yanlışlıkla değiştirilmesin
+
+        with self._lock:
+            self.misses += 1
+            metrics.count("feature_cache.misses")
+            self._store(key, signature, values)
+
+        return values
+
+    def _store(self, key, signature, values: np.ndarray):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1].nbytes
+
+        self._entries[key] = (signature, values)
+        self._bytes += values.nbytes
+
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+# Tüm stratejilerin paylaştığı cache
+feature_cache = FeatureCache()
@@ -0,0 +1,232 @@
+# indicators.py
+"""
+NumPy tabanlı teknik indikatörler.
+
+Tüm fonksiyonlar 1-D (tek seri) veya 2-D (semboller x barlar) dizi kabul eder;
+zaman ekseni her zaman son eksendir. Böylece aynı kod hem tek sembol hem de
+yüzlerce sembollük bir matris için tek çağrıda çalışır.
+
+sma, ema ve rsi periyot listesi de kabul eder; sonuç periyotlar için yeni bir
+ilk eksende döner:
+
+    rsi(close, [7, 14, 21])  # close (n,) -> (3, n), close (k, n) -> (3, k, n)
+
+Değerler pandas_ta (0.4.x, TA-Lib olmadan) ile aynı tanımları kullanır:
+ilk geçerli değerden önceki barlar NaN'dır.
+"""
+
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+Period = Union[int, Sequence[int]]
+
+_lfilter = None
+
+def _get_lfilter():
+    """scipy.signal.lfilter (ağır import, ilk kullanımda yüklenir; scipy opsiyonel)"""
+    global _lfilter
+    if _lfilter is None:
+        try:
+            from scipy.signal import lfilter
+            _lfilter = lfilter
+        except ImportError:  # scipy yoksa döngüye düş
+            _lfilter = False
+    return _lfilter
+
+def _as_float_array(x) -> np.ndarray:
+    return np.asarray(x, dtype=float)
+
+def _is_multi(period) -> bool:
+    return np.ndim(period) > 0
+
+def ewm_recursive(x: np.ndarray, alpha: float, prev=None) -> np.ndarray:
+    """
+    y[0] = x[0], y[t] = (1 - alpha) * y[t-1] + alpha * x[t]
+    (pandas ewm(alpha=alpha, adjust=False) ile aynı, son eksen boyunca)
+    prev verilirse seri önceki bir parçanın son değeri prev'den devam eder:
+    y[0] = (1 - alpha) * prev + alpha * x[0]
+    """
+    x = _as_float_array(x)
+    if x.shape[-1] == 0:
+        return x.copy()
+
+    decay = 1.0 - alpha
+    lfilter = _get_lfilter()
+    if lfilter:
+        zi = decay * (x[..., :1] if prev is None else np.reshape(prev, x.shape[:-1] + (1,)))
+        return lfilter([alpha], [1.0, -decay], x, axis=-1, zi=zi)[0]
+
+    y = np.empty_like(x)
+    y[..., 0] = x[..., 0] if prev is None else decay * prev + alpha * x[..., 0]
+    for t in range(1, x.shape[-1]):
+        y[..., t] = decay * y[..., t - 1] + alpha * x[..., t]
+    return y
+
+# --- Hareketli ortalamalar ---
+
+def sma(close, period: Period) -> np.ndarray:
+    """Basit hareketli ortalama; ilk period-1 bar NaN"""
+    close = _as_float_array(close)
+    if _is_multi(period):
+        return np.stack([sma(close, p) for p in period])
+
+    out = np.full(close.shape, np.nan)
+    n = close.shape[-1]
+    if period <= 0 or n < period:
+        return out
+
+    # Hassasiyet için ilk değere göre ötelenmiş kümülatif toplam
+    base = close[..., :1]
+    csum = np.cumsum(close - base, axis=-1)
+    window_sum = csum[..., period - 1:].copy()
+    window_sum[..., 1:] -= csum[..., :-period]
+    out[..., period - 1:] = window_sum / period + base
+    return out
+
+def ema(close, period: Period = 10) -> np.ndarray:
+    """
+    Üssel hareketli ortalama (alpha = 2 / (period + 1)).
+    TA-Lib gibi ilk değer, ilk `period` barın SMA'sıdır; öncesi NaN.
+    """
+    close = _as_float_array(close)
+    if _is_multi(period):
+        return np.stack([ema(close, p) for p in period])
+
+    out = np.full(close.shape, np.nan)
+    n = close.shape[-1]
+    if period <= 0 or n < period:
+        return out
+
+    seeded = close[..., period - 1:].copy()
+    seeded[..., 0] = close[..., :period].mean(axis=-1)
+    out[..., period - 1:] = ewm_recursive(seeded, 2.0 / (period + 1))
+    return out
+
+def rma(x, period: int) -> np.ndarray:
+    """Wilder hareketli ortalaması (alpha = 1 / period, ilk değer x[0])"""
+    return ewm_recursive(x, 1.0 / period)
+
+# --- Momentum ---
+
+def rsi(close, period: Period = 14) -> np.ndarray:
+    """
+    Wilder RSI (pandas_ta.rsi ile aynı RMA yumuşatması).
+    İlk `period` bar NaN döner.
+    """
+    close = _as_float_array(close)
+    n = close.shape[-1]
+
+    # Kazanç/kayıp serileri tüm periyotlar için bir kez hesaplanır
+    delta = np.diff(close, axis=-1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    def single(p: int) -> np.ndarray:
+        out = np.full(close.shape, np.nan)
+        if p <= 0 or n <= p:
+            return out
+
+        avg_gain = rma(gain, p)
+        avg_loss = rma(loss, p)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = 100.0 * avg_gain / (avg_gain + avg_loss)
+
+        out[..., p:] = values[..., p - 1:]
+        return out
+
+    if _is_multi(period):
+        return np.stack([single(p) for p in period])
+    return single(period)
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    MACD çizgisi, sinyal çizgisi ve histogram (macd, signal, histogram).
+    Sinyal EMA'sı MACD'nin ilk geçerli değerinden itibaren hesaplanır.
+    """
+    close = _as_float_array(close)
+    if slow < fast:
+        fast, slow = slow, fast
+
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = np.full(close.shape, np.nan)
+    if close.shape[-1] >= slow:
+        signal_line[..., slow - 1:] = ema(line[..., slow - 1:], signal)
+
+    return line, signal_line, line - signal_line
+
+# --- Volatilite ---
+
+def rolling_std(close, period: int, ddof: int = 1) -> np.ndarray:
+    """Kayan pencere standart sapması; ilk period-1 bar NaN"""
+    close = _as_float_array(close)
+    out = np.full(close.shape, np.nan)
+    if period <= 0 or close.shape[-1] < period:
+        return out
+
+    windows = np.lib.stride_tricks.sliding_window_view(close, period, axis=-1)
+    out[..., period - 1:] = windows.std(axis=-1, ddof=ddof)
+    return out
+
+def bollinger_bands(close, period: int = 20, num_std: float = 2.0,
+                    ddof: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger bantları (lower, mid, upper); orta bant SMA"""
+    mid = sma(close, period)
+    width = num_std * rolling_std(close, period, ddof)
+    return mid - width, mid, mid + width
+
+def true_range(high, low, close) -> np.ndarray:
+    """max(high - low, |high - önceki close|, |önceki close - low|); ilk bar high - low"""
+    high, low, close = _as_float_array(high), _as_float_array(low), _as_float_array(close)
+    tr = high - low
+    prev_close = close[..., :-1]
+    tr[..., 1:] = np.maximum.reduce([tr[..., 1:],
+                                     np.abs(high[..., 1:] - prev_close),
+                                     np.abs(prev_close - low[..., 1:])])
+    return tr
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """
+    Average True Range (Wilder RMA). İlk değer ilk `period` true range'in
+    ortalamasıdır; öncesi NaN.
+    """
+    tr = true_range(high, low, close)
+    out = np.full(tr.shape, np.nan)
+    if period <= 0 or tr.shape[-1] < period:
+        return out
+
+    seeded = tr[..., period - 1:].copy()
+    seeded[..., 0] = tr[..., :period].mean(axis=-1)
+    out[..., period - 1:] = rma(seeded, period)
+    return out
+
+# --- Hacim ---
+
+def vwap(high, low, close, volume, timestamps: Optional[np.ndarray] = None,
+         anchor_ms: int = 24 * 60 * 60 * 1000) -> np.ndarray:
+    """
+    Hacim ağırlıklı ortalama fiyat (tipik fiyat = (high + low + close) / 3).
+    timestamps (ms) verilirse her anchor_ms periyodunda (varsayılan: UTC gün)
+    sıfırlanır, verilmezse tüm seri boyunca kümülatiftir.
+    """
+    high, low, close = _as_float_array(high), _as_float_array(low), _as_float_array(close)
+    volume = _as_float_array(volume)
+
+    wp = np.cumsum((high + low + close) / 3.0 * volume, axis=-1)
+    vol = np.cumsum(volume, axis=-1)
+
+    if timestamps is not None and wp.shape[-1] > 0:
+        period_id = np.asarray(timestamps, dtype=np.int64) // anchor_ms
+        starts = np.flatnonzero(np.diff(period_id)) + 1
+        if starts.size:
+            # Her bar için, içinde bulunduğu periyottan önceki kümülatif toplam
+            segment = np.searchsorted(starts, np.arange(wp.shape[-1]), side="right")
+            offsets = np.concatenate(([-1], starts - 1))[segment]
+            has_prev = offsets >= 0
+            wp_prev = np.where(has_prev, wp[..., offsets], 0.0)
+            vol_prev = np.where(has_prev, vol[..., offsets], 0.0)
+            wp = wp - wp_prev
+            vol = vol - vol_prev
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return wp / vol
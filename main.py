@@ -2,28 +2,35 @@
 
 from dotenv import load_dotenv
 import os
-from data.fetch_binance import fetch_binance_ohlcv
+from data.fetch_binance import fetch_binance_ohlcv_cached
 from strategies.rsi_strategy import compute_rsi_signal
 from strategies.sma_crossover import compute_sma_crossover_signal
+from strategies.ml_strategy import compute_ml_signals
 from db import insert_signal, get_strategy_by_name
 from send_signal import send_telegram_message
-from risk_manager import risk_manager
-from paper_trading import paper_trader
+from risk_manager import get_risk_manager
+from paper_trading import get_paper_trader
+import metrics
 import json
 from datetime import datetime
 import time
 
 load_dotenv()
 
-def run_strategy_analysis(symbol="BTC/USDT", limit=500):
-    """Tek bir symbol için tüm stratejileri çalıştır"""
+@metrics.timed("cycle.strategy_analysis")
+def run_strategy_analysis(symbol="BTC/USDT", limit=500, interval="1h", ohlcv=None, ml_result=None):
+    """
+    Tek bir symbol için tüm stratejileri çalıştır.
+    ohlcv ve ml_result verilirse (run_multiple_assets toplu tahmini) yeniden çekilmez/hesaplanmaz.
+    """
     print(f"\n{'='*50}")
     print(f"[ANALYSIS] {symbol} analizi başlatılıyor...")
     print(f"{'='*50}")
     
     # Fiyat verilerini çek
-    print("[DATA] Fiyatlar çekiliyor...")
-    ohlcv = fetch_binance_ohlcv(symbol, "1h", limit=limit)
+    if ohlcv is None:
+        print("[DATA] Fiyatlar çekiliyor...")
+        ohlcv = fetch_binance_ohlcv_cached(symbol, interval, limit=limit)
     print(f"[DATA] {len(ohlcv)} veri noktası alındı")
     
     if not ohlcv or len(ohlcv) < 50:
@@ -33,6 +40,11 @@ def run_strategy_analysis(symbol="BTC/USDT", limit=500):
     last_price = ohlcv[-1]["close"]
     asset_symbol = symbol.split("/")[0]  # BTC/USDT -> BTC
     
+    # Risk motorunun getiri matrisini ve portföy durumunu karar yolundan önce güncelle
+    risk_manager = get_risk_manager()
+    risk_manager.update_market_data(asset_symbol, ohlcv, interval)
+    risk_manager.refresh_state()
+    
     strategies_results = []
     
     # 1. RSI Stratejisi
@@ -42,7 +54,7 @@ def run_strategy_analysis(symbol="BTC/USDT", limit=500):
         params = rsi_strategy.get("parameters", {})
         rsi_period = params.get("rsi_period", 14)
         
-        rsi_signal, rsi_value = compute_rsi_signal(ohlcv, rsi_period=rsi_period)
+        rsi_signal, rsi_value = compute_rsi_signal(ohlcv, rsi_period=rsi_period, cache_key=(symbol, interval))
         
         # Confidence hesapla (RSI'nin ekstrem değerlere yakınlığına göre)
         if rsi_value > 70:
@@ -71,7 +83,7 @@ def run_strategy_analysis(symbol="BTC/USDT", limit=500):
         long_period = params.get("long_period", 50)
         
         sma_signal, sma_value = compute_sma_crossover_signal(
-            ohlcv, short_period=short_period, long_period=long_period
+            ohlcv, short_period=short_period, long_period=long_period, cache_key=(symbol, interval)
         )
         
         # SMA confidence (fiyatın SMA'lardan uzaklığına göre)
@@ -91,7 +103,14 @@ def run_strategy_analysis(symbol="BTC/USDT", limit=500):
         
         print(f"[SMA] Sinyal: {sma_signal} | Değer: {sma_value:.2f} | Güven: {confidence:.2f}")
     
-    # 3. En güvenilir sinyali seç (en yüksek confidence)
+    # 3. ML Stratejisi (eğitilmiş model varsa; güven = seçilen sınıfın olasılığı)
+    if ml_result is None:
+        ml_result = compute_ml_signals({symbol: ohlcv}, interval).get(symbol)
+    if ml_result:
+        strategies_results.append(dict(ml_result, name='ML'))
+        print(f"[ML] Sinyal: {ml_result['signal']} | Skor: {ml_result['value']:.2f} | Güven: {ml_result['confidence']:.2f}")
+    
+    # 4. En güvenilir sinyali seç (en yüksek confidence)
     print(f"\n[SIGNAL SELECTION] En iyi sinyal seçiliyor...")
     
     # Sadece buy/sell sinyallerini değerlendir
@@ -104,29 +123,32 @@ def run_strategy_analysis(symbol="BTC/USDT", limit=500):
         for strategy_result in strategies_results:
             save_signal_to_db(asset_symbol, strategy_result, last_price)
         
-        send_telegram_message(f"📊 {symbol}\n🔄 Tüm stratejiler HOLD sinyali\n💰 Fiyat: ${last_price:.2f}")
+        send_telegram_message(f"📊 {symbol}\n🔄 Tüm stratejiler HOLD sinyali\n💰 Fiyat: ${last_price:.2f}", coalesce=True)
         return
     
     # En yüksek confidence'a sahip stratejiyi seç
     best_strategy = max(actionable_signals, key=lambda x: x['confidence'])
     print(f"[BEST] {best_strategy['name']} seçildi - Sinyal: {best_strategy['signal']} | Güven: {best_strategy['confidence']:.2f}")
     
-    # 4. Risk Kontrolü ve Paper Trade Execution
+    # 5. Risk Kontrolü ve Paper Trade Execution
     if best_strategy['confidence'] >= 0.6:  # Minimum güven eşiği
-        execute_paper_trade(asset_symbol, best_strategy, last_price)
+        execute_paper_trade(asset_symbol, best_strategy, last_price, interval)
     else:
         print(f"[SKIP] Confidence çok düşük ({best_strategy['confidence']:.2f}), trade atlandı.")
     
-    # 5. Tüm sinyalleri kaydet
+    # 6. Tüm sinyalleri kaydet
     for strategy_result in strategies_results:
         save_signal_to_db(asset_symbol, strategy_result, last_price)
     
-    # 6. Portföy durumunu raporla
+    # 7. Portföy durumunu raporla
     print_portfolio_summary()
 
-def execute_paper_trade(asset_symbol, strategy_result, current_price):
+@metrics.timed("cycle.execute_paper_trade")
+def execute_paper_trade(asset_symbol, strategy_result, current_price, interval="1h"):
     """Paper trade gerçekleştir"""
     print(f"\n[TRADE EXECUTION] {strategy_result['name']} stratejisi ile işlem...")
+    risk_manager = get_risk_manager()
+    paper_trader = get_paper_trader()
     
     # Risk kontrolü için position size hesapla
     portfolio_value = paper_trader.calculate_total_portfolio_value()
@@ -144,9 +166,12 @@ def execute_paper_trade(asset_symbol, strategy_result, current_price):
         asset_symbol=asset_symbol,
         quantity=suggested_quantity,
         price=current_price,
-        confidence=strategy_result['confidence']
+        confidence=strategy_result['confidence'],
+        interval=interval
     )
     
+    print(f"[RISK] Karar süresi: {risk_check['latency_ms']:.3f}ms")
+    
     if not risk_check['approved']:
         print(f"[RISK REJECTED] Trade reddedildi:")
         for reason in risk_check['reasons']:
@@ -182,6 +207,15 @@ def execute_paper_trade(asset_symbol, strategy_result, current_price):
     if trade_result['success']:
         print(f"[SUCCESS] Trade başarılı! ID: {trade_result['trade_id']}")
         
+        # Risk yöneticisinin bellekteki durumunu güncelle
+        risk_manager.on_trade_executed(
+            asset_symbol,
+            strategy_result['signal'],
+            trade_result['executed_quantity'],
+            trade_result['executed_price'],
+            trade_result['new_cash_balance']
+        )
+        
         # Telegram bilgilendirmesi
         emoji = "🟢" if strategy_result['signal'] == 'buy' else "🔴"
         pnl_text = f"\n💵 P&L: ${trade_result.get('pnl', 0):.2f}" if 'pnl' in trade_result else ""
@@ -209,6 +243,7 @@ def execute_paper_trade(asset_symbol, strategy_result, current_price):
             f"🔸 Hata: {trade_result['error']}"
         )
 
+@metrics.timed("cycle.save_signal")
 def save_signal_to_db(asset_symbol, strategy_result, price):
     """Sinyal verisini veritabanına kaydet"""
     signal_payload = {
@@ -231,7 +266,7 @@ def print_portfolio_summary():
     """Portföy özetini yazdır"""
     print(f"\n{'='*30} PORTFÖY ÖZETİ {'='*30}")
     
-    summary = paper_trader.get_portfolio_summary()
+    summary = get_paper_trader().get_portfolio_summary()
     
     print(f"💰 Toplam Değer: ${summary['total_value']:.2f}")
     print(f"💵 Nakit: ${summary['cash_balance']:.2f} ({summary['cash_ratio']:.1%})")
@@ -247,7 +282,7 @@ def print_portfolio_summary():
             print(f"    📊 P&L: ${pos['unrealized_pnl']:.2f} ({pos['unrealized_pnl_pct']:.2f}%)")
     
     # Risk özeti
-    risk_summary = risk_manager.get_risk_summary()
+    risk_summary = get_risk_manager().get_risk_summary()
     print(f"\n⚠️ Risk Durumu:")
     print(f"  Günlük Kayıp: ${risk_summary['daily_loss']:.2f} ({risk_summary['daily_loss_pct']:.2%})")
     print(f"  Kalan Risk: ${risk_summary['remaining_daily_risk']:.2f}")
@@ -255,24 +290,43 @@ def print_portfolio_summary():
     
     print(f"{'='*70}")
 
-def run_multiple_assets():
+def run_multiple_assets(interval="1h"):
     """Birden fazla varlık için analiz"""
     assets = ["BTC/USDT", "ETH/USDT", "BNB/USDT"]
     
+    # Korelasyon takibi için tüm varlıkları birlikte kaydet
+    get_risk_manager().watch_symbols([asset.split("/")[0] for asset in assets], interval)
+    
+    # Veriler bir kez çekilir; ML modeli tüm varlıkları tek predict çağrısıyla değerlendirir
+    ohlcv_by_asset = {}
     for asset in assets:
         try:
-            run_strategy_analysis(asset)
+            ohlcv_by_asset[asset] = fetch_binance_ohlcv_cached(asset, interval, limit=500)
+        except Exception as e:
+            print(f"[ERROR] {asset} verisi çekilemedi: {e}")
+    ml_results = compute_ml_signals(ohlcv_by_asset, interval)
+    
+    for asset in assets:
+        try:
+            run_strategy_analysis(asset, interval=interval, ohlcv=ohlcv_by_asset.get(asset),
+                                  ml_result=ml_results.get(asset))
             time.sleep(2)  # API rate limit için bekleme
         except Exception as e:
             print(f"[ERROR] {asset} analizi sırasında hata: {e}")
             continue
+    
+    # Döngü metriklerini dışa aktar
+    metrics.export_cycle()
 
-def main():
+def main(interval="1h"):
     """Ana fonksiyon"""
     print(f"🚀 Investment Agent başlatılıyor - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Tek asset için çalıştır
-    run_strategy_analysis("BTC/USDT")
+    run_strategy_analysis("BTC/USDT", interval=interval)
+    
+    # Döngü metriklerini dışa aktar
+    metrics.export_cycle()
     
     # Çoklu asset için çalıştırmak istersen:
     # run_multiple_assets()
@@ -0,0 +1,197 @@
+# metrics.py
+"""
+Karar döngüsü için hafif zamanlayıcı/sayaç altyapısı.
+
+    with metrics.span("binance.fetch_ohlcv"):
+        ...
+
+    @metrics.timed("db.insert_signal")
+    def insert_signal(...): ...
+
+    metrics.count("db.rows_written", 3)
+    metrics.export_cycle()  # Döngü sonunda Prometheus text veya JSON dosyası
+
+Kapalıyken span() paylaşılan boş bir context manager döndürür ve timed()
+sarmalayıcısı tek bir bayrak kontrolüyle orijinal fonksiyonu çağırır.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Saniye cinsinden histogram kovaları
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "investment_agent"
+
+_enabled = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+_export_path: Optional[str] = os.getenv("METRICS_EXPORT") or None
+_lock = threading.Lock()
+_histograms: Dict[str, Dict[str, Any]] = {}
+_counters: Dict[str, float] = {}
+
+def enable(export_path: Optional[str] = None):
+    """Ölçümü aç; export_path verilirse her döngü sonunda oraya yazılır (.json veya .prom)"""
+    global _enabled, _export_path
+    _enabled = True
+    if export_path:
+        _export_path = export_path
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled() -> bool:
+    return _enabled
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def observe(stage: str, seconds: float):
+    """Bir aşamanın süresini histograma ekle"""
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0, "max": 0.0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+                break
+        hist["count"] += 1
+        hist["sum"] += seconds
+        if seconds > hist["max"]:
+            hist["max"] = seconds
+
+def count(name: str, value: float = 1):
+    """Sayaç artır (istek, retry, yazılan satır vb.)"""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            count(f"{self.stage}.errors")
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoopSpan()
+
+def span(stage: str):
+    """Bir kod bloğunun süresini ölç"""
+    return _Span(stage) if _enabled else _NOOP
+
+def timed(stage: str):
+    """Fonksiyon süresini ölçen dekoratör"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# --- Export ---
+
+def _quantile(hist: Dict[str, Any], q: float) -> float:
+    """Kova sınırlarından yaklaşık kantil"""
+    target = q * hist["count"]
+    cumulative = 0
+    for bound, n in zip(BUCKETS, hist["buckets"]):
+        cumulative += n
+        if cumulative >= target:
+            return bound
+    return hist["max"]
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        stages = {}
+        for stage, hist in _histograms.items():
+            stages[stage] = {
+                "count": hist["count"],
+                "sum_seconds": hist["sum"],
+                "mean_seconds": hist["sum"] / hist["count"] if hist["count"] else 0.0,
+                "max_seconds": hist["max"],
+                "p50_seconds": _quantile(hist, 0.50),
+                "p99_seconds": _quantile(hist, 0.99),
+                "buckets": dict(zip([str(b) for b in BUCKETS], hist["buckets"]))
+            }
+        return {
+            "generated_at": time.time(),
+            "stages": stages,
+            "counters": dict(_counters)
+        }
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+def to_prometheus() -> str:
+    """Prometheus text exposition formatı"""
+    lines = [
+        f"# HELP {PREFIX}_stage_seconds Aşama gecikmeleri",
+        f"# TYPE {PREFIX}_stage_seconds histogram"
+    ]
+    with _lock:
+        for stage, hist in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, hist["buckets"]):
+                cumulative += n
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist["count"]}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {hist["sum"]:.9f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {hist["count"]}')
+
+        for name, value in sorted(_counters.items()):
+            metric = f"{PREFIX}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+    return "\n".join(lines) + "\n"
+
+def export(path: str):
+    """Metrikleri dosyaya yaz (.json ise JSON, aksi halde Prometheus text)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    content = json.dumps(snapshot(), indent=2) if path.endswith(".json") else to_prometheus()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def export_cycle():
+    """Döngü sonunda, ölçüm açıksa ve hedef dosya tanımlıysa export et"""
+    if not _enabled or not _export_path:
+        return
+    try:
+        export(_export_path)
+        print(f"[METRICS] Metrikler yazıldı: {_export_path}")
+    except Exception as e:
+        print(f"[METRICS ERROR] {e}")
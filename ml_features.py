@@ -0,0 +1,310 @@
+# ml_features.py - ML sinyalleri için artımlı özellik (feature) hattı
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import indicators
+
+RETURN_LAGS = (1, 3, 6, 12, 24)
+RSI_PERIOD = 14
+SMA_PERIODS = (10, 50)
+ATR_PERIOD = 14
+WINDOW = 24  # Volatilite ve hacim z-skoru penceresi
+
+FEATURE_NAMES = (
+    tuple(f"ret_{k}" for k in RETURN_LAGS)
+    + (f"rsi_{RSI_PERIOD}",)
+    + tuple(f"sma_{p}_dist" for p in SMA_PERIODS)
+    + (f"atr_{ATR_PERIOD}_pct", f"volatility_{WINDOW}", f"volume_z_{WINDOW}")
+)
+N_FEATURES = len(FEATURE_NAMES)
+
+# Artımlı güncelleme için tutulan son kapanış sayısı
+_CLOSE_HISTORY = max(max(SMA_PERIODS), max(RETURN_LAGS) + 1)
+
+def ohlcv_arrays(ohlcv: List[Dict]) -> Tuple[np.ndarray, ...]:
+    """(timestamp, high, low, close, volume) dizileri"""
+    n = len(ohlcv)
+    timestamps = np.fromiter((c["timestamp"] for c in ohlcv), dtype=np.int64, count=n)
+    high, low, close, volume = (np.fromiter((c[k] for c in ohlcv), dtype=float, count=n)
+                                for k in ("high", "low", "close", "volume"))
+    return timestamps, high, low, close, volume
+
+def compute_features(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                     volume: np.ndarray) -> np.ndarray:
+    """
+    Tüm geçmiş için (barlar x özellikler) matrisi; pencere dolmadan önceki
+    değerler NaN'dır. FeatureStream.update bar bar aynı değerleri üretir.
+    """
+    n = len(close)
+    out = np.full((n, N_FEATURES), np.nan)
+    col = 0
+
+    for k in RETURN_LAGS:
+        if n > k:
+            out[k:, col] = close[k:] / close[:-k] - 1
+        col += 1
+
+    out[:, col] = indicators.rsi(close, RSI_PERIOD)
+    col += 1
+
+    for p in SMA_PERIODS:
+        out[:, col] = close / indicators.sma(close, p) - 1
+        col += 1
+
+    out[:, col] = indicators.atr(high, low, close, ATR_PERIOD) / close
+    col += 1
+
+    log_returns = np.full(n, np.nan)
+    log_returns[1:] = np.diff(np.log(close))
+    out[:, col] = indicators.rolling_std(log_returns, WINDOW)
+    col += 1
+
+    mean = indicators.sma(volume, WINDOW)
+    std = indicators.rolling_std(volume, WINDOW)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[:, col] = np.where(std > 0, (volume - mean) / std, np.where(np.isnan(std), np.nan, 0.0))
+    return out
+
+class FeatureStream:
+    """
+    Tek sembolün özellik matrisi. Geçmiş bir kez vektörel hesaplanır; sonra her
+    yeni bar sadece son pencere ve Wilder ortalamalarının durumundan tek satır
+    olarak eklenir (geçmiş yeniden hesaplanmaz). Aynı zaman damgalı bar tekrar
+    gelirse (kapanmamış son mum) son satır önceki durumdan yeniden hesaplanır.
+    """
+
+    def __init__(self, max_rows: int = 5000):
+        self.max_rows = max_rows
+        self._rows = np.empty((64, N_FEATURES))
+        self._timestamps = np.empty(64, dtype=np.int64)
+        self._size = 0
+
+        self._count = 0            # Görülen bar sayısı
+        self._closes = deque(maxlen=_CLOSE_HISTORY)
+        self._log_returns = deque(maxlen=WINDOW)
+        self._volumes = deque(maxlen=WINDOW)
+        self._avg_gain = self._avg_loss = 0.0
+        self._atr = 0.0            # Isınmada true range toplamı, sonra ATR
+        self._snapshot = None      # Son bardan önceki durum
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._rows[:self._size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self._size]
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._timestamps[self._size - 1]) if self._size else None
+
+    @property
+    def latest(self) -> np.ndarray:
+        return self._rows[self._size - 1]
+
+    @classmethod
+    def from_candles(cls, ohlcv: List[Dict], max_rows: int = 5000) -> "FeatureStream":
+        """Son bar hariç geçmiş vektörel hesaplanır, son bar update ile eklenir"""
+        stream = cls(max_rows)
+        if not ohlcv:
+            return stream
+
+        timestamps, high, low, close, volume = ohlcv_arrays(ohlcv[:-1])
+        features = compute_features(high, low, close, volume)
+        stream._append_rows(timestamps[-max_rows:], features[-max_rows:])
+        stream._load_state(high, low, close, volume)
+        stream.update(ohlcv[-1])
+        return stream
+
+    def _load_state(self, high, low, close, volume):
+        """Vektörel hesaplanan geçmişin sonundaki artımlı durum"""
+        n = len(close)
+        self._count = n
+        self._closes.extend(close[-_CLOSE_HISTORY:])
+        self._volumes.extend(volume[-WINDOW:])
+        if n > 1:
+            delta = np.diff(close)
+            self._log_returns.extend(np.diff(np.log(close[-(WINDOW + 1):])))
+            self._avg_gain = float(indicators.rma(np.where(delta > 0, delta, 0.0), RSI_PERIOD)[-1])
+            self._avg_loss = float(indicators.rma(np.where(delta < 0, -delta, 0.0), RSI_PERIOD)[-1])
+        if n >= ATR_PERIOD:
+            self._atr = float(indicators.atr(high, low, close, ATR_PERIOD)[-1])
+        elif n:
+            self._atr = float(indicators.true_range(high, low, close).sum())
+
+    def _state(self):
+        return (self._count, self._closes.copy(), self._log_returns.copy(), self._volumes.copy(),
+                self._avg_gain, self._avg_loss, self._atr)
+
+    def _restore(self, state):
+        (self._count, self._closes, self._log_returns, self._volumes,
+         self._avg_gain, self._avg_loss, self._atr) = state
+
+    def update(self, candle: Dict) -> np.ndarray:
+        """Yeni barın özellik satırını ekle (veya aynı zaman damgalı son barı yenile)"""
+        timestamp = int(candle["timestamp"])
+        if self._size and timestamp == self.last_timestamp and self._snapshot is not None:
+            self._restore(self._snapshot)
+            self._size -= 1
+        elif self._size and timestamp < self.last_timestamp:
+            return self.latest
+
+        self._snapshot = self._state()
+        row = self._step(float(candle["high"]), float(candle["low"]), float(candle["close"]),
+                         float(candle["volume"]))
+        self._append_rows(np.array([timestamp]), row[None, :])
+        return row
+
+    def extend(self, ohlcv: List[Dict]) -> int:
+        """Son kayıtlı bardan itibaren olan barları ekle; eklenen/yenilenen satır sayısı"""
+        last = self.last_timestamp
+        new = [c for c in ohlcv if last is None or c["timestamp"] >= last]
+        for candle in new:
+            self.update(candle)
+        return len(new)
+
+    def _step(self, high: float, low: float, close: float, volume: float) -> np.ndarray:
+        row = np.full(N_FEATURES, np.nan)
+        t = self._count
+        closes = self._closes
+        prev_close = closes[-1] if closes else None
+
+        # Wilder ortalamaları (indicators.rsi / atr ile aynı özyineleme)
+        if prev_close is not None:
+            delta = close - prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if t == 1:
+                self._avg_gain, self._avg_loss = gain, loss
+            else:
+                decay = 1.0 - 1.0 / RSI_PERIOD
+                self._avg_gain = decay * self._avg_gain + gain / RSI_PERIOD
+                self._avg_loss = decay * self._avg_loss + loss / RSI_PERIOD
+            self._log_returns.append(np.log(close / prev_close))
+            tr = max(high - low, abs(high - prev_close), abs(prev_close - low))
+        else:
+            tr = high - low
+
+        if t < ATR_PERIOD - 1:
+            self._atr += tr
+        elif t == ATR_PERIOD - 1:
+            self._atr = (self._atr + tr) / ATR_PERIOD
+        else:
+            self._atr = (1.0 - 1.0 / ATR_PERIOD) * self._atr + tr / ATR_PERIOD
+
+        closes.append(close)
+        self._volumes.append(volume)
+        self._count = t + 1
+
+        col = 0
+        for k in RETURN_LAGS:
+            if t >= k:
+                row[col] = close / closes[-(k + 1)] - 1
+            col += 1
+
+        if t >= RSI_PERIOD:
+            total = self._avg_gain + self._avg_loss
+            row[col] = 100.0 * self._avg_gain / total if total > 0 else np.nan
+        col += 1
+
+        for p in SMA_PERIODS:
+            if t >= p - 1:
+                row[col] = close / np.mean(list(closes)[-p:]) - 1
+            col += 1
+
+        if t >= ATR_PERIOD - 1:
+            row[col] = self._atr / close
+        col += 1
+
+        if t >= WINDOW:
+            row[col] = np.std(self._log_returns, ddof=1)
+        col += 1
+
+        if t >= WINDOW - 1:
+            volumes = np.fromiter(self._volumes, dtype=float, count=WINDOW)
+            std = volumes.std(ddof=1)
+            row[col] = (volume - volumes.mean()) / std if std > 0 else 0.0
+        return row
+
+    def _append_rows(self, timestamps: np.ndarray, rows: np.ndarray):
+        needed = self._size + len(rows)
+        if needed > len(self._rows):
+            if needed > 2 * self.max_rows:
+                # Sınırsız büyümesin: en eski satırlar atılır
+                drop = needed - self.max_rows
+                self._rows[:self._size - drop] = self._rows[drop:self._size]
+                self._timestamps[:self._size - drop] = self._timestamps[drop:self._size]
+                self._size -= drop
+            else:
+                capacity = max(needed, 2 * len(self._rows))
+                grown = np.empty((capacity, N_FEATURES))
+                grown[:self._size] = self._rows[:self._size]
+                grown_ts = np.empty(capacity, dtype=np.int64)
+                grown_ts[:self._size] = self._timestamps[:self._size]
+                self._rows, self._timestamps = grown, grown_ts
+
+        self._rows[self._size:self._size + len(rows)] = rows
+        self._timestamps[self._size:self._size + len(rows)] = timestamps
+        self._size += len(rows)
+
+class FeaturePipeline:
+    """
+    (sembol, zaman dilimi) başına FeatureStream. İlk görülen sembolün geçmişi bir
+    kez hesaplanır, sonraki döngülerde sadece yeni barlar eklenir. latest() tüm
+    izlenen sembollerin son satırlarını tek matriste döndürür (toplu predict için).
+    """
+
+    def __init__(self, max_rows: int = 5000):
+        self.max_rows = max_rows
+        self._streams: Dict[Tuple[str, str], FeatureStream] = {}
+        self._lock = threading.Lock()
+
+    def update(self, symbol: str, ohlcv: List[Dict], interval: str = "1h") -> FeatureStream:
+        key = (symbol, interval)
+        with self._lock:
+            stream = self._streams.get(key)
+            # Arada eksik bar varsa (uzun kesinti) geçmiş baştan hesaplanır
+            if stream is None or not ohlcv or stream.last_timestamp is None \
+                    or ohlcv[0]["timestamp"] > stream.last_timestamp:
+                stream = FeatureStream.from_candles(ohlcv, self.max_rows)
+                self._streams[key] = stream
+            else:
+                stream.extend(ohlcv)
+            return stream
+
+    def update_from_store(self, symbols: List[str], interval: str = "1h", limit: int = 1000):
+        """Sembolleri yerel mum deposundan yükle/güncelle"""
+        from data.candle_store import get_candle_store
+
+        store = get_candle_store()
+        for symbol in symbols:
+            ohlcv = store.load(symbol, interval, limit)
+            if ohlcv:
+                self.update(symbol, ohlcv, interval)
+
+    def latest(self, symbols: List[str], interval: str = "1h") -> Tuple[List[str], np.ndarray]:
+        """Özellik satırı olan sembollerin son satırları: (semboller, (k x özellik) matrisi)"""
+        with self._lock:
+            streams = [(s, self._streams.get((s, interval))) for s in symbols]
+        found = [(s, stream.latest) for s, stream in streams if stream is not None and len(stream)]
+        if not found:
+            return [], np.empty((0, N_FEATURES))
+        return [s for s, _ in found], np.vstack([row for _, row in found])
+
+    def stream(self, symbol: str, interval: str = "1h") -> Optional[FeatureStream]:
+        return self._streams.get((symbol, interval))
+
+_feature_pipeline: Optional[FeaturePipeline] = None
+
+def get_feature_pipeline() -> FeaturePipeline:
+    global _feature_pipeline
+    if _feature_pipeline is None:
+        _feature_pipeline = FeaturePipeline()
+    return _feature_pipeline
@@ -0,0 +1,234 @@
+# monte_carlo.py - Paralel Monte Carlo ve birleştirilebilir akış istatistikleri
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from strategies import BUY, SELL, signal_series
+
+class RunningMoments:
+    """
+    Sayı, ortalama, varyans (Chan/Welford), min/max ve pozitif sayısı.
+    Toplu güncellenir ve başka bir örnekle birleştirilebilir; bellek sabittir.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.positives = 0
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        other = RunningMoments()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min, other.max = float(values.min()), float(values.max())
+        other.positives = int((values > 0).sum())
+        self.merge(other)
+
+    def merge(self, other: "RunningMoments"):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.positives += other.positives
+
+    @property
+    def std(self) -> float:
+        """Popülasyon standart sapması (np.std ile aynı)"""
+        return float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+
+class TDigest:
+    """
+    Birleştirilebilir (merging) t-digest. Değerler tampona alınır; tampon dolunca
+    merkezlerle birlikte sıralanıp k1 ölçek fonksiyonunun (asin) tam sayı
+    aralıklarına göre gruplanır. Uçlarda merkezler küçük kaldığı için %1/%5 gibi
+    kuyruk quantile'ları hassas, toplam bellek ~compression/2 merkezdir.
+    """
+
+    def __init__(self, compression: float = 500, buffer_size: int = 10_000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []
+        self._buffered = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self._weights.sum()) + self._buffered
+
+    def add(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._buffer.append(values)
+        self._buffered += len(values)
+        if self._buffered >= self.buffer_size:
+            self._compress()
+
+    def merge(self, other: "TDigest"):
+        other._compress()
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self._compress(other._means, other._weights)
+
+    def _compress(self, extra_means: Optional[np.ndarray] = None,
+                  extra_weights: Optional[np.ndarray] = None):
+        if not self._buffered and extra_means is None:
+            return
+        means = [self._means, *self._buffer]
+        weights = [self._weights, *(np.ones(len(b)) for b in self._buffer)]
+        if extra_means is not None:
+            means.append(extra_means)
+            weights.append(extra_weights)
+        means, weights = np.concatenate(means), np.concatenate(weights)
+        self._buffer, self._buffered = [], 0
+        if len(means) == 0:
+            return
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(k)) + 1))
+        merged_weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / merged_weights
+        self._weights = merged_weights
+
+    def quantile(self, q: float) -> float:
+        self._compress()
+        if len(self._means) == 0:
+            return float("nan")
+        cumulative = np.cumsum(self._weights)
+        total = cumulative[-1]
+        centers = cumulative - self._weights / 2
+        return float(np.interp(q * total, np.concatenate(([0.0], centers, [total])),
+                               np.concatenate(([self.min], self._means, [self.max]))))
+
+    def __len__(self) -> int:
+        self._compress()
+        return len(self._means)
+
+# --- Simülasyon ---
+
+def simulate_block(returns: np.ndarray, first_price: float, strategy_name: str, params: Dict,
+                   size: int, rng: np.random.Generator, start: int = 50) -> np.ndarray:
+    """
+    `size` bootstrap fiyat yolu için toplam getiri yüzdeleri.
+    Kurallar: sadece long, al sinyalinde bakiyenin %95'iyle girilir, sat
+    sinyalinde çıkılır, ücret yok. Tüm yollar tek (size x bar) matriste işlenir.
+    """
+    n = len(returns)
+    factors = np.empty((size, n + 1))
+    factors[:, 0] = first_price
+    factors[:, 1:] = 1 + returns[rng.integers(0, n, size=(size, n))]
+    prices = np.cumprod(factors, axis=1)[:, 1:]
+    signals = signal_series(strategy_name, prices, **params)
+
+    # Her bar için o bardan itibaren ilk al/sat sinyalinin indeksi (yoksa n)
+    bars = np.arange(n)
+    next_buy = np.full((size, n + 1), n)
+    next_sell = np.full((size, n + 1), n)
+    next_buy[:, :n] = np.minimum.accumulate(np.where(signals == BUY, bars, n)[:, ::-1], axis=1)[:, ::-1]
+    next_sell[:, :n] = np.minimum.accumulate(np.where(signals == SELL, bars, n)[:, ::-1], axis=1)[:, ::-1]
+
+    rows = np.arange(size)
+    balance = np.ones(size)
+    cursor = np.full(size, min(start, n))
+    active = rows
+    # Her adımda tüm yollar bir işlem ilerler; döngü işlem sayısı kadar döner
+    while len(active):
+        entry = next_buy[active, cursor[active]]
+        exit_ = next_sell[active, np.minimum(entry + 1, n)]
+        closed = exit_ < n
+        active, entry, exit_ = active[closed], entry[closed], exit_[closed]
+        entry_price, exit_price = prices[active, entry], prices[active, exit_]
+        balance[active] += (exit_price - entry_price) / entry_price * balance[active] * 0.95
+        cursor[active] = exit_ + 1
+    return (balance - 1) * 100
+
+_worker_args: Dict[str, Any] = {}
+
+def _init_worker(returns, first_price, strategy_name, params, start):
+    _worker_args.update(returns=returns, first_price=first_price, strategy_name=strategy_name,
+                        params=params, start=start)
+
+def _run_block(task):
+    size, seed_seq, compression = task
+    a = _worker_args
+    totals = simulate_block(a["returns"], a["first_price"], a["strategy_name"], a["params"],
+                            size, np.random.default_rng(seed_seq), a["start"])
+    moments, digest = RunningMoments(), TDigest(compression)
+    moments.update(totals)
+    digest.add(totals)
+    digest._compress()
+    return moments, digest
+
+def run_monte_carlo(returns: np.ndarray, first_price: float, strategy: Dict, simulations: int = 1000,
+                    seed: Optional[int] = None, n_jobs: Optional[int] = None, block_size: int = 500,
+                    compression: float = 500, start: int = 50) -> Dict[str, Any]:
+    """
+    Simülasyonlar block_size'lık bloklara bölünür; her blok SeedSequence(seed).spawn
+    ile kendi bağımsız RNG akışını alır ve sonuçlarını RunningMoments + TDigest'e
+    katlar. Bloklar n_jobs süreçte çalışır, sketch'ler blok sırasıyla birleştirilir;
+    bu yüzden aynı seed süreç sayısından bağımsız olarak aynı sonucu verir ve
+    bellek simülasyon sayısıyla büyümez.
+    """
+    returns = np.asarray(returns, dtype=float)
+    n_blocks = -(-simulations // block_size)
+    sizes = [min(block_size, simulations - i * block_size) for i in range(n_blocks)]
+    root = np.random.SeedSequence(seed)
+    tasks = [(size, seq, compression) for size, seq in zip(sizes, root.spawn(n_blocks))]
+    init_args = (returns, first_price, strategy["name"], strategy.get("parameters", {}), start)
+
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, n_blocks))
+    moments, digest = RunningMoments(), TDigest(compression)
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        results = map(_run_block, tasks)
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp.get_context("spawn"),
+                                   initializer=_init_worker, initargs=init_args)
+        results = pool.map(_run_block, tasks)
+
+    try:
+        for block_moments, block_digest in results:
+            moments.merge(block_moments)
+            digest.merge(block_digest)
+    finally:
+        if n_jobs > 1:
+            pool.shutdown()
+
+    return {
+        "simulations": moments.count,
+        "mean_return": moments.mean,
+        "std_return": moments.std,
+        "var_95": digest.quantile(0.05),  # %95 VaR
+        "var_99": digest.quantile(0.01),  # %99 VaR
+        "median_return": digest.quantile(0.5),
+        "max_return": moments.max,
+        "min_return": moments.min,
+        "positive_scenarios": moments.positives / moments.count if moments.count else 0.0,
+        "seed": root.entropy,  # seed verilmediyse tekrar üretmek için
+        "n_jobs": n_jobs
+    }
@@ -1,50 +1,195 @@
-import pandas as pd
-from strategies import run_strategy
+# optimizer.py - Optuna ile strateji parametre optimizasyonu
+
+import os
+import hashlib
+import multiprocessing as mp
+import numpy as np
+from typing import Any, Dict, List, Optional
+from backtest_cache import make_key
 from backtest_engine import backtest_strategy
+from strategies import signal_series
+
+STUDY_DIR = "state/optuna"
+
+# Strateji tipi -> parametre: (min, max)
+SEARCH_SPACES: Dict[str, Dict[str, tuple]] = {
+    "RSI": {
+        "rsi_period": (5, 30),
+        "overbought": (60, 85),
+        "oversold": (15, 40)
+    },
+    "SMA_Crossover": {
+        "short_period": (3, 50),
+        "long_period": (20, 200)
+    }
+}
+
+DESCRIPTIONS = {
+    "RSI": "Relative Strength Index stratejisi (Optuna ile optimize edildi)",
+    "SMA_Crossover": "Kısa ve uzun SMA kesişim stratejisi (Optuna ile optimize edildi)"
+}
+
+def variant_name(strategy: str, params: Dict[str, Any]) -> str:
+    """strategy_generator ile aynı isimlendirme"""
+    return f"{strategy}_" + "_".join(f"{k}{v}" for k, v in params.items())
+
+def walk_forward_folds(n_bars: int, n_folds: int = 5, warmup: int = 200):
+    """İlk `warmup` bardan sonrasını ardışık test dilimlerine böl: [(start, end), ...]"""
+    warmup = min(warmup, n_bars // 3)
+    edges = np.linspace(warmup, n_bars, n_folds + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+def load_closes(symbol: str, interval: str, limit: int, sync: bool = True) -> np.ndarray:
+    """Kapanışları yerel mum deposundan al (gerekirse önce Binance ile senkronize et)"""
+    from data.candle_store import get_candle_store
 
-strategies_to_test = [
-    # RSI varyasyonları
-    {"name": "RSI", "params": {"period": 14, "overbought": 70, "oversold": 30}},
-    {"name": "RSI", "params": {"period": 7, "overbought": 65, "oversold": 25}},
-    {"name": "RSI", "params": {"period": 7, "overbought": 65, "oversold": 30}},
-    {"name": "RSI", "params": {"period": 7, "overbought": 65, "oversold": 35}},
-    {"name": "RSI", "params": {"period": 14, "overbought": 70, "oversold": 30}},
-    {"name": "RSI", "params": {"period": 21, "overbought": 75, "oversold": 35}},
-    # SMA Crossover varyasyonları
-    {"name": "SMA_Crossover", "params": {"short_period": 5, "long_period": 30}},
-    {"name": "SMA_Crossover", "params": {"short_period": 10, "long_period": 50}},
-    {"name": "SMA_Crossover", "params": {"short_period": 15, "long_period": 100}},
-]
-
-results = []
-
-for strat in strategies_to_test:
-    print(f"[OPT] Backtest çalıştırılıyor: {strat['name']}_{'_'.join([f'{k}{v}' for k,v in strat['params'].items()])}")
+    store = get_candle_store()
+    if sync:
+        store.sync(symbol, interval, limit)
+    ohlcv = store.load(symbol, interval, limit)
+    return np.fromiter((c["close"] for c in ohlcv), dtype=float, count=len(ohlcv))
+
+def _storage(path: str):
+    """Süreçler arası paylaşılan dosya tabanlı Optuna journal storage"""
+    from optuna.storages import JournalStorage
     try:
-        df = run_strategy(strat["name"], **strat["params"])
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:  # optuna < 4
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return JournalStorage(JournalFileBackend(path))
 
-        # Eğer veri yetersizse bu stratejiyi atla
-        if df is None or df.empty:
-            print("[SKIP] Veri yok, strateji atlandı.")
-            continue
+def _objective(trial, strategy: str, closes: np.ndarray, folds: List[tuple]):
+    import optuna
+
+    params = {}
+    for name, (low, high) in SEARCH_SPACES[strategy].items():
+        if name == "long_period":
+            low = max(low, params["short_period"] + 1)  # Uzun SMA kısadan uzun olmalı
+        params[name] = trial.suggest_int(name, low, high)
+
+    # Sinyaller tüm seri için bir kez hesaplanır, her fold kendi diliminde düz pozisyonla başlar
+    signals = signal_series(strategy, closes, **params)
+
+    fold_returns = []
+    for step, (start, end) in enumerate(folds):
+        result = backtest_strategy(closes, signals, start=start, end=end)
+        fold_returns.append(result["return_pct"])
+        trial.report(float(np.mean(fold_returns)), step)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+
+    trial.set_user_attr("fold_returns", fold_returns)
+    return float(np.mean(fold_returns))
+
+def _worker(study_name: str, storage_path: str, strategy: str, closes: np.ndarray,
+            folds: List[tuple], n_trials: int, seed: int):
+    import optuna
 
-        profit = backtest_strategy(df)
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=_storage(storage_path),
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=10, n_warmup_steps=1)
+    )
+    study.optimize(lambda trial: _objective(trial, strategy, closes, folds), n_trials=n_trials)
 
-        results.append({
-            "strategy": strat["name"],
-            "params": strat["params"],
-            "profit": profit
+def optimize_strategy(strategy: str = "RSI", symbol: str = "BTC/USDT", interval: str = "1h",
+                      limit: int = 1000, n_trials: int = 200, n_jobs: Optional[int] = None,
+                      n_folds: int = 5, top: int = 5, store: bool = True,
+                      closes: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """
+    TPE ile parametre araması. Denemeler n_jobs ayrı süreçte, ortak bir journal
+    dosyası üzerinden paralel yürür; walk-forward fold sonuçları ara değer olarak
+    raporlanır ve medyanın altında kalan denemeler erken budanır.
+    En iyi `top` konfigürasyon db.upsert_strategies ile tek istekte kaydedilir
+    (aynı isimde olanlar atlanır).
+    """
+    import optuna
+
+    if strategy not in SEARCH_SPACES:
+        raise ValueError(f"Optimize edilebilir stratejiler: {', '.join(SEARCH_SPACES)}")
+
+    if closes is None:
+        closes = load_closes(symbol, interval, limit)
+    folds = walk_forward_folds(len(closes), n_folds)
+    if len(closes) < 100 or not folds:
+        print(f"[OPT] Yetersiz veri: {len(closes)} bar")
+        return []
+
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, n_trials))
+    os.makedirs(STUDY_DIR, exist_ok=True)
+    # Çalışma adı veri ve fold düzenini içerir: farklı veriyle puanlanmış denemeler
+    # aynı çalışmaya karışmaz, aynı veriyle tekrar çalıştırınca kaldığı yerden devam eder
+    fingerprint = make_key(data=hashlib.sha256(np.ascontiguousarray(closes, dtype=float).tobytes()).hexdigest(),
+                           folds=folds)[:12]
+    study_name = f"{strategy}-{symbol.replace('/', '')}-{interval}-{fingerprint}"
+    storage_path = os.path.join(STUDY_DIR, f"{study_name}.log")
+
+    study = optuna.create_study(study_name=study_name, storage=_storage(storage_path),
+                                direction="maximize", load_if_exists=True)
+    print(f"[OPT] {study_name}: {n_trials} deneme, {n_jobs} süreç, {len(folds)} fold, {len(closes)} bar")
+
+    # Denemeleri süreçlere dağıt
+    per_worker = [n_trials // n_jobs + (1 if i < n_trials % n_jobs else 0) for i in range(n_jobs)]
+    if n_jobs == 1:
+        _worker(study_name, storage_path, strategy, closes, folds, n_trials, seed=0)
+    else:
+        ctx = mp.get_context("spawn")
+        workers = [
+            ctx.Process(target=_worker, args=(study_name, storage_path, strategy, closes,
+                                              folds, count, seed))
+            for seed, count in enumerate(per_worker) if count
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+    study = optuna.load_study(study_name=study_name, storage=_storage(storage_path))
+    completed = [t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+    pruned = sum(1 for t in study.trials if t.state == optuna.trial.TrialState.PRUNED)
+    completed.sort(key=lambda t: t.value, reverse=True)
+
+    best = []
+    for t in completed:
+        params = {key: t.params[key] for key in SEARCH_SPACES[strategy]}
+        name = variant_name(strategy, params)
+        if any(b["name"] == name for b in best):
+            continue
+        best.append({
+            "name": name,
+            "parameters": params,
+            "score": t.value,
+            "fold_returns": t.user_attrs.get("fold_returns", [])
         })
+        if len(best) >= top:
+            break
+
+    print(f"\n{'='*70}")
+    print(f"[OPT] Tamamlanan: {len(completed)} | Budanan: {pruned} | En iyi {len(best)} konfigürasyon:")
+    print(f"{'='*70}")
+    for i, b in enumerate(best):
+        folds_str = ", ".join(f"{r:+.1f}" for r in b["fold_returns"])
+        print(f"{i+1:2d}. {b['name']:<45} | Ort. getiri: {b['score']:+6.2f}% | Fold: [{folds_str}]")
+
+    if store and best:
+        store_best(strategy, best)
+
+    return best
+
+def store_best(strategy: str, best: List[Dict[str, Any]]):
+    """En iyi konfigürasyonları tek istekte strateji tablosuna ekle (varsa atla)"""
+    from db import upsert_strategies
+
+    try:
+        upsert_strategies([
+            {"name": b["name"], "description": DESCRIPTIONS.get(strategy, ""), "parameters": b["parameters"]}
+            for b in best
+        ])
+        print(f"[ADD] {len(best)} konfigürasyon kaydedildi (var olanlar atlandı).")
+    except Exception as e:
+        print(f"[OPT ERROR] Stratejiler kaydedilemedi: {e}")
 
-    except (IndexError, TypeError, ValueError) as e:
-        print(f"[ERROR] Backtest sırasında hata: {e}")
-        continue
-
-# Sonuçları sıralayıp yazdır
-results_df = pd.DataFrame(results)
-if not results_df.empty:
-    results_df = results_df.sort_values(by="profit", ascending=False)
-    print("[OPT] Optimization tamamlandı. En iyi stratejiler:")
-    print(results_df)
-else:
-    print("[OPT] Hiç başarılı strateji sonucu yok.")
+if __name__ == "__main__":
+    optimize_strategy()
@@ -3,8 +3,9 @@
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
-from db import supabase
+from db import get_client
 from data.fetch_binance import fetch_binance_ohlcv
+import metrics
 import time
 import json
 
@@ -20,7 +21,7 @@ class PaperTradingEngine:
         """Portföyü başlat"""
         try:
             # Check if portfolio already exists
-            result = supabase.table("portfolio_snapshots").select("*").order("created_at", desc=True).limit(1).execute()
+            result = get_client().table("portfolio_snapshots").select("*").order("created_at", desc=True).limit(1).execute()
             
             if not result.data:
                 # Create initial portfolio
@@ -31,7 +32,7 @@ class PaperTradingEngine:
                     "created_at": datetime.now().isoformat()
                 }
                 
-                supabase.table("portfolio_snapshots").insert(initial_portfolio).execute()
+                get_client().table("portfolio_snapshots").insert(initial_portfolio).execute()
                 print(f"[PAPER] Portföy başlatıldı: ${self.initial_balance}")
             else:
                 print(f"[PAPER] Mevcut portföy bulundu: ${result.data[0]['total_value']}")
@@ -54,7 +55,7 @@ class PaperTradingEngine:
     def get_portfolio_positions(self) -> Dict[str, Any]:
         """Mevcut portföy pozisyonlarını al"""
         try:
-            result = supabase.table("portfolio_positions").select("*").execute()
+            result = get_client().table("portfolio_positions").select("*").execute()
             positions = {}
             
             for pos in result.data:
@@ -74,7 +75,7 @@ class PaperTradingEngine:
     def get_cash_balance(self) -> float:
         """Nakit bakiyeyi al"""
         try:
-            result = supabase.table("portfolio_snapshots").select("cash_balance").order("created_at", desc=True).limit(1).execute()
+            result = get_client().table("portfolio_snapshots").select("cash_balance").order("created_at", desc=True).limit(1).execute()
             if result.data:
                 return result.data[0]['cash_balance']
         except Exception as e:
@@ -82,6 +83,7 @@ class PaperTradingEngine:
         
         return self.initial_balance
     
+    @metrics.timed("paper.execute_trade")
     def execute_paper_trade(self, 
                            asset_symbol: str, 
                            signal: str, 
@@ -212,7 +214,7 @@ class PaperTradingEngine:
         }
         
         try:
-            supabase.table("portfolio_positions").insert(position_data).execute()
+            get_client().table("portfolio_positions").insert(position_data).execute()
         except Exception as e:
             print(f"[PAPER ERROR] Pozisyon oluşturulamadı: {e}")
     
@@ -229,14 +231,14 @@ class PaperTradingEngine:
         }
         
         try:
-            supabase.table("portfolio_positions").update(update_data).eq("asset_symbol", asset_symbol).execute()
+            get_client().table("portfolio_positions").update(update_data).eq("asset_symbol", asset_symbol).execute()
         except Exception as e:
             print(f"[PAPER ERROR] Pozisyon güncellenemedi: {e}")
     
     def close_position(self, asset_symbol: str):
         """Pozisyonu kapat"""
         try:
-            supabase.table("portfolio_positions").delete().eq("asset_symbol", asset_symbol).execute()
+            get_client().table("portfolio_positions").delete().eq("asset_symbol", asset_symbol).execute()
         except Exception as e:
             print(f"[PAPER ERROR] Pozisyon kapatılamadı: {e}")
     
@@ -250,7 +252,8 @@ class PaperTradingEngine:
         }
         
         try:
-            supabase.table("portfolio_snapshots").insert(portfolio_data).execute()
+            get_client().table("portfolio_snapshots").insert(portfolio_data).execute()
+            metrics.count("db.rows_written")
         except Exception as e:
             print(f"[PAPER ERROR] Nakit bakiyesi güncellenemedi: {e}")
     
@@ -274,10 +277,12 @@ class PaperTradingEngine:
         }
         
         try:
-            supabase.table("paper_trades").insert(trade_data).execute()
+            get_client().table("paper_trades").insert(trade_data).execute()
+            metrics.count("db.rows_written")
         except Exception as e:
             print(f"[PAPER ERROR] Trade kaydedilemedi: {e}")
     
+    @metrics.timed("paper.portfolio_value")
     def calculate_total_portfolio_value(self) -> float:
         """Toplam portföy değerini hesapla"""
         cash_balance = self.get_cash_balance()
@@ -330,5 +335,17 @@ class PaperTradingEngine:
             "positions": position_details
         }
 
-# Global paper trading engine instance
-paper_trader = PaperTradingEngine()
\ No newline at end of file
+# Global paper trading engine instance (ilk kullanımda oluşturulur, portföyü DB'den okur)
+_paper_trader: Optional[PaperTradingEngine] = None
+
+def get_paper_trader() -> PaperTradingEngine:
+    global _paper_trader
+    if _paper_trader is None:
+        _paper_trader = PaperTradingEngine()
+    return _paper_trader
+
+def __getattr__(name):
+    # Eski `from paper_trading import paper_trader` kullanımları için
+    if name == "paper_trader":
+        return get_paper_trader()
+    raise AttributeError(f"module 'paper_trading' has no attribute '{name}'")
\ No newline at end of file
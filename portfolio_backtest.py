@@ -0,0 +1,293 @@
+# portfolio_backtest.py - Ortak nakitle çok sembollü portföy backtest'i
+
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import indicators
+from strategies import BUY, SELL, signal_series, strategy_type
+from trade_log import TradeLog, LONG
+from scheduler import interval_to_seconds
+
+DAY_MS = 86_400_000
+
+def _fill_gaps(close: np.ndarray) -> np.ndarray:
+    """
+    (semboller x barlar) matrisindeki NaN'ları son geçerli değerle, baştaki NaN'ları
+    ilk geçerli değerle doldur; indikatörler tek bir eksik barda bozulmaz.
+    """
+    n = close.shape[-1]
+    valid = ~np.isnan(close)
+    last = np.where(valid, np.arange(n), 0)
+    np.maximum.accumulate(last, axis=-1, out=last)
+    filled = np.take_along_axis(close, last, axis=-1)
+
+    first = valid.argmax(axis=-1)
+    head = np.arange(n) < first[:, None]
+    return np.where(head, close[np.arange(len(close)), first][:, None], filled)
+
+def signal_matrix(strategy_name: str, close: np.ndarray, params: Dict):
+    """
+    Tüm semboller ve barlar için (sinyal, güven) matrisleri.
+    Güven ölçeği main.run_strategy_analysis ve scanner ile aynıdır.
+    """
+    kind = strategy_type(strategy_name)
+    signals = signal_series(strategy_name, close, **params)
+
+    if kind == "RSI":
+        overbought = params.get("overbought", 70)
+        oversold = params.get("oversold", 30)
+        value = indicators.rsi(close, params.get("rsi_period", 14))
+        confidence = np.where(signals == SELL, np.minimum((value - overbought) / 10, 1.0),
+                              np.where(signals == BUY, np.minimum((oversold - value) / 10, 1.0), 0.3))
+    else:
+        value = indicators.sma(close, params.get("short_period", 10))
+        with np.errstate(invalid="ignore"):
+            confidence = np.where(signals != 0, np.minimum(np.abs(close - value) / close * 10, 0.9), 0.4)
+    return signals, confidence
+
+class PortfolioBacktester:
+    """
+    Bir stratejiyi birçok sembolde aynı anda, ortak nakitle test eder.
+
+    Fiyatlar (barlar x semboller) matrisine hizalanır; sinyal ve güven tüm matris
+    için vektörel hesaplanır. Döngü sadece aksiyon alınabilir sinyal olan barları
+    dolaşır ve her barda tüm sembolleri birlikte işler. RiskManager kuralları
+    (main.execute_paper_trade akışı) aynen uygulanır:
+
+    - güven < min_confidence olan sinyaller reddedilir
+    - günlük gerçekleşen kayıp portföyün max_daily_loss_pct'ine ulaştıysa o gün işlem yok
+    - emir büyüklüğü portföy * min(güven * 0.1, max_position_size_pct); pozisyon
+      (mevcut + emir) max_position_size_pct ile sınırlanır
+    - alım sonrası nakit min_cash_reserve'in, toplam pozisyon max_total_risk_pct'in
+      altına/üstüne geçecekse emir reddedilir; aynı barda adaylar güvene göre sırayla denenir
+
+    Sadece long: paper trading'de olduğu gibi satış sinyali açık pozisyonu kapatır.
+    """
+
+    def __init__(self, initial_balance=10000, fee_rate=0.001, slippage=0.001,
+                 max_position_size_pct=0.10, max_daily_loss_pct=0.05,
+                 max_total_risk_pct=0.80, min_cash_reserve=0.20, min_confidence=0.6):
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.max_position_size_pct = max_position_size_pct
+        self.max_daily_loss_pct = max_daily_loss_pct
+        self.max_total_risk_pct = max_total_risk_pct
+        self.min_cash_reserve = min_cash_reserve
+        self.min_confidence = min_confidence
+
+    @classmethod
+    def from_risk_manager(cls, risk_manager, **kwargs) -> "PortfolioBacktester":
+        """Limitleri çalışan bir RiskManager'dan al"""
+        limits = {name: getattr(risk_manager, name) for name in (
+            "max_position_size_pct", "max_daily_loss_pct", "max_total_risk_pct", "min_cash_reserve")}
+        return cls(**limits, **kwargs)
+
+    def backtest(self, strategy: Dict[str, Any], symbols: Optional[List[str]] = None,
+                 timeframe: str = "1h", limit: int = 24 * 365,
+                 close: Optional[np.ndarray] = None,
+                 timestamps: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        close verilmezse (semboller x barlar) matrisi yerel mum deposundan yüklenir.
+        Eksik barlarda o sembolde işlem yapılmaz, değerleme son fiyatla sürer.
+        """
+        print(f"[PORTFOLIO BACKTEST] {strategy['name']} stratejisi test ediliyor...")
+
+        if close is None:
+            from data.candle_store import get_candle_store
+            store = get_candle_store()
+            symbols, timestamps, close = store.load_matrix(symbols or store.symbols(timeframe),
+                                                           timeframe, limit)
+        close = np.asarray(close, dtype=float)
+        if not symbols or close.ndim != 2 or close.shape[1] < 100:
+            return {"error": "Yetersiz veri"}
+
+        # Hiç verisi olmayan semboller çıkarılır
+        has_data = ~np.isnan(close).all(axis=1)
+        symbols = [s for s, ok in zip(symbols, has_data) if ok]
+        close = close[has_data]
+        if timestamps is None:
+            timestamps = np.arange(close.shape[1], dtype=np.int64) * interval_to_seconds(timeframe) * 1000
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+
+        start = time.perf_counter()
+        params = strategy.get("parameters", {})
+        filled = _fill_gaps(close)
+        signals, confidence = signal_matrix(strategy["name"], filled, params)
+
+        # Döngü bar satırlarına eriştiği için (barlar x semboller) düzenine geçilir
+        tradable = ~np.isnan(close.T)
+        prices = np.ascontiguousarray(filled.T)
+        signals = np.ascontiguousarray(signals.T)
+        confident = tradable & (confidence.T >= self.min_confidence)
+        confident[:50] = False  # İlk 50 bar indikatörler için (AdvancedBacktester ile aynı)
+        buy_mask = confident & (signals == BUY)
+        sell_mask = confident & (signals == SELL)
+        conf = np.ascontiguousarray(confidence.T)
+
+        result = self._simulate(prices, buy_mask, sell_mask, conf, timestamps)
+        elapsed = time.perf_counter() - start
+
+        trades, trade_symbols = result["trades"], result["trade_symbols"]
+        equity = result["equity"]
+        metrics = self._metrics(equity, trades)
+
+        per_symbol = {}
+        pnls = trades["pnl"]
+        for i in np.unique(trade_symbols):
+            mask = trade_symbols == i
+            per_symbol[symbols[i]] = {
+                "trades": int(mask.sum()),
+                "pnl": float(pnls[mask].sum()),
+                "win_rate": float((pnls[mask] > 0).mean())
+            }
+
+        final_value = float(equity[-1])
+        total_return_pct = (final_value / self.initial_balance - 1) * 100
+        print(f"[PORTFOLIO BACKTEST] {len(symbols)} sembol x {len(timestamps)} bar "
+              f"({elapsed*1000:.0f}ms) | Getiri: %{total_return_pct:.2f} | İşlem: {len(trades)} | "
+              f"Reddedilen alım: {result['rejected']}")
+
+        return {
+            "strategy_id": strategy.get("id"),
+            "strategy_name": strategy["name"],
+            "parameters": params,
+            "symbols": symbols,
+            "timeframe": timeframe,
+            "initial_balance": self.initial_balance,
+            "final_balance": final_value,
+            "total_return_pct": total_return_pct,
+            "total_trades": len(trades),
+            "open_positions": result["open_positions"],
+            "rejected_orders": result["rejected"],
+            "max_exposure_pct": float(result["exposure"].max() * 100),
+            "avg_exposure_pct": float(result["exposure"].mean() * 100),
+            **metrics,
+            "per_symbol": per_symbol,
+            "trade_log": trades,
+            "trade_symbols": trade_symbols,
+            "equity_curve": equity
+        }
+
+    def _simulate(self, prices: np.ndarray, buy_mask: np.ndarray, sell_mask: np.ndarray,
+                  confidence: np.ndarray, timestamps: np.ndarray) -> Dict[str, Any]:
+        """
+        Sadece aksiyon alınabilir sinyal olan barlar dolaşılır; miktar ve nakit bu
+        barlarda değişir, aradaki barların değeri sonradan vektörel hesaplanır.
+        """
+        n_bars, n_symbols = prices.shape
+        cash = float(self.initial_balance)
+        quantity = np.zeros(n_symbols)
+        cost = np.zeros(n_symbols)       # Açık pozisyonun toplam maliyeti (ücretsiz)
+        entry_idx = np.zeros(n_symbols, dtype=np.int64)
+
+        trades = TradeLog()
+        trade_symbols: List[int] = []
+        daily_loss, day = 0.0, None
+        rejected = 0
+
+        event_bars = np.flatnonzero(buy_mask.any(axis=1) | sell_mask.any(axis=1))
+        cash_after = np.empty(len(event_bars))
+        quantity_after = np.empty((len(event_bars), n_symbols))
+
+        for k, i in enumerate(event_bars):
+            price = prices[i]
+            position_values = quantity * price
+            portfolio_value = cash + position_values.sum()
+
+            # RiskManager.reset_daily_limits gibi gün değişince sıfırla
+            bar_day = timestamps[i] // DAY_MS
+            if bar_day != day:
+                day, daily_loss = bar_day, 0.0
+
+            if daily_loss >= portfolio_value * self.max_daily_loss_pct:
+                cash_after[k], quantity_after[k] = cash, quantity
+                continue
+
+            # 1. Satışlar: açık pozisyonlar kapanır, nakit alımlardan önce serbest kalır
+            for j in np.flatnonzero(sell_mask[i] & (quantity > 0)):
+                exit_price = price[j] * (1 - self.slippage)
+                fee = quantity[j] * exit_price * self.fee_rate
+                pnl = quantity[j] * exit_price - cost[j] - fee
+                cash += quantity[j] * exit_price - fee
+
+                avg_price = cost[j] / quantity[j]
+                trades.append(entry_idx[j], i, timestamps[entry_idx[j]], timestamps[i], avg_price,
+                              exit_price, quantity[j], LONG, pnl, pnl / cost[j] * 100)
+                trade_symbols.append(j)
+                if pnl < 0:
+                    daily_loss += -pnl
+                quantity[j], cost[j] = 0.0, 0.0
+
+            # 2. Alımlar: güvene göre sırayla, pozisyon / nakit rezervi / toplam risk sınırları
+            candidates = np.flatnonzero(buy_mask[i])
+            if len(candidates):
+                position_values = quantity * price
+                portfolio_value = cash + position_values.sum()
+                order_values = portfolio_value * np.minimum(confidence[i, candidates] * 0.1,
+                                                            self.max_position_size_pct)
+                room = portfolio_value * self.max_position_size_pct - position_values[candidates]
+                order_values = np.minimum(order_values, room)
+
+                invested = portfolio_value - cash
+                min_cash = portfolio_value * self.min_cash_reserve
+                max_invested = portfolio_value * self.max_total_risk_pct
+                order = np.argsort(-confidence[i, candidates], kind="stable")
+                for j, value in zip(candidates[order], order_values[order]):
+                    if value <= 0:
+                        continue
+                    if cash - value < min_cash or invested + value > max_invested:
+                        rejected += 1
+                        continue
+                    entry_price = price[j] * (1 + self.slippage)
+                    if quantity[j] == 0:
+                        entry_idx[j] = i
+                    quantity[j] += value / entry_price
+                    cost[j] += value
+                    cash -= value * (1 + self.fee_rate)
+                    invested += value
+
+            cash_after[k], quantity_after[k] = cash, quantity
+
+        # Her bar, kendisinden önceki (veya kendisi olan) son olay barının durumunu taşır
+        state = np.searchsorted(event_bars, np.arange(n_bars), side="right") - 1
+        started = state >= 0
+        cash_curve = np.full(n_bars, float(self.initial_balance))
+        cash_curve[started] = cash_after[state[started]]
+        positions = np.zeros(n_bars)
+        positions[started] = np.einsum("ij,ij->i", quantity_after[state[started]], prices[started])
+        equity = cash_curve + positions
+
+        return {
+            "trades": trades,
+            "trade_symbols": np.asarray(trade_symbols, dtype=np.int32),
+            "equity": equity,
+            "exposure": positions / equity,
+            "open_positions": int((quantity > 0).sum()),
+            "rejected": rejected
+        }
+
+    def _metrics(self, equity: np.ndarray, trades: TradeLog) -> Dict[str, float]:
+        """AdvancedBacktester ile aynı tanımlar (bar getirileri, sqrt(252) yıllıklaştırma)"""
+        peak = np.maximum.accumulate(equity)
+        drawdown = peak - equity
+        drawdown_pct = drawdown / peak * 100
+        returns = np.diff(equity) / equity[:-1]
+        std_return = returns.std() if len(returns) else 0.0
+        sharpe_ratio = returns.mean() / std_return * np.sqrt(252) if std_return > 0 else 0.0
+
+        pnls = trades["pnl"]
+        gross_profit = pnls[pnls > 0].sum()
+        gross_loss = abs(pnls[pnls <= 0].sum())
+        return {
+            "win_rate": float((pnls > 0).mean()) if len(pnls) else 0.0,
+            "profit_factor": float(gross_profit / gross_loss) if gross_loss > 0 else 0.0,
+            "sharpe_ratio": float(sharpe_ratio),
+            "max_drawdown": float(drawdown.max()),
+            "max_drawdown_pct": float(drawdown_pct.max()),
+            "volatility": float(std_return * np.sqrt(252)),
+            "avg_trade_pnl": float(pnls.mean()) if len(pnls) else 0.0,
+            "avg_hold_time_hours": float(trades.hold_time_hours.mean()) if len(trades) else 0.0
+        }
@@ -0,0 +1,189 @@
+# profiling.py - run.py modları için CPU / bellek profilleme
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+PROFILE_DIR = "profiles"
+
+class StackSampler:
+    """
+    Thread'lerin çağrı yığınlarını belirli aralıklarla örnekleyen hafif profiler.
+    thread_id verilmezse tüm thread'ler örneklenir (daemon modunda işler
+    scheduler'ın "scheduler-cycle" thread'inde çalışır); yığının kökü thread adıdır.
+    Sonuç flamegraph.pl / speedscope / inferno ile açılabilen "collapsed stack"
+    formatında yazılır:  thread;modül:fonksiyon;modül:fonksiyon <örnek sayısı>
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_id is not None and thread_id != self.thread_id):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def write_collapsed(self, path: str):
+        with open(path, "w") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+class ThreadProfilers:
+    """
+    Python 3.12 öncesinde cProfile sadece etkinleştirildiği thread'i izler.
+    Profil süresince başlayan her thread, threading.setprofile kancasıyla ilk
+    çağrısında kendi Profile'ını açar; istatistikler sonda birleştirilir.
+    3.12+'da cProfile (sys.monitoring) zaten tüm thread'leri izler, kanca gerekmez.
+    """
+
+    needed = sys.version_info < (3, 12)
+
+    def __init__(self):
+        self.profilers = []
+        self._lock = threading.Lock()
+
+    def _hook(self, frame, event, arg):
+        profiler = cProfile.Profile()
+        with self._lock:
+            self.profilers.append(profiler)
+        profiler.enable()  # Bu thread'in profil fonksiyonu artık cProfile
+
+    def start(self):
+        if self.needed:
+            threading.setprofile(self._hook)
+
+    def stop(self):
+        if self.needed:
+            threading.setprofile(None)
+
+@contextmanager
+def cpu_profile(name: str, output_dir: str = PROFILE_DIR, top: int = 30):
+    """cProfile istatistikleri + örneklemeli collapsed stack çıktısı (tüm thread'ler)"""
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+
+    profiler = cProfile.Profile()
+    thread_profilers = ThreadProfilers()
+    sampler = StackSampler()
+    sampler.start()
+    thread_profilers.start()
+    profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        thread_profilers.stop()
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        for thread_profiler in thread_profilers.profilers:
+            stats.add(thread_profiler)
+        stats.dump_stats(f"{base}.prof")
+        sampler.write_collapsed(f"{base}.collapsed")
+
+        stats.strip_dirs().sort_stats("cumulative")
+        stats.print_stats(top)
+        with open(f"{base}.txt", "w") as f:
+            f.write(stream.getvalue())
+
+        print(f"\n{'='*70}")
+        print(f"[PROFILE] CPU profili ({elapsed:.2f}s, {sampler.samples} örnek)")
+        print(f"{'='*70}")
+        print(stream.getvalue())
+        print(f"[PROFILE] cProfile: {base}.prof (snakeviz / pstats ile açılabilir)")
+        print(f"[PROFILE] Sıralı istatistik: {base}.txt")
+        print(f"[PROFILE] Flame graph: {base}.collapsed (flamegraph.pl / speedscope)")
+
+@contextmanager
+def memory_profile(name: str, output_dir: str = PROFILE_DIR, top: int = 20, frames: int = 25):
+    """tracemalloc ile tepe bellek kullanımı ve en çok ayırma yapan satırlar"""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.mem.txt")
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(frames)
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        if not was_tracing:
+            tracemalloc.stop()
+
+        lines = [f"Tepe bellek: {peak / 1024**2:.1f} MB | Kalan: {current / 1024**2:.1f} MB", ""]
+        lines.append(f"En çok bellek ayıran {top} satır:")
+        for i, stat in enumerate(snapshot.statistics("lineno")[:top], 1):
+            frame = stat.traceback[0]
+            lines.append(f"{i:2d}. {stat.size / 1024:10.1f} KB  {stat.count:8d} blok  "
+                         f"{os.path.basename(frame.filename)}:{frame.lineno}")
+
+        lines.append("")
+        lines.append("Çağrı zinciriyle en büyük 5 ayırma:")
+        for stat in snapshot.statistics("traceback")[:5]:
+            lines.append(f"-- {stat.size / 1024:.1f} KB, {stat.count} blok")
+            lines.extend(f"   {line}" for line in stat.traceback.format(limit=6))
+
+        report = "\n".join(lines)
+        with open(path, "w") as f:
+            f.write(report + "\n")
+
+        print(f"\n{'='*70}")
+        print("[PROFILE] Bellek profili")
+        print(f"{'='*70}")
+        print(report)
+        print(f"\n[PROFILE] Rapor: {path}")
+
+@contextmanager
+def profile(kind: Optional[str], name: str):
+    """run.py --profile cpu|mem için ortak giriş noktası"""
+    if kind == "cpu":
+        with cpu_profile(name):
+            yield
+    elif kind == "mem":
+        with memory_profile(name):
+            yield
+    else:
+        yield
@@ -0,0 +1,252 @@
+# results_store.py - Yerel analitik sonuç deposu (backtest, walk-forward, Monte Carlo)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+DEFAULT_RESULTS_PATH = os.getenv("RESULTS_DB_PATH", "state/results.db")
+
+def _scalar_metrics(result: Dict[str, Any]) -> Dict[str, float]:
+    """Sonuçtaki tüm sayısal skaler alanlar (bool, listeler, id, seed ve blok sayısı hariç)"""
+    metrics = {}
+    for key, value in result.items():
+        if isinstance(value, bool) or key in ("strategy_id", "seed", "chunks"):
+            continue
+        try:
+            metrics[key] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return metrics
+
+def _param_value(value: Any):
+    """SQLite'ın bağlayabildiği değer; liste/sözlük gibi skaler olmayanlar JSON metni olur"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+class ResultsStore:
+    """
+    Her backtest / walk-forward / Monte Carlo sonucunu yerel SQLite'a yazar.
+    Metrikler ve parametreler (result_id, ad, değer) satırları olarak tutulur;
+    (ad, değer) indeksleri sayesinde herhangi bir metrikte top-K, parametre
+    bazlı gruplama ve iki çalıştırma arası fark ağa gitmeden sorgulanır.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.run_id: Optional[int] = None
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at INTEGER NOT NULL,
+                mode TEXT,
+                note TEXT
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id INTEGER NOT NULL REFERENCES runs (id),
+                kind TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                symbol TEXT,
+                timeframe TEXT,
+                created_at INTEGER NOT NULL,
+                parameters TEXT,
+                trade_log BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_key ON results (kind, strategy, symbol, timeframe, id);
+            CREATE INDEX IF NOT EXISTS idx_results_run ON results (run_id, kind);
+            CREATE TABLE IF NOT EXISTS metrics (
+                result_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                value REAL,
+                PRIMARY KEY (result_id, name)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_metrics_name_value ON metrics (name, value);
+            CREATE TABLE IF NOT EXISTS params (
+                result_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                value,
+                PRIMARY KEY (result_id, name)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_params_name_value ON params (name, value);
+        """)
+        conn.commit()
+
+    # --- Yazma ---
+
+    def start_run(self, mode: str, note: Optional[str] = None) -> int:
+        """Yeni çalıştırma başlat; sonraki record çağrıları bu çalıştırmaya yazılır"""
+        with self._write_lock:
+            conn = self._conn()
+            cur = conn.execute("INSERT INTO runs (created_at, mode, note) VALUES (?, ?, ?)",
+                               (int(time.time() * 1000), mode, note))
+            conn.commit()
+            self.run_id = cur.lastrowid
+        return self.run_id
+
+    def record(self, kind: str, result: Dict[str, Any], strategy: Optional[Dict] = None,
+               symbol: Optional[str] = None, timeframe: Optional[str] = None) -> Optional[int]:
+        """
+        kind: 'backtest', 'walk_forward', 'monte_carlo', 'basic' ...
+        Parametreler strategy['parameters'] veya result['parameters']'tan alınır.
+        """
+        if not result or "error" in result:
+            return None
+        if self.run_id is None:
+            self.start_run("adhoc")
+
+        name = result.get("strategy_name") or result.get("strategy") or (strategy or {}).get("name")
+        parameters = result.get("parameters") or (strategy or {}).get("parameters") or {}
+        trade_log = result.get("trade_log")
+        blob = trade_log.to_bytes() if hasattr(trade_log, "to_bytes") else None
+
+        with self._write_lock:
+            conn = self._conn()
+            try:
+                cur = conn.execute(
+                    "INSERT INTO results (run_id, kind, strategy, symbol, timeframe, created_at, "
+                    "parameters, trade_log) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.run_id, kind, name, symbol or result.get("symbol"),
+                     timeframe or result.get("timeframe"), int(time.time() * 1000),
+                     json.dumps(parameters, sort_keys=True, default=str), blob)
+                )
+                result_id = cur.lastrowid
+                conn.executemany("INSERT INTO metrics VALUES (?, ?, ?)",
+                                 [(result_id, k, v) for k, v in _scalar_metrics(result).items()])
+                conn.executemany("INSERT INTO params VALUES (?, ?, ?)",
+                                 [(result_id, k, _param_value(v)) for k, v in parameters.items()])
+                conn.commit()
+            except sqlite3.Error as e:
+                # Yarım kalan results/metrics satırları bir sonraki commit'le yazılmasın
+                conn.rollback()
+                print(f"[RESULTS ERROR] Sonuç kaydedilemedi: {e}")
+                return None
+        return result_id
+
+    # --- Sorgular ---
+
+    def runs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT r.id, r.created_at, r.mode, r.note, COUNT(x.id) FROM runs r "
+            "LEFT JOIN results x ON x.run_id = r.id GROUP BY r.id ORDER BY r.id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [{"run_id": i, "created_at": t, "mode": m, "note": n, "results": c}
+                for i, t, m, n, c in rows]
+
+    def leaderboard(self, metric: str = "sharpe_ratio", kind: str = "backtest", top: int = 20,
+                    symbol: Optional[str] = None, timeframe: Optional[str] = None,
+                    strategy: Optional[str] = None, run_id: Optional[int] = None,
+                    ascending: bool = False, latest_only: bool = True) -> List[Dict[str, Any]]:
+        """
+        Metriğe göre top-K. latest_only ile her (strateji, sembol, zaman dilimi)
+        için sadece en son sonuç sıralanır; run_id verilirse o çalıştırmayla sınırlanır.
+        """
+        where, args = ["x.kind = ?"], [kind]
+        if symbol:
+            where.append("x.symbol = ?")
+            args.append(symbol)
+        if timeframe:
+            where.append("x.timeframe = ?")
+            args.append(timeframe)
+        if strategy:
+            where.append("x.strategy LIKE ?")
+            args.append(f"%{strategy}%")
+        if run_id is not None:
+            where.append("x.run_id = ?")
+            args.append(run_id)
+        if latest_only:
+            where.append("x.id = (SELECT MAX(y.id) FROM results y WHERE y.kind = x.kind "
+                         "AND y.strategy = x.strategy AND y.symbol IS x.symbol "
+                         "AND y.timeframe IS x.timeframe"
+                         + (" AND y.run_id = x.run_id" if run_id is not None else "") + ")")
+
+        rows = self._conn().execute(
+            f"SELECT x.id, x.run_id, x.strategy, x.symbol, x.timeframe, x.parameters, m.value "
+            f"FROM metrics m JOIN results x ON x.id = m.result_id "
+            f"WHERE m.name = ? AND m.value IS NOT NULL AND {' AND '.join(where)} "
+            f"ORDER BY m.value {'ASC' if ascending else 'DESC'} LIMIT ?",
+            [metric, *args, top]
+        ).fetchall()
+        return [{"result_id": i, "run_id": r, "strategy": s, "symbol": sym, "timeframe": tf,
+                 "parameters": json.loads(p or "{}"), metric: v}
+                for i, r, s, sym, tf, p, v in rows]
+
+    def parameter_summary(self, parameter: str, metric: str = "sharpe_ratio",
+                          kind: str = "backtest", strategy: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Parametrenin her değeri için metriğin sayı/ortalama/min/max'ı"""
+        where, args = ["p.name = ?", "m.name = ?", "x.kind = ?"], [parameter, metric, kind]
+        if strategy:
+            where.append("x.strategy LIKE ?")
+            args.append(f"%{strategy}%")
+
+        rows = self._conn().execute(
+            f"SELECT p.value, COUNT(*), AVG(m.value), MIN(m.value), MAX(m.value) "
+            f"FROM params p JOIN metrics m ON m.result_id = p.result_id "
+            f"JOIN results x ON x.id = p.result_id "
+            f"WHERE {' AND '.join(where)} GROUP BY p.value ORDER BY p.value",
+            args
+        ).fetchall()
+        return [{"value": v, "count": c, "mean": mean, "min": lo, "max": hi}
+                for v, c, mean, lo, hi in rows]
+
+    def diff_runs(self, run_a: int, run_b: int, metric: str = "sharpe_ratio",
+                  kind: str = "backtest") -> List[Dict[str, Any]]:
+        """İki çalıştırmada ortak (strateji, sembol, zaman dilimi) sonuçların metrik farkı"""
+        rows = self._conn().execute(
+            """
+            WITH v AS (
+                SELECT x.run_id, x.strategy, x.symbol, x.timeframe, m.value
+                FROM results x JOIN metrics m ON m.result_id = x.id
+                WHERE x.kind = ? AND m.name = ? AND x.run_id IN (?, ?)
+                  AND x.id = (SELECT MAX(y.id) FROM results y WHERE y.run_id = x.run_id
+                              AND y.kind = x.kind AND y.strategy = x.strategy
+                              AND y.symbol IS x.symbol AND y.timeframe IS x.timeframe)
+            )
+            SELECT a.strategy, a.symbol, a.timeframe, a.value, b.value, b.value - a.value
+            FROM v a JOIN v b ON a.strategy = b.strategy AND a.symbol IS b.symbol
+                            AND a.timeframe IS b.timeframe
+            WHERE a.run_id = ? AND b.run_id = ?
+            ORDER BY ABS(b.value - a.value) DESC
+            """,
+            (kind, metric, run_a, run_b, run_a, run_b)
+        ).fetchall()
+        return [{"strategy": s, "symbol": sym, "timeframe": tf, "before": a, "after": b, "delta": d}
+                for s, sym, tf, a, b, d in rows]
+
+    def trade_log(self, result_id: int):
+        """Kayıtlı sonucun işlem kaydı (TradeLog) veya None"""
+        from trade_log import TradeLog
+
+        row = self._conn().execute("SELECT trade_log FROM results WHERE id = ?", (result_id,)).fetchone()
+        return TradeLog.from_bytes(row[0]) if row and row[0] else None
+
+_results_store: Optional[ResultsStore] = None
+
+def get_results_store() -> ResultsStore:
+    global _results_store
+    if _results_store is None:
+        _results_store = ResultsStore()
+    return _results_store
@@ -1,25 +1,68 @@
 # risk_manager.py
 
-import pandas as pd
+import numpy as np
+import time
+from collections import deque
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
-from db import supabase
+from db import get_client
+from agents.background_writer import BackgroundWriter
+import metrics
+from var_engine import VaREngine
+from covariance_tracker import EWMACovarianceTracker
+
+DEFAULT_RISK_INTERVAL = "1h"
+COVARIANCE_CHECKPOINT = "state/ewma_covariance_{interval}.json"
 
 class RiskManager:
     def __init__(self, 
                  max_position_size_pct=0.10,  # Portföyün max %10'u bir pozisyonda
                  max_daily_loss_pct=0.05,     # Günlük max %5 kayıp
                  max_total_risk_pct=0.80,     # Toplam risk %80
-                 min_cash_reserve=0.20):       # Min %20 nakit rezerv
+                 min_cash_reserve=0.20,       # Min %20 nakit rezerv
+                 max_var_pct=0.02,            # 1 barlık %95 VaR portföyün max %2'si
+                 min_var_scale=0.10,          # VaR için emir %10'un altına küçülürse reddet
+                 max_correlated_exposure_pct=0.25,  # Korelasyon ayarlı küme pozisyonu max %25
+                 min_correlation_scale=0.10,  # Korelasyon limiti için emir %10'un altına küçülürse reddet
+                 latency_budget_ms=1.0,       # Risk kararı için p99 gecikme bütçesi
+                 var_engine: Optional[VaREngine] = None,
+                 covariance_tracker: Optional[EWMACovarianceTracker] = None):
         
         self.max_position_size_pct = max_position_size_pct
         self.max_daily_loss_pct = max_daily_loss_pct
         self.max_total_risk_pct = max_total_risk_pct
         self.min_cash_reserve = min_cash_reserve
+        self.max_var_pct = max_var_pct
+        self.min_var_scale = min_var_scale
+        self.max_correlated_exposure_pct = max_correlated_exposure_pct
+        self.min_correlation_scale = min_correlation_scale
         
         self.daily_loss = 0.0
         self.last_reset_date = datetime.now().date()
         
+        # Varlık getirileri matrisi (VaR/CVaR için) ve varlıklar arası EWMA
+        # kovaryans/korelasyon (diskten devam eder). Farklı mum aralıklarının
+        # getirileri aynı matrise karışmasın diye her aralığın kendi durumu vardır;
+        # verilen örnekler varsayılan aralık (1h) için kullanılır.
+        self.var_engines: Dict[str, VaREngine] = {}
+        self.covariance_trackers: Dict[str, EWMACovarianceTracker] = {}
+        if var_engine is not None:
+            self.var_engines[DEFAULT_RISK_INTERVAL] = var_engine
+        if covariance_tracker is not None:
+            self.covariance_trackers[DEFAULT_RISK_INTERVAL] = covariance_tracker
+        
+        # Karar için bellekteki portföy durumu (DB'den refresh_state ile yüklenir)
+        self.cash_balance: Optional[float] = None
+        self.position_values: Dict[str, float] = {}
+        self.state_loaded_at: Optional[datetime] = None
+        
+        # Karar gecikmesi takibi
+        self.latency_budget_ms = latency_budget_ms
+        self.latencies_ms = deque(maxlen=10000)
+        
+        # Audit kayıtları karar yolunu bekletmeden arka planda yazılır
+        self.audit_writer = BackgroundWriter("risk_logs", self._write_risk_logs)
+        
     def reset_daily_limits(self):
         """Günlük limitleri sıfırla"""
         current_date = datetime.now().date()
@@ -28,32 +71,87 @@ class RiskManager:
             self.last_reset_date = current_date
             print(f"[RISK] Günlük limitler sıfırlandı - {current_date}")
     
-    def get_current_portfolio_value(self) -> float:
-        """Mevcut portföy değerini hesapla"""
+    def var_engine(self, interval: str = DEFAULT_RISK_INTERVAL) -> VaREngine:
+        """Mum aralığının VaR motoru (ilk kullanımda oluşturulur)"""
+        engine = self.var_engines.get(interval)
+        if engine is None:
+            engine = self.var_engines[interval] = VaREngine()
+        return engine
+    
+    def covariance_tracker(self, interval: str = DEFAULT_RISK_INTERVAL) -> EWMACovarianceTracker:
+        """Mum aralığının kovaryans takibi (ilk kullanımda checkpoint'ten yüklenir)"""
+        tracker = self.covariance_trackers.get(interval)
+        if tracker is None:
+            tracker = self.covariance_trackers[interval] = EWMACovarianceTracker(
+                checkpoint_path=COVARIANCE_CHECKPOINT.format(interval=interval))
+        return tracker
+    
+    def watch_symbols(self, asset_symbols: list, interval: str = DEFAULT_RISK_INTERVAL):
+        """Birlikte işlem gören varlıkları korelasyon takibine kaydet"""
+        self.covariance_tracker(interval).watch(asset_symbols)
+    
+    @metrics.timed("risk.update_market_data")
+    def update_market_data(self, asset_symbol: str, ohlcv: list, interval: str = DEFAULT_RISK_INTERVAL):
+        """Yeni mumları aralığın VaR motoruna ve kovaryans takibine aktar (sadece yeni barlar işlenir)"""
+        self.var_engine(interval).update(asset_symbol, ohlcv)
+        self.covariance_tracker(interval).update(asset_symbol, ohlcv)
+    
+    @metrics.timed("risk.refresh_state")
+    def refresh_state(self) -> bool:
+        """Portföy durumunu DB'den belleğe yükle (karar yolunun dışında çağrılır)"""
         try:
-            # Portfolio positions'ları al
-            positions_result = supabase.table("portfolio_positions").select("*").execute()
-            positions = positions_result.data
+            positions_result = get_client().table("portfolio_positions").select("*").execute()
             
-            total_value = 0.0
-            
-            for position in positions:
+            values = {}
+            for position in positions_result.data:
                 if position['quantity'] > 0:
                     # Current price'ı al (gerçek uygulamada live price)
                     current_price = position['current_price'] or position['avg_price']
-                    position_value = position['quantity'] * current_price
-                    total_value += position_value
+                    values[position['asset_symbol']] = position['quantity'] * current_price
             
-            # Nakit bakiyeyi ekle
-            cash_result = supabase.table("portfolio_snapshots").select("cash_balance").order("created_at", desc=True).limit(1).execute()
-            if cash_result.data:
-                total_value += cash_result.data[0]['cash_balance']
+            cash_result = get_client().table("portfolio_snapshots").select("cash_balance").order("created_at", desc=True).limit(1).execute()
             
-            return total_value
+            self.position_values = values
+            self.cash_balance = cash_result.data[0]['cash_balance'] if cash_result.data else 1000.0
+            self.state_loaded_at = datetime.now()
+            return True
             
         except Exception as e:
-            print(f"[RISK ERROR] Portföy değeri hesaplanırken hata: {e}")
-            return 10000.0  # Default değer
+            print(f"[RISK ERROR] Portföy durumu yüklenirken hata: {e}")
+            if self.cash_balance is None:
+                self.cash_balance = 1000.0  # Default başlangıç bakiyesi
+            return False
+    
+    def _ensure_state(self):
+        if self.state_loaded_at is None:
+            self.refresh_state()
+    
+    def on_trade_executed(self, asset_symbol: str, side: str, quantity: float, 
+                          price: float, new_cash_balance: float):
+        """Gerçekleşen işlemi bellekteki duruma yansıt (DB'yi tekrar okumadan)"""
+        self._ensure_state()
+        
+        current = self.position_values.get(asset_symbol, 0.0)
+        if side == "buy":
+            self.position_values[asset_symbol] = current + quantity * price
+        else:
+            remaining = current - quantity * price
+            if remaining > 1e-9:
+                self.position_values[asset_symbol] = remaining
+            else:
+                self.position_values.pop(asset_symbol, None)
+        
+        self.cash_balance = new_cash_balance
+    
+    def get_position_values(self) -> Dict[str, float]:
+        """Varlık bazlı pozisyon değerleri (dolar, bellekteki durumdan)"""
+        self._ensure_state()
+        return self.position_values
+    
+    def get_current_portfolio_value(self) -> float:
+        """Mevcut portföy değerini hesapla (bellekteki durumdan)"""
+        self._ensure_state()
+        return self.cash_balance + sum(self.position_values.values())
     
     def calculate_position_size(self, 
                               signal_strength: float, 
@@ -78,9 +176,16 @@ class RiskManager:
                          asset_symbol: str, 
                          quantity: float, 
                          price: float, 
-                         confidence: float) -> Dict[str, Any]:
-        """Tüm risk kontrollerini yap"""
-        
+                         confidence: float,
+                         interval: str = DEFAULT_RISK_INTERVAL) -> Dict[str, Any]:
+        """
+        Tüm risk kontrollerini yap.
+        Karar sadece bellekteki durumdan verilir; audit kaydı arka planda yazılır
+        ve kararın süresi risk_check["latency_ms"] içinde döner.
+        Korelasyon ve VaR, sinyalin geldiği mum aralığının getirileriyle hesaplanır.
+        """
+        start = time.perf_counter()
+        self._ensure_state()
         self.reset_daily_limits()
         
         risk_check = {
@@ -128,20 +233,115 @@ class RiskManager:
             risk_check["approved"] = False
             risk_check["reasons"].append(f"Toplam risk limiti aşılıyor: {total_invested/portfolio_value:.1%}")
         
-        # Log the decision
+        # 6. Korelasyon ayarlı pozisyon kontrolü
+        if signal == "buy" and risk_check["approved"]:
+            self.check_correlated_exposure(asset_symbol, price, portfolio_value, risk_check, interval)
+        
+        # 7. VaR bütçesi kontrolü (sadece riski artıran alımlar için)
+        if signal == "buy" and risk_check["approved"]:
+            self.check_var_budget(asset_symbol, price, portfolio_value, risk_check, interval)
+        
+        elapsed = time.perf_counter() - start
+        latency_ms = elapsed * 1000
+        if metrics.is_enabled():
+            metrics.observe("risk.check_risk_limits", elapsed)
+        risk_check["latency_ms"] = latency_ms
+        self.latencies_ms.append(latency_ms)
+        
+        if latency_ms > self.latency_budget_ms:
+            print(f"[RISK] Karar gecikmesi bütçeyi aştı: {latency_ms:.3f}ms > {self.latency_budget_ms}ms")
+        
+        # Log the decision (bloklamaz)
         self.log_risk_decision(asset_symbol, signal, quantity, price, risk_check)
         
         return risk_check
     
+    def check_correlated_exposure(self, asset_symbol: str, price: float,
+                                  portfolio_value: float, risk_check: Dict[str, Any],
+                                  interval: str = DEFAULT_RISK_INTERVAL):
+        """
+        Yüksek korelasyonlu varlıklardaki pozisyonları birlikte say.
+        BTC/ETH/BNB gibi birlikte hareket eden varlıklar tek bir büyük pozisyon gibi davranır.
+        """
+        tracker = self.covariance_tracker(interval)
+        exposures = self.get_position_values()
+        correlated = tracker.correlated_exposure(asset_symbol, exposures)
+        
+        if correlated is None:
+            return
+        
+        limit = portfolio_value * self.max_correlated_exposure_pct
+        order_value = risk_check["adjusted_quantity"] * price
+        projected = correlated + order_value
+        
+        projected_exposures = dict(exposures)
+        projected_exposures[asset_symbol] = projected_exposures.get(asset_symbol, 0.0) + order_value
+        diversified = tracker.diversified_exposure(projected_exposures)
+        
+        risk_check["correlation"] = {
+            "correlated_exposure": projected,
+            "diversified_exposure": diversified,
+            "limit": limit
+        }
+        
+        if projected <= limit:
+            return
+        
+        allowed_value = limit - correlated
+        if allowed_value <= order_value * self.min_correlation_scale:
+            risk_check["approved"] = False
+            risk_check["reasons"].append(
+                f"Korelasyon ayarlı pozisyon limiti aşılıyor: {projected/portfolio_value:.1%} > "
+                f"{self.max_correlated_exposure_pct:.0%}"
+            )
+        else:
+            old_quantity = risk_check["adjusted_quantity"]
+            risk_check["adjusted_quantity"] = allowed_value / price
+            risk_check["warnings"].append(
+                f"Korelasyon limiti için miktar küçültüldü: {old_quantity:.6f} → {risk_check['adjusted_quantity']:.6f}"
+            )
+    
+    def check_var_budget(self, asset_symbol: str, price: float, 
+                         portfolio_value: float, risk_check: Dict[str, Any],
+                         interval: str = DEFAULT_RISK_INTERVAL):
+        """Emir sonrası portföy VaR'ı bütçeyi aşıyorsa emri küçült veya reddet"""
+        var_engine = self.var_engine(interval)
+        exposures = self.get_position_values()
+        order_value = risk_check["adjusted_quantity"] * price
+        
+        projected = dict(exposures)
+        projected[asset_symbol] = projected.get(asset_symbol, 0.0) + order_value
+        var_result = var_engine.portfolio_var(projected)
+        
+        if var_result is None:
+            risk_check["warnings"].append("VaR hesaplanamadı (yetersiz getiri geçmişi)")
+            return
+        
+        risk_check["var"] = var_result
+        var_budget = portfolio_value * self.max_var_pct
+        
+        if var_result["var"] <= var_budget:
+            return
+        
+        scale = var_engine.max_order_scale(exposures, asset_symbol, order_value, var_budget)
+        
+        if scale < self.min_var_scale:
+            risk_check["approved"] = False
+            risk_check["reasons"].append(
+                f"VaR bütçesi aşılıyor: {var_result['var']:.2f} > {var_budget:.2f} "
+                f"(CVaR: {var_result['cvar']:.2f})"
+            )
+        else:
+            old_quantity = risk_check["adjusted_quantity"]
+            risk_check["adjusted_quantity"] = old_quantity * scale
+            risk_check["warnings"].append(
+                f"VaR bütçesi için miktar küçültüldü: {old_quantity:.6f} → {risk_check['adjusted_quantity']:.6f}"
+            )
+    
     def get_current_cash_balance(self) -> float:
-        """Mevcut nakit bakiyeyi al"""
-        try:
-            result = supabase.table("portfolio_snapshots").select("cash_balance").order("created_at", desc=True).limit(1).execute()
-            if result.data:
-                return result.data[0]['cash_balance']
-            return 1000.0  # Default başlangıç bakiyesi
-        except:
-            return 1000.0
+        """Mevcut nakit bakiyeyi al (bellekteki durumdan)"""
+        self._ensure_state()
+        return self.cash_balance
     
     def update_daily_loss(self, loss_amount: float):
         """Günlük kaybı güncelle"""
@@ -164,13 +364,37 @@ class RiskManager:
             "created_at": datetime.now().isoformat()
         }
         
+        if not self.audit_writer.submit(log_data):
+            print(f"[RISK LOG ERROR] Audit kuyruğu dolu, kayıt düşürüldü")
+    
+    def _write_risk_logs(self, batch):
+        """Audit kayıtlarını tek insert ile yaz (arka plan thread'i)"""
         try:
-            supabase.table("risk_logs").insert(log_data).execute()
+            get_client().table("risk_logs").insert(batch).execute()
+            metrics.count("db.rows_written", len(batch))
         except Exception as e:
             print(f"[RISK LOG ERROR] {e}")
     
+    def latency_stats(self) -> Dict[str, Any]:
+        """Risk kararı gecikme istatistikleri (ms)"""
+        if not self.latencies_ms:
+            return {"count": 0}
+        
+        values = np.fromiter(self.latencies_ms, dtype=float)
+        p50, p99 = np.percentile(values, [50, 99])
+        
+        return {
+            "count": len(values),
+            "p50_ms": float(p50),
+            "p99_ms": float(p99),
+            "max_ms": float(values.max()),
+            "budget_ms": self.latency_budget_ms,
+            "within_budget": bool(p99 <= self.latency_budget_ms)
+        }
+    
     def get_risk_summary(self) -> Dict[str, Any]:
         """Risk durumu özeti"""
+        self.refresh_state()
         portfolio_value = self.get_current_portfolio_value()
         cash_balance = self.get_current_cash_balance()
         
@@ -182,8 +406,21 @@ class RiskManager:
             "daily_loss_pct": self.daily_loss / portfolio_value,
             "remaining_daily_risk": (portfolio_value * self.max_daily_loss_pct) - self.daily_loss,
             "total_invested": portfolio_value - cash_balance,
-            "investment_ratio": (portfolio_value - cash_balance) / portfolio_value
+            "investment_ratio": (portfolio_value - cash_balance) / portfolio_value,
+            "decision_latency": self.latency_stats()
         }
 
-# Risk manager singleton instance
-risk_manager = RiskManager()
\ No newline at end of file
+# Risk manager singleton instance (ilk kullanımda oluşturulur)
+_risk_manager: Optional[RiskManager] = None
+
+def get_risk_manager() -> RiskManager:
+    global _risk_manager
+    if _risk_manager is None:
+        _risk_manager = RiskManager()
+    return _risk_manager
+
+def __getattr__(name):
+    # Eski `from risk_manager import risk_manager` kullanımları için
+    if name == "risk_manager":
+        return get_risk_manager()
+    raise AttributeError(f"module 'risk_manager' has no attribute '{name}'")
\ No newline at end of file
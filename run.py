@@ -2,15 +2,24 @@
 
 import sys
 import argparse
-from datetime import datetime
-from main_updated import main, run_multiple_assets
-from advanced_backtest import run_comprehensive_backtest
-from strategy_generator import store_strategies
-from paper_trading import paper_trader
-from risk_manager import risk_manager
+from datetime import datetime, timezone
+import metrics
+from profiling import profile
+
+# Tek sembolle çalışan modlarda --symbol verilmezse kullanılır
+DEFAULT_SYMBOL = "BTC/USDT"
+
+# --intervals verilmezse kullanılan mum aralığı (blok backtest uzun 1m geçmişi içindir)
+DEFAULT_INTERVAL = "1h"
+MODE_DEFAULT_INTERVALS = {"chunked_backtest": "1m"}
+
+# Her mod sadece ihtiyaç duyduğu modülleri import eder; böylece örneğin
+# offline backtest veya scan, DB bağlantısı ve risk motoru yüklenmeden açılır.
 
 def setup_database():
     """Veritabanı kurulumu"""
+    from strategy_generator import store_strategies
+    
     print("📊 Veritabanı kurulumu yapılıyor...")
     
     # Stratejileri generate et
@@ -19,15 +28,31 @@ def setup_database():
     
     print("✅ Kurulum tamamlandı!")
 
-def run_live_trading():
+def run_daemon(job, intervals):
+    """İşi her interval'in mum kapanışında çalıştıran daemon modu"""
+    from scheduler import CandleCloseScheduler
+    
+    print(f"🔁 Daemon modu: {', '.join(intervals)} mum kapanışlarında çalışacak")
+    
+    scheduler = CandleCloseScheduler({interval: job for interval in intervals})
+    scheduler.run(run_immediately=True)
+
+def run_live_trading(daemon=False, intervals=("1h",)):
     """Canlı trading modu"""
+    from main import main
+    
     print("🚀 Canlı paper trading başlatılıyor...")
     
-    # Ana analiz
-    main()
+    if daemon:
+        run_daemon(main, intervals)
+    else:
+        # Ana analiz
+        main(intervals[0])
 
 def run_backtest_mode(strategy_name=None):
     """Backtest modu"""
+    from advenced_backtest import run_comprehensive_backtest
+    
     print("📈 Backtest modu başlatılıyor...")
     
     if strategy_name:
@@ -37,10 +62,13 @@ def run_backtest_mode(strategy_name=None):
 
 def run_portfolio_report():
     """Portföy raporu"""
+    from paper_trading import get_paper_trader
+    from risk_manager import get_risk_manager
+    
     print("📊 Portföy raporu oluşturuluyor...")
     
-    summary = paper_trader.get_portfolio_summary()
-    risk_summary = risk_manager.get_risk_summary()
+    summary = get_paper_trader().get_portfolio_summary()
+    risk_summary = get_risk_manager().get_risk_summary()
     
     print(f"\n{'='*50}")
     print(f"         PORTFÖY RAPORU - {datetime.now().strftime('%Y-%m-%d %H:%M')}")
@@ -67,29 +95,252 @@ def run_portfolio_report():
     
     print(f"\n{'='*50}")
 
-def run_multi_asset_mode():
+def run_multi_asset_mode(daemon=False, intervals=("1h",)):
     """Çoklu varlık analizi"""
+    from main import run_multiple_assets
+    
     print("🌍 Çoklu varlık analizi başlatılıyor...")
-    run_multiple_assets()
+    
+    if daemon:
+        run_daemon(run_multiple_assets, intervals)
+    else:
+        run_multiple_assets(intervals[0])
+
+def run_scan_mode(interval="1h", limit=500, top=20, sync=False):
+    """Tüm USDT çiftlerinde tüm strateji varyantlarını tara"""
+    from scanner import scan_market
+    
+    print("🔎 Piyasa taraması başlatılıyor...")
+    scan_market(interval=interval, limit=limit, top=top, sync=sync)
+
+def run_optimize_mode(strategy="RSI", symbol="BTC/USDT", interval="1h", limit=1000,
+                      trials=200, jobs=None):
+    """Optuna ile strateji parametre optimizasyonu"""
+    from optimizer import optimize_strategy
+    
+    print(f"🧪 {strategy} parametre optimizasyonu başlatılıyor...")
+    optimize_strategy(strategy, symbol=symbol, interval=interval, limit=limit,
+                      n_trials=trials, n_jobs=jobs)
+
+def run_portfolio_backtest_mode(strategy="RSI", symbols=None, interval="1h", limit=24 * 365,
+                                sync=False):
+    """Sembolleri ortak nakit ve risk limitleriyle birlikte backtest et"""
+    from portfolio_backtest import PortfolioBacktester
+    from strategy_generator import local_strategy_variants
+    from results_store import get_results_store
+    
+    variant = next((v for v in local_strategy_variants() if v['name'] == strategy),
+                   {"id": None, "name": strategy, "parameters": {}})
+    
+    if sync:
+        from data.candle_store import get_candle_store
+        from data.fetch_binance import fetch_usdt_symbols
+        get_candle_store().sync_many(symbols or fetch_usdt_symbols(), interval, limit)
+    
+    print(f"📦 {variant['name']} portföy backtest'i: {', '.join(symbols) if symbols else 'depodaki tüm semboller'}")
+    result = PortfolioBacktester().backtest(variant, symbols, interval, limit)
+    if "error" in result:
+        print(f"[ERROR] {result['error']} - önce: python run.py portfolio_backtest --sync")
+        return
+    
+    store = get_results_store()
+    store.start_run("portfolio_backtest")
+    store.record("portfolio", result, symbol="PORTFOLIO", timeframe=interval)
+    
+    print(f"\n📊 {len(result['symbols'])} sembol | Getiri: %{result['total_return_pct']:.2f} | "
+          f"Sharpe: {result['sharpe_ratio']:.2f} | Max DD: %{result['max_drawdown_pct']:.2f} | "
+          f"Ort. pozisyon oranı: %{result['avg_exposure_pct']:.1f}")
+    ranked = sorted(result['per_symbol'].items(), key=lambda x: x[1]['pnl'], reverse=True)
+    for symbol, stats in ranked:
+        print(f"   {symbol:<12} {stats['trades']:4d} işlem | P&L: ${stats['pnl']:10.2f} | "
+              f"Kazanma: %{stats['win_rate'] * 100:.0f}")
+
+def run_chunked_backtest_mode(strategy="RSI", symbol="BTC/USDT", interval="1m", chunk_size=100_000,
+                              sync=False, since=None):
+    """Yerel mum deposundaki tüm geçmişi bloklar halinde backtest et (belleğe sığmayan seriler)"""
+    from advenced_backtest import AdvancedBacktester
+    from data.candle_store import get_candle_store
+    from strategy_generator import local_strategy_variants
+    from results_store import get_results_store
+    
+    variant = next((v for v in local_strategy_variants() if v['name'] == strategy),
+                   {"id": None, "name": strategy, "parameters": {}})
+    
+    candle_store = get_candle_store()
+    if sync:
+        if since:
+            # Geçmiş: since tarihinden depodaki ilk muma kadar sayfalayarak doldur
+            start_ts = int(datetime.strptime(since, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+            added = candle_store.backfill(symbol, interval, start_ts)
+            print(f"[STORE] {symbol} {interval}: {since} sonrası {added} geçmiş mum eklendi")
+        # Son mumdan ileri: her istek en fazla 1000 mum getirir, güncele yetişene kadar devam et
+        while candle_store.sync(symbol, interval, limit=1000) >= 1000:
+            pass
+    
+    print(f"🧱 {variant['name']} blok backtest'i: {symbol} {interval} (blok: {chunk_size} bar)")
+    result = AdvancedBacktester(use_cache=False).backtest_strategy_chunked(
+        variant, symbol, interval, chunk_size, store=candle_store)
+    if "error" in result:
+        print(f"[ERROR] {result['error']} - önce: python run.py chunked_backtest --sync")
+        return
+    
+    store = get_results_store()
+    store.start_run("chunked_backtest", note=variant['name'])
+    store.record("backtest", result)
+    
+    print(f"\n📊 {result['start_date']} → {result['end_date']} | {result['total_bars']} bar, "
+          f"{result['chunks']} blok | {result['total_trades']} işlem")
+    print(f"   Getiri: %{result['total_return_pct']:.2f} | Sharpe: {result['sharpe_ratio']:.2f} | "
+          f"Max DD: %{result['max_drawdown_pct']:.2f} | Kazanma: %{result['win_rate'] * 100:.0f}")
+
+def run_ml_train_mode(symbols=None, interval="1h", limit=5000, sync=False):
+    """Yerel mum deposundaki geçmişle ML sinyal modelini eğit"""
+    from data.candle_store import get_candle_store
+    from strategies.ml_strategy import MLSignalModel, MODEL_PATH
+    
+    symbols = symbols or ["BTC/USDT", "ETH/USDT", "BNB/USDT"]
+    store = get_candle_store()
+    if sync:
+        store.sync_many(symbols, interval, limit)
+    
+    ohlcv_by_symbol = {s: store.load(s, interval, limit) for s in symbols}
+    ohlcv_by_symbol = {s: o for s, o in ohlcv_by_symbol.items() if o}
+    if not ohlcv_by_symbol:
+        print("[ML] Depoda veri yok. Önce: python run.py ml_train --sync")
+        return
+    
+    print(f"🧠 ML modeli eğitiliyor: {', '.join(ohlcv_by_symbol)} ({interval})")
+    model = MLSignalModel()
+    stats = model.fit(ohlcv_by_symbol)
+    model.save()
+    
+    shares = ", ".join(f"{k}: %{v * 100:.0f}" for k, v in stats['class_share'].items())
+    print(f"[ML] {stats['rows']} satır | Test doğruluğu: {stats['holdout_accuracy']:.3f} | Sınıflar: {shares}")
+    print(f"[ML] Model kaydedildi: {MODEL_PATH}")
+
+def run_leaderboard_mode(metric="sharpe_ratio", kind="backtest", top=20, symbol=None,
+                         strategy=None, parameter=None, diff=None, run_id=None, ascending=False):
+    """Yerel sonuç deposundan sıralama, parametre özeti veya çalıştırma farkı"""
+    from results_store import get_results_store
+    
+    store = get_results_store()
+    
+    if diff:
+        run_a, run_b = diff
+        rows = store.diff_runs(run_a, run_b, metric, kind)
+        print(f"\n🔀 {metric} farkı: çalıştırma #{run_a} -> #{run_b} ({kind})")
+        for r in rows[:top]:
+            print(f"   {r['strategy']:<45} {r['symbol'] or '-':<10} "
+                  f"{r['before']:10.4f} -> {r['after']:10.4f} ({r['delta']:+.4f})")
+        if not rows:
+            print("   Ortak sonuç yok")
+        return
+    
+    if parameter:
+        rows = store.parameter_summary(parameter, metric, kind, strategy)
+        print(f"\n🧮 {parameter} değerlerine göre {metric} ({kind})")
+        for r in rows:
+            print(f"   {parameter}={r['value']!s:<8} n={r['count']:<5} ort: {r['mean']:10.4f} "
+                  f"min: {r['min']:10.4f} max: {r['max']:10.4f}")
+        if not rows:
+            print("   Kayıt yok")
+        return
+    
+    rows = store.leaderboard(metric, kind, top, symbol=symbol, strategy=strategy,
+                             run_id=run_id, ascending=ascending)
+    print(f"\n🏆 {kind} sonuçları - {metric} ({'artan' if ascending else 'azalan'} sıra)")
+    for i, r in enumerate(rows):
+        print(f"{i+1:3d}. {r['strategy']:<45} {r['symbol'] or '-':<10} {r['timeframe'] or '-':<4} "
+              f"{metric}: {r[metric]:10.4f}  (çalıştırma #{r['run_id']})")
+    if not rows:
+        print("   Kayıt yok - önce 'python run.py backtest' çalıştırın")
+    
+    runs = store.runs(5)
+    if runs:
+        print(f"\n📚 Son çalıştırmalar:")
+        for run in runs:
+            started = datetime.fromtimestamp(run['created_at'] / 1000).strftime('%Y-%m-%d %H:%M')
+            print(f"   #{run['run_id']:<4} {started} {run['mode']:<10} {run['results']} sonuç")
 
 def main_cli():
     """Ana CLI fonksiyonu"""
     parser = argparse.ArgumentParser(description='Investment Agent - Akıllı Yatırım Robotu')
     
     parser.add_argument('mode', choices=[
-        'setup', 'live', 'backtest', 'portfolio', 'multi'
+        'setup', 'live', 'backtest', 'portfolio', 'multi', 'scan', 'optimize', 'leaderboard',
+        'portfolio_backtest', 'ml_train', 'chunked_backtest'
     ], help='Çalıştırma modu')
     
     parser.add_argument('--strategy', '-s', type=str, 
-                       help='Belirli bir strateji için backtest (örn: RSI)')
+                       help='Belirli bir strateji için backtest/optimize (örn: RSI)')
     
-    parser.add_argument('--symbol', type=str, default='BTC/USDT',
-                       help='Trading çifti (varsayılan: BTC/USDT)')
+    parser.add_argument('--symbol', type=str,
+                       help=f'Trading çifti (varsayılan: {DEFAULT_SYMBOL}; leaderboard modunda verilmezse tüm semboller)')
+    
+    parser.add_argument('--symbols', type=str,
+                       help='portfolio_backtest/ml_train için virgülle ayrılmış semboller')
     
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Detaylı çıktı')
     
+    parser.add_argument('--daemon', '-d', action='store_true',
+                       help='live/multi modlarını mum kapanışlarında sürekli çalıştır')
+    
+    parser.add_argument('--intervals', type=str,
+                       help='Virgülle ayrılmış mum aralıkları (örn: 15m,1h,4h; varsayılan: 1h, chunked_backtest: 1m)')
+    
+    parser.add_argument('--metrics', type=str, metavar='PATH',
+                       help='Aşama gecikmelerini ölç ve her döngü sonunda yaz (.prom veya .json)')
+    
+    parser.add_argument('--profile', choices=['cpu', 'mem'],
+                       help='Modu profille: cpu (cProfile + flame graph) veya mem (tracemalloc)')
+    
+    parser.add_argument('--limit', type=int, default=500,
+                       help='scan/optimize/portfolio_backtest/ml_train modları için sembol başına bar sayısı')
+    
+    parser.add_argument('--chunk', type=int, default=100_000,
+                       help='chunked_backtest modunda bellekte tutulan blok başına bar sayısı')
+    
+    parser.add_argument('--trials', type=int, default=200,
+                       help='optimize modunda deneme sayısı')
+    
+    parser.add_argument('--jobs', type=int,
+                       help='optimize modunda paralel süreç sayısı (varsayılan: CPU sayısı)')
+    
+    parser.add_argument('--top', type=int, default=20,
+                       help='scan/leaderboard modlarında gösterilecek satır sayısı')
+    
+    parser.add_argument('--metric', type=str, default='sharpe_ratio',
+                       help='leaderboard modunda sıralama metriği (örn: total_return_pct, var_95)')
+    
+    parser.add_argument('--kind', type=str, default='backtest',
+                       choices=['backtest', 'walk_forward', 'monte_carlo', 'basic', 'portfolio'],
+                       help='leaderboard modunda sonuç türü')
+    
+    parser.add_argument('--param', type=str,
+                       help='leaderboard modunda metriği bu parametrenin değerlerine göre grupla')
+    
+    parser.add_argument('--diff', type=str, metavar='RUN_A,RUN_B',
+                       help='leaderboard modunda iki çalıştırmanın metrik farkı')
+    
+    parser.add_argument('--run', type=int,
+                       help='leaderboard modunda sadece bu çalıştırmanın sonuçları')
+    
+    parser.add_argument('--asc', action='store_true',
+                       help='leaderboard modunda küçükten büyüğe sırala (örn: max_drawdown_pct)')
+    
+    parser.add_argument('--since', type=str, metavar='YYYY-MM-DD',
+                       help='chunked_backtest --sync ile depoyu bu tarihten itibaren geriye doğru doldur')
+    
+    parser.add_argument('--sync', action='store_true',
+                       help='scan/portfolio_backtest/ml_train/chunked_backtest öncesi yerel mum deposunu Binance ile senkronize et')
+    
     args = parser.parse_args()
+    interval_arg = args.intervals or MODE_DEFAULT_INTERVALS.get(args.mode, DEFAULT_INTERVAL)
+    intervals = [i.strip() for i in interval_arg.split(',') if i.strip()]
+    
+    if args.metrics:
+        metrics.enable(args.metrics)
     
     print(f"""
 ╔══════════════════════════════════════════════════════════╗
@@ -99,25 +350,57 @@ def main_cli():
 
 🕐 Başlangıç: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 🎯 Mod: {args.mode.upper()}
-💱 Symbol: {args.symbol}
+💱 Symbol: {args.symbol or ('tümü' if args.mode == 'leaderboard' else DEFAULT_SYMBOL)}
     """)
     
     try:
-        if args.mode == 'setup':
-            setup_database()
+        with profile(args.profile, args.mode):
+            if args.mode == 'setup':
+                setup_database()
+            
+            elif args.mode == 'live':
+                run_live_trading(args.daemon, intervals)
+            
+            elif args.mode == 'backtest':
+                run_backtest_mode(args.strategy)
+            
+            elif args.mode == 'portfolio':
+                run_portfolio_report()
             
-        elif args.mode == 'live':
-            run_live_trading()
+            elif args.mode == 'multi':
+                run_multi_asset_mode(args.daemon, intervals)
             
-        elif args.mode == 'backtest':
-            run_backtest_mode(args.strategy)
+            elif args.mode == 'scan':
+                run_scan_mode(intervals[0], args.limit, args.top, args.sync)
             
-        elif args.mode == 'portfolio':
-            run_portfolio_report()
+            elif args.mode == 'optimize':
+                run_optimize_mode(args.strategy or 'RSI', args.symbol or DEFAULT_SYMBOL, intervals[0],
+                                  args.limit, args.trials, args.jobs)
             
-        elif args.mode == 'multi':
-            run_multi_asset_mode()
+            elif args.mode == 'portfolio_backtest':
+                symbols = [s.strip() for s in args.symbols.split(',')] if args.symbols else None
+                run_portfolio_backtest_mode(args.strategy or 'RSI', symbols, intervals[0],
+                                            args.limit, args.sync)
             
+            elif args.mode == 'ml_train':
+                symbols = [s.strip() for s in args.symbols.split(',')] if args.symbols else None
+                run_ml_train_mode(symbols, intervals[0], args.limit, args.sync)
+            
+            elif args.mode == 'chunked_backtest':
+                run_chunked_backtest_mode(args.strategy or 'RSI', args.symbol or DEFAULT_SYMBOL, intervals[0],
+                                          args.chunk, args.sync, args.since)
+            
+            elif args.mode == 'leaderboard':
+                diff = [int(r) for r in args.diff.split(',')] if args.diff else None
+                # --symbol verilmezse tüm semboller; portföy sonuçları tek sembole ait
+                # değil ('PORTFOLIO' olarak kaydedilir)
+                symbol = None if args.kind == 'portfolio' else args.symbol
+                run_leaderboard_mode(args.metric, args.kind, args.top, symbol,
+                                     args.strategy, args.param, diff, args.run, args.asc)
+            
+        if args.mode not in ('live', 'multi'):
+            metrics.export_cycle()
+        
         print(f"\n✅ İşlem tamamlandı - {datetime.now().strftime('%H:%M:%S')}")
         
     except KeyboardInterrupt:
@@ -143,16 +426,30 @@ Mevcut komutlar:
 3. backtest  - Strateji backtesting
 4. portfolio - Portföy raporu
 5. multi     - Çoklu varlık analizi
+6. scan      - Tüm USDT çiftlerinde strateji taraması
+7. optimize  - Optuna ile strateji parametre optimizasyonu
+8. leaderboard - Yerel sonuç deposundan strateji sıralaması
+9. portfolio_backtest - Çok sembollü, ortak nakitli portföy backtest'i
+10. ml_train  - ML sinyal modelini yerel mum geçmişiyle eğit
+11. chunked_backtest - Yerel mum deposundaki uzun geçmişte (varsayılan 1m) blok backtest
 
 Örnek kullanım:
   python run.py live
+  python run.py live --daemon --intervals 1h,4h
   python run.py backtest --strategy RSI
   python run.py portfolio
+  python run.py backtest --profile cpu
+  python run.py optimize --strategy SMA_Crossover --trials 300 --limit 1000
+  python run.py leaderboard --metric total_return_pct --top 10
+  python run.py portfolio_backtest --symbols BTC/USDT,ETH/USDT,BNB/USDT --limit 8760 --sync
+  python run.py ml_train --limit 5000 --sync
+  python run.py chunked_backtest --symbol BTC/USDT --sync --since 2023-01-01
         """)
         
         mode = input("\nHangi modu çalıştırmak istiyorsunuz? (live/backtest/portfolio/setup): ").strip().lower()
         
-        if mode in ['live', 'backtest', 'portfolio', 'setup', 'multi']:
+        if mode in ['live', 'backtest', 'portfolio', 'setup', 'multi', 'scan', 'optimize', 'leaderboard', 'portfolio_backtest', 'ml_train',
+                    'chunked_backtest']:
             sys.argv.append(mode)
             main_cli()
         else:
@@ -0,0 +1,133 @@
+# scanner.py - Tüm strateji varyantlarını yüzlerce sembolde tarayan piyasa tarayıcısı
+
+import time
+import numpy as np
+from typing import Dict, List, Any, Optional
+from data.candle_store import get_candle_store
+from data.fetch_binance import fetch_usdt_symbols
+from strategy_generator import load_strategy_variants
+import indicators
+
+def _rsi_signals(close: np.ndarray, variants: List[Dict], rsi_cache: Dict[int, np.ndarray]):
+    """RSI varyantları için son bar sinyalleri (her periyot bir kez hesaplanır)"""
+    for variant in variants:
+        params = variant.get("parameters", {})
+        period = params.get("rsi_period", 14)
+        overbought = params.get("overbought", 70)
+        oversold = params.get("oversold", 30)
+
+        if period not in rsi_cache:
+            rsi_cache[period] = indicators.rsi(close, period)[:, -1]
+        value = rsi_cache[period]
+
+        sell = value > overbought
+        buy = value < oversold
+        # main.run_strategy_analysis ile aynı güven ölçeği
+        confidence = np.where(sell, np.minimum((value - overbought) / 10, 1.0),
+                              np.where(buy, np.minimum((oversold - value) / 10, 1.0), 0.3))
+
+        yield variant, buy, sell, value, confidence
+
+def _sma_signals(close: np.ndarray, variants: List[Dict], sma_cache: Dict[int, np.ndarray]):
+    """SMA Crossover varyantları için son bar sinyalleri"""
+    last_price = close[:, -1]
+
+    for variant in variants:
+        params = variant.get("parameters", {})
+        short_period = params.get("short_period", 10)
+        long_period = params.get("long_period", 50)
+
+        for period in (short_period, long_period):
+            if period not in sma_cache:
+                sma_cache[period] = indicators.sma(close[:, -(period + 1):], period)[:, -2:]
+
+        short, long = sma_cache[short_period], sma_cache[long_period]
+        buy = (short[:, 0] < long[:, 0]) & (short[:, 1] > long[:, 1])
+        sell = (short[:, 0] > long[:, 0]) & (short[:, 1] < long[:, 1])
+        value = short[:, 1]
+
+        with np.errstate(invalid="ignore"):
+            confidence = np.where(buy | sell, np.minimum(np.abs(last_price - value) / last_price * 10, 0.9), 0.4)
+
+        yield variant, buy, sell, value, confidence
+
+def scan_market(interval: str = "1h", limit: int = 500, symbols: Optional[List[str]] = None,
+                min_confidence: float = 0.6, top: int = 20, sync: bool = False) -> List[Dict[str, Any]]:
+    """
+    Depodaki tüm USDT çiftlerini (semboller x barlar) matrisine yükle, tüm strateji
+    varyantlarını vektörel indikatörlerle değerlendir ve aksiyon alınabilir
+    sinyalleri güvene göre sırala.
+    """
+    store = get_candle_store()
+
+    if sync:
+        sync_symbols = symbols or fetch_usdt_symbols()
+        print(f"[SCAN] {len(sync_symbols)} sembol senkronize ediliyor...")
+        store.sync_many(sync_symbols, interval, limit)
+
+    start = time.perf_counter()
+    # Her sembol kendi son kapanmış barlarıyla yüklenir; bir sembolün daha yeni
+    # barı (örn. saat dönümünde senkronize edilmiş) diğerlerini eksik göstermez
+    symbols, last_ts, close = store.load_latest_matrix(symbols or store.symbols(interval), interval, limit)
+
+    if not symbols:
+        print("[SCAN] Depoda veri yok. Önce: python run.py scan --sync")
+        return []
+
+    # Eksik barı olan sembolleri çıkar (hangileri olduğu raporlanır)
+    complete = ~np.isnan(close).any(axis=1)
+    skipped = [s for s, ok in zip(symbols, complete) if not ok]
+    if skipped:
+        print(f"[SCAN] Eksik bar nedeniyle atlanan {len(skipped)} sembol: {', '.join(skipped[:20])}"
+              f"{' ...' if len(skipped) > 20 else ''}")
+
+    # Son barı diğerlerinden geride kalan semboller taranır ama raporlanır
+    newest = last_ts[complete].max() if complete.any() else -1
+    stale = [s for s, ok, ts in zip(symbols, complete, last_ts) if ok and ts < newest]
+    if stale:
+        print(f"[SCAN] Son barı geride kalan {len(stale)} sembol (eski veriyle taranıyor): "
+              f"{', '.join(stale[:20])}{' ...' if len(stale) > 20 else ''}")
+
+    symbols = [s for s, ok in zip(symbols, complete) if ok]
+    close = close[complete]
+    load_time = time.perf_counter() - start
+
+    variants = load_strategy_variants()
+    rsi_variants = [v for v in variants if "RSI" in v["name"]]
+    sma_variants = [v for v in variants if "SMA" in v["name"]]
+
+    start = time.perf_counter()
+    signals = []
+    rsi_cache, sma_cache = {}, {}
+    evaluations = list(_rsi_signals(close, rsi_variants, rsi_cache)) + \
+                  list(_sma_signals(close, sma_variants, sma_cache))
+
+    last_price = close[:, -1]
+    for variant, buy, sell, value, confidence in evaluations:
+        actionable = (buy | sell) & (confidence >= min_confidence)
+        for i in np.flatnonzero(actionable):
+            signals.append({
+                "symbol": symbols[i],
+                "strategy": variant["name"],
+                "strategy_id": variant.get("id"),
+                "signal": "buy" if buy[i] else "sell",
+                "confidence": float(confidence[i]),
+                "value": float(value[i]),
+                "price": float(last_price[i])
+            })
+    eval_time = time.perf_counter() - start
+
+    signals.sort(key=lambda s: s["confidence"], reverse=True)
+
+    print(f"[SCAN] {len(symbols)} sembol x {len(variants)} varyant x {close.shape[1]} bar "
+          f"(yükleme: {load_time*1000:.0f}ms, değerlendirme: {eval_time*1000:.0f}ms, "
+          f"eksik veri nedeniyle atlanan: {len(skipped)})")
+
+    print(f"\n{'='*70}")
+    print(f"[SCAN] En güçlü {min(top, len(signals))} sinyal ({len(signals)} aksiyon alınabilir)")
+    print(f"{'='*70}")
+    for i, s in enumerate(signals[:top]):
+        print(f"{i+1:2d}. {s['symbol']:<12} {s['signal'].upper():<4} | {s['strategy']:<45} | "
+              f"Güven: {s['confidence']:.2f} | Değer: {s['value']:.2f} | Fiyat: {s['price']:.4f}")
+
+    return signals
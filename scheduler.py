@@ -0,0 +1,128 @@
+# scheduler.py - Mum kapanışına hizalı daemon zamanlayıcı
+
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from agents.background_writer import BackgroundWriter
+
+INTERVAL_SECONDS = {
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800
+}
+
+# Epoch 0 Perşembe; Binance haftalık mumları Pazartesi 00:00 UTC'de açılır/kapanır
+WEEK_OFFSET_SECONDS = 4 * 86400
+
+def interval_to_seconds(interval: str) -> int:
+    """Binance interval formatını saniyeye çevir (örn: 15m, 1h, 4h, 1d)"""
+    unit = interval[-1]
+    if unit not in INTERVAL_SECONDS or not interval[:-1].isdigit():
+        raise ValueError(f"Geçersiz interval: {interval}")
+    return int(interval[:-1]) * INTERVAL_SECONDS[unit]
+
+def next_candle_close(interval: str, now: Optional[float] = None) -> float:
+    """Verilen interval için bir sonraki mum kapanış zamanı (epoch saniye, UTC hizalı)"""
+    seconds = interval_to_seconds(interval)
+    offset = WEEK_OFFSET_SECONDS if interval.endswith("w") else 0
+    now = time.time() if now is None else now
+    return (int((now - offset) // seconds) + 1) * seconds + offset
+
+class CandleCloseScheduler:
+    """
+    Her interval için işi tam mum kapanışında çalıştıran uzun ömürlü döngü.
+
+    - İşler ayrı bir thread'de çalışır; bir döngü sürerken yeni kapanış gelirse
+      o döngü kuyruğa alınmaz, atlanır.
+    - SIGINT/SIGTERM ile nazikçe durur: çalışan döngü beklenir ve
+      arka plan kuyruklarındaki yazmalar boşaltılır.
+    - Süreç canlı kaldığı için DB client'ı, mum cache'i ve portföy durumu döngüler
+      arasında sıcak kalır.
+    """
+
+    def __init__(self, jobs: Dict[str, Callable[[str], None]], close_delay: float = 2.0,
+                 shutdown_timeout: float = 60.0):
+        for interval in jobs:
+            interval_to_seconds(interval)  # erken doğrulama
+
+        self.jobs = jobs
+        self.close_delay = close_delay  # Binance'in mumu kapatması için kısa pay
+        self.shutdown_timeout = shutdown_timeout
+
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self.runs = 0
+        self.skipped = 0
+
+    def stop(self, *_):
+        if not self._stop.is_set():
+            print(f"\n[SCHEDULER] Durdurma isteği alındı, döngü bitiriliyor...")
+        self._stop.set()
+
+    def _install_signal_handlers(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+    def _run_job(self, intervals):
+        for interval in intervals:
+            if self._stop.is_set():
+                break
+            started = time.perf_counter()
+            try:
+                self.jobs[interval](interval)
+            except Exception as e:
+                print(f"[SCHEDULER ERROR] {interval} döngüsü hata verdi: {e}")
+            print(f"[SCHEDULER] {interval} döngüsü {time.perf_counter() - started:.1f}s sürdü")
+
+    def _dispatch(self, intervals):
+        if self._worker is not None and self._worker.is_alive():
+            self.skipped += 1
+            print(f"[SCHEDULER] Önceki döngü sürüyor, {', '.join(intervals)} kapanışı atlandı")
+            return
+
+        self.runs += 1
+        self._worker = threading.Thread(target=self._run_job, args=(intervals,),
+                                        name="scheduler-cycle", daemon=True)
+        self._worker.start()
+
+    def run(self, run_immediately: bool = False):
+        """Durdurulana kadar mum kapanışlarında işleri çalıştır"""
+        self._install_signal_handlers()
+
+        next_runs = {interval: next_candle_close(interval) + self.close_delay for interval in self.jobs}
+        print(f"[SCHEDULER] Daemon başladı: {', '.join(self.jobs)}")
+
+        if run_immediately:
+            self._dispatch(list(self.jobs))
+
+        while not self._stop.is_set():
+            wake_at = min(next_runs.values())
+            wait = wake_at - time.time()
+            if wait > 0:
+                # Sinyallere hızlı tepki için kısa parçalarla bekle
+                self._stop.wait(min(wait, 1.0))
+                continue
+
+            now = time.time()
+            due = [interval for interval, at in next_runs.items() if at <= now]
+            for interval in due:
+                next_runs[interval] = next_candle_close(interval, now) + self.close_delay
+
+            print(f"[SCHEDULER] Mum kapanışı {datetime.now().strftime('%H:%M:%S')}: {', '.join(due)}")
+            self._dispatch(due)
+
+        self.shutdown()
+
+    def shutdown(self):
+        """Çalışan döngüyü bekle ve kuyruktaki yazmaları boşalt"""
+        if self._worker is not None and self._worker.is_alive():
+            print(f"[SCHEDULER] Çalışan döngünün bitmesi bekleniyor...")
+            self._worker.join(self.shutdown_timeout)
+
+        BackgroundWriter.flush_all()
+        print(f"[SCHEDULER] Durduruldu. Çalışan: {self.runs}, Atlanan: {self.skipped}")
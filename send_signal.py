@@ -1,23 +1,142 @@
 import requests
 import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+from agents.background_writer import BackgroundWriter
+import metrics
 
-def send_telegram_message(message: str):
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    chat_id = os.getenv("TELEGRAM_CHAT_ID")
-
-    if not bot_token or not chat_id:
-        print("[TG] BOT_TOKEN veya CHAT_ID eksik! Mesaj gönderilmedi.")
-        return
-
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": message
-    }
-
-    try:
-        response = requests.post(url, json=payload)
-        result = response.json()
-        print(f"[TG] Cevap: {result}")
-    except Exception as e:
-        print(f"[TG] Hata: {e}")
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+class TelegramDispatcher:
+    """
+    Bloklamayan Telegram bildirim kuyruğu.
+
+    - send() hemen döner; mesajlar arka plan thread'inde kalıcı bir HTTP
+      session ile gönderilir.
+    - Aynı sohbete saniyede en fazla bir mesaj gider; 429 cevabında
+      retry_after kadar beklenip tekrar denenir.
+    - coalesce=True ile gönderilen mesajlar (örn. HOLD bildirimleri) kısa bir
+      pencere içinde toplanıp tek bir özet mesaja dönüştürülür. Diğer mesajlar
+      pencereyi beklemez; o ana kadar biriken özet de onlarla birlikte gider.
+    - Kuyrukta kalanlar kapanışta gönderilir.
+    """
+
+    def __init__(self, bot_token: Optional[str] = None, chat_id: Optional[str] = None,
+                 api_url: Optional[str] = None, max_queue: int = 1000,
+                 min_interval: float = 1.0, digest_window: float = 5.0,
+                 timeout: float = 10.0, max_retries: int = 3):
+        self.bot_token = bot_token or os.getenv("TELEGRAM_BOT_TOKEN")
+        self.chat_id = chat_id or os.getenv("TELEGRAM_CHAT_ID")
+        self.api_url = (api_url or os.getenv("TELEGRAM_API_URL") or TELEGRAM_API_URL).rstrip("/")
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        self._last_sent: Dict[str, float] = {}
+        self.sent = 0
+        self.failed = 0
+
+        # Özet penceresi sadece partide birleştirilebilir mesajlar varken beklenir;
+        # işlem, red ve hata bildirimleri (coalesce=False) partiyi hemen gönderir
+        self.writer = BackgroundWriter("telegram", self._send_batch, max_queue=max_queue,
+                                       batch_size=50, linger=digest_window,
+                                       urgent=lambda item: not item[1])
+
+    def send(self, message: str, coalesce: bool = False) -> bool:
+        """Mesajı kuyruğa ekle (bloklamaz)"""
+        if not self.bot_token or not self.chat_id:
+            print("[TG] BOT_TOKEN veya CHAT_ID eksik! Mesaj gönderilmedi.")
+            return False
+
+        if not self.writer.submit((message, coalesce)):
+            print("[TG] Bildirim kuyruğu dolu, mesaj düşürüldü")
+            return False
+        return True
+
+    def _send_batch(self, batch: List[Tuple[str, bool]]):
+        """Partideki mesajları sırayla gönder; birleştirilebilenleri tek özet yap"""
+        digest = [message for message, coalesce in batch if coalesce]
+        digest_sent = False
+
+        for message, coalesce in batch:
+            if not coalesce:
+                self._post(message)
+            elif not digest_sent:
+                digest_sent = True
+                if len(digest) == 1:
+                    self._post(digest[0])
+                else:
+                    self._post(f"📋 Özet ({len(digest)} bildirim)\n\n" + "\n\n".join(digest))
+
+    def _wait_rate_limit(self):
+        last = self._last_sent.get(self.chat_id)
+        if last is not None:
+            wait = self.min_interval - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+
+    def _post(self, message: str) -> bool:
+        url = f"{self.api_url}/bot{self.bot_token}/sendMessage"
+        payload = {
+            "chat_id": self.chat_id,
+            "text": message[:4096]  # Telegram mesaj sınırı
+        }
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                metrics.count("telegram.retries")
+            self._wait_rate_limit()
+            try:
+                metrics.count("telegram.requests")
+                with metrics.span("telegram.send"):
+                    response = self.session.post(url, json=payload, timeout=self.timeout)
+                self._last_sent[self.chat_id] = time.monotonic()
+
+                if response.status_code == 429:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                    print(f"[TG] Rate limit, {retry_after}s sonra tekrar denenecek")
+                    time.sleep(retry_after)
+                    continue
+
+                result = response.json()
+                if not result.get("ok"):
+                    print(f"[TG] Cevap: {result}")
+                    self.failed += 1
+                    return False
+
+                self.sent += 1
+                return True
+
+            except Exception as e:
+                print(f"[TG] Hata: {e}")
+                time.sleep(min(2 ** attempt, 10))
+
+        self.failed += 1
+        return False
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Kuyruktaki tüm mesajlar gönderilene kadar bekle"""
+        return self.writer.flush(timeout)
+
+_dispatcher: Optional[TelegramDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher() -> TelegramDispatcher:
+    """Paylaşılan dispatcher (env değişkenleri ilk kullanımda okunur)"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = TelegramDispatcher()
+    return _dispatcher
+
+def send_telegram_message(message: str, coalesce: bool = False):
+    """Mesajı arka planda gönderilmek üzere kuyruğa ekle ve hemen dön"""
+    return get_dispatcher().send(message, coalesce=coalesce)
+
+def flush_telegram_messages(timeout: float = 30.0) -> bool:
+    if _dispatcher is None:
+        return True
+    return _dispatcher.flush(timeout)
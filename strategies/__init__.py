@@ -0,0 +1,66 @@
+# strategies/__init__.py
+
+import numpy as np
+from typing import Callable, Dict, Optional
+import indicators
+
+BUY, HOLD, SELL = 1, 0, -1
+
+def rsi_signals(close: np.ndarray, rsi_period: int = 14, overbought: float = 70,
+                oversold: float = 30) -> np.ndarray:
+    """Her bar için RSI sinyali (rsi_signal_from_value ile aynı kurallar)"""
+    rsi = indicators.rsi(close, rsi_period)
+    return np.where(rsi > overbought, SELL, np.where(rsi < oversold, BUY, HOLD)).astype(np.int8)
+
+def sma_crossover_signals(close: np.ndarray, short_period: int = 10,
+                          long_period: int = 50) -> np.ndarray:
+    """Her bar için SMA kesişim sinyali (sma_crossover_signal_from_values ile aynı kurallar)"""
+    short = indicators.sma(close, short_period)
+    long = indicators.sma(close, long_period)
+
+    signals = np.zeros(close.shape, dtype=np.int8)
+    prev_short, prev_long = short[..., :-1], long[..., :-1]
+    curr_short, curr_long = short[..., 1:], long[..., 1:]
+    # NaN karşılaştırmaları False döner, yetersiz veri "hold" kalır
+    signals[..., 1:][(prev_short < prev_long) & (curr_short > curr_long)] = BUY
+    signals[..., 1:][(prev_short > prev_long) & (curr_short < curr_long)] = SELL
+    return signals
+
+# Strateji adı -> kapanış dizisinden bar bazlı sinyal dizisi (+1 al, -1 sat, 0 bekle)
+SIGNAL_FUNCTIONS: Dict[str, Callable[..., np.ndarray]] = {
+    "RSI": rsi_signals,
+    "SMA_Crossover": sma_crossover_signals
+}
+
+def strategy_type(name: str) -> Optional[str]:
+    """'RSI_rsi_period14_...' gibi varyant adından strateji tipi"""
+    for key in SIGNAL_FUNCTIONS:
+        if name == key or name.startswith(f"{key}_"):
+            return key
+    return None
+
+def signal_series(name: str, close, **params) -> np.ndarray:
+    """Stratejinin tüm barlar için sinyal dizisi"""
+    kind = strategy_type(name)
+    if kind is None:
+        raise ValueError(f"Bilinmeyen strateji: {name}")
+    return SIGNAL_FUNCTIONS[kind](np.asarray(close, dtype=float), **params)
+
+def run_strategy(name: str, ohlcv=None, symbol: str = "BTC/USDT", interval: str = "1h",
+                 limit: int = 500, **params):
+    """
+    Stratejiyi veri üzerinde çalıştır; OHLCV sütunları + 'signal' içeren DataFrame döner.
+    ohlcv verilmezse Binance'ten (cache'li) çekilir.
+    """
+    import pandas as pd
+
+    if ohlcv is None:
+        from data.fetch_binance import fetch_binance_ohlcv_cached
+        ohlcv = fetch_binance_ohlcv_cached(symbol, interval, limit)
+
+    df = pd.DataFrame(ohlcv)
+    if df.empty:
+        return df
+
+    df["signal"] = signal_series(name, df["close"].to_numpy(), **params)
+    return df
@@ -0,0 +1,162 @@
+# strategies/ml_strategy.py
+
+import os
+import pickle
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ml_features import FEATURE_NAMES, compute_features, get_feature_pipeline, ohlcv_arrays
+
+MODEL_PATH = os.getenv("ML_MODEL_PATH", "state/ml_model.pkl")
+
+SIGNAL_NAMES = {-1: "sell", 0: "hold", 1: "buy"}
+
+def make_labels(close: np.ndarray, horizon: int = 6, threshold: float = 0.005) -> np.ndarray:
+    """
+    `horizon` bar sonraki getiri threshold'u aşıyorsa 1 (al), -threshold'un
+    altındaysa -1 (sat), arada 0; son `horizon` bar için etiket yok (NaN).
+    """
+    labels = np.full(len(close), np.nan)
+    if len(close) > horizon:
+        forward = close[horizon:] / close[:-horizon] - 1
+        labels[:-horizon] = np.where(forward > threshold, 1, np.where(forward < -threshold, -1, 0))
+    return labels
+
+class MLSignalModel:
+    """
+    ml_features özelliklerinden al/sat/bekle sınıflandırıcısı. Güven, seçilen
+    sınıfın olasılığıdır (diğer stratejilerle aynı 0-1 ölçeği, 0.6 eşiği).
+    Eğitim sonrası MODEL_PATH'e pickle olarak yazılır.
+    """
+
+    def __init__(self, horizon: int = 6, threshold: float = 0.005):
+        self.horizon = horizon
+        self.threshold = threshold
+        self.model = None
+        self.feature_names = FEATURE_NAMES
+        self.trained_on: Dict[str, Any] = {}
+
+    def dataset(self, ohlcv_by_symbol: Dict[str, List[Dict]]):
+        """Sembollerin geçmişlerinden (X, y); ısınma ve etiketsiz satırlar atılır"""
+        xs, ys = [], []
+        for ohlcv in ohlcv_by_symbol.values():
+            _, high, low, close, volume = ohlcv_arrays(ohlcv)
+            features = compute_features(high, low, close, volume)
+            labels = make_labels(close, self.horizon, self.threshold)
+            valid = ~np.isnan(features).any(axis=1) & ~np.isnan(labels)
+            xs.append(features[valid])
+            ys.append(labels[valid].astype(np.int8))
+        if not xs:
+            return np.empty((0, len(FEATURE_NAMES))), np.empty(0, dtype=np.int8)
+        return np.vstack(xs), np.concatenate(ys)
+
+    def fit(self, ohlcv_by_symbol: Dict[str, List[Dict]], holdout: float = 0.2) -> Dict[str, Any]:
+        """
+        Her sembolün son `holdout` oranlık kısmı test için ayrılır (zaman sırası
+        korunur); model sonra tüm veriyle yeniden eğitilir.
+        """
+        from sklearn.ensemble import HistGradientBoostingClassifier
+
+        train, test = {}, {}
+        for symbol, ohlcv in ohlcv_by_symbol.items():
+            split = int(len(ohlcv) * (1 - holdout))
+            train[symbol], test[symbol] = ohlcv[:split], ohlcv[split:]
+
+        X_train, y_train = self.dataset(train)
+        X_test, y_test = self.dataset(test)
+        if len(X_train) < 100 or len(np.unique(y_train)) < 2:
+            raise ValueError(f"Eğitim için yetersiz veri: {len(X_train)} satır")
+
+        def classifier():
+            return HistGradientBoostingClassifier(max_iter=200, learning_rate=0.05,
+                                                  l2_regularization=1.0, random_state=42)
+
+        self.model = classifier().fit(X_train, y_train)
+        accuracy = float((self.model.predict(X_test) == y_test).mean()) if len(X_test) else float("nan")
+
+        X, y = self.dataset(ohlcv_by_symbol)
+        self.model = classifier().fit(X, y)
+        self.trained_on = {
+            "symbols": list(ohlcv_by_symbol),
+            "rows": int(len(X)),
+            "holdout_accuracy": accuracy,
+            "class_share": {SIGNAL_NAMES[c]: float((y == c).mean()) for c in (-1, 0, 1)}
+        }
+        return self.trained_on
+
+    def predict(self, X: np.ndarray):
+        """Tüm satırlar için tek predict_proba çağrısı: (sinyaller, güvenler, olasılıklar)"""
+        proba = self.model.predict_proba(X)
+        best = proba.argmax(axis=1)
+        return self.model.classes_[best], proba[np.arange(len(X)), best], proba
+
+    def save(self, path: str = MODEL_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "MLSignalModel":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+_ml_model: Optional[MLSignalModel] = None
+_ml_model_mtime: Optional[float] = None
+_ml_lock = threading.Lock()
+
+def get_ml_model() -> Optional[MLSignalModel]:
+    """Eğitilmiş model (dosya değişince yeniden yüklenir); yoksa None"""
+    global _ml_model, _ml_model_mtime
+    try:
+        mtime = os.path.getmtime(MODEL_PATH)
+    except OSError:
+        return None
+
+    with _ml_lock:
+        if _ml_model is None or mtime != _ml_model_mtime:
+            try:
+                _ml_model, _ml_model_mtime = MLSignalModel.load(MODEL_PATH), mtime
+            except (OSError, pickle.UnpicklingError, EOFError, ImportError) as e:
+                print(f"[ML ERROR] Model yüklenemedi: {e}")
+                return None
+        return _ml_model
+
+def compute_ml_signals(ohlcv_by_symbol: Dict[str, List[Dict]], interval: str = "1h") -> Dict[str, Dict[str, Any]]:
+    """
+    Sembollerin özellik akışlarını yeni barlarla günceller ve hepsinin son
+    satırını tek predict çağrısıyla değerlendirir. Model yoksa boş sözlük.
+    """
+    model = get_ml_model()
+    if model is None:
+        return {}
+
+    pipeline = get_feature_pipeline()
+    for symbol, ohlcv in ohlcv_by_symbol.items():
+        pipeline.update(symbol, ohlcv, interval)
+
+    symbols, X = pipeline.latest(list(ohlcv_by_symbol), interval)
+    ready = ~np.isnan(X).any(axis=1)
+    if not ready.any():
+        return {}
+
+    symbols = [s for s, ok in zip(symbols, ready) if ok]
+    signals, confidence, proba = model.predict(X[ready])
+    classes = list(model.model.classes_)
+    p_buy = proba[:, classes.index(1)] if 1 in classes else np.zeros(len(symbols))
+    p_sell = proba[:, classes.index(-1)] if -1 in classes else np.zeros(len(symbols))
+
+    return {
+        symbol: {
+            "signal": SIGNAL_NAMES[int(signals[i])],
+            "confidence": float(confidence[i]),
+            "value": float(p_buy[i] - p_sell[i]),  # Yön skoru: p(al) - p(sat)
+            "notes": f"ML: p(al)={p_buy[i]:.2f} p(sat)={p_sell[i]:.2f} (ufuk: {model.horizon} bar)"
+        }
+        for i, symbol in enumerate(symbols)
+    }
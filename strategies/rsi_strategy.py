@@ -1,17 +1,21 @@
-import pandas as pd
-import pandas_ta as ta
+from feature_cache import feature_cache, compute_feature, closes_from_ohlcv
 
-def compute_rsi_signal(ohlcv, rsi_period=14):
-    df = pd.DataFrame(ohlcv)
-    if not {"close"}.issubset(df.columns):
-        df.columns = ["timestamp", "open", "high", "low", "close", "volume"]
-
-    df["RSI"] = ta.rsi(df["close"], length=rsi_period)
-    last_rsi = df["RSI"].iloc[-1]
+def rsi_signal_from_value(rsi_value, overbought=70, oversold=30):
+    if rsi_value > overbought:
+        return "sell", rsi_value
+    elif rsi_value < oversold:
+        return "buy", rsi_value
+    else:
+        return "hold", rsi_value
 
-    if last_rsi > 70:
-        return "sell", last_rsi
-    elif last_rsi < 30:
-        return "buy", last_rsi
+def compute_rsi_signal(ohlcv, rsi_period=14, cache_key=None):
+    """
+    cache_key=(symbol, interval) verilirse RSI serisi paylaşılan feature cache'ten
+    alınır; aynı periyodu kullanan tüm varyantlar bu bar için tek hesaplama yapar.
+    """
+    if cache_key:
+        rsi = feature_cache.get(*cache_key, "rsi", ohlcv, period=rsi_period)
     else:
-        return "hold", last_rsi
+        rsi = compute_feature("rsi", closes_from_ohlcv(ohlcv), period=rsi_period)
+
+    return rsi_signal_from_value(rsi[-1])
@@ -1,30 +1,11 @@
 # strategies/sma_crossover.py
 
-import pandas as pd
+import numpy as np
+from feature_cache import feature_cache, compute_feature, closes_from_ohlcv
 
-def compute_sma_crossover_signal(ohlcv, short_period=10, long_period=50):
-    """
-    SMA Crossover stratejisi.
-    short_period: kısa dönem SMA periyodu
-    long_period: uzun dönem SMA periyodu
-    """
-    df = pd.DataFrame(ohlcv)
-
-    if not {"close"}.issubset(df.columns):
-        df.columns = ["timestamp", "open", "high", "low", "close", "volume"]
-
-    df["SMA_short"] = df["close"].rolling(window=short_period).mean()
-    df["SMA_long"] = df["close"].rolling(window=long_period).mean()
-
-    # Son iki satırı al (kesişim kontrolü için)
-    last_two = df.tail(2)
-
-    prev_short = last_two["SMA_short"].iloc[0]
-    prev_long = last_two["SMA_long"].iloc[0]
-    curr_short = last_two["SMA_short"].iloc[1]
-    curr_long = last_two["SMA_long"].iloc[1]
-
-    if pd.isna(prev_short) or pd.isna(prev_long) or pd.isna(curr_short) or pd.isna(curr_long):
+def sma_crossover_signal_from_values(prev_short, prev_long, curr_short, curr_long):
+    """Son iki bardaki SMA değerlerinden kesişim sinyali"""
+    if np.isnan(prev_short) or np.isnan(prev_long) or np.isnan(curr_short) or np.isnan(curr_long):
         return "hold", None  # Veriler yetersiz
 
     # Al sinyali: kısa SMA uzun SMA'yı aşağıdan yukarı keserse
@@ -37,3 +18,24 @@ def compute_sma_crossover_signal(ohlcv, short_period=10, long_period=50):
 
     else:
         return "hold", curr_short
+
+def compute_sma_crossover_signal(ohlcv, short_period=10, long_period=50, cache_key=None):
+    """
+    SMA Crossover stratejisi.
+    short_period: kısa dönem SMA periyodu
+    long_period: uzun dönem SMA periyodu
+    cache_key: (symbol, interval) verilirse SMA serileri paylaşılan feature cache'ten alınır
+    """
+    if len(ohlcv) < 2:
+        return "hold", None
+
+    if cache_key:
+        sma_short = feature_cache.get(*cache_key, "sma", ohlcv, period=short_period)
+        sma_long = feature_cache.get(*cache_key, "sma", ohlcv, period=long_period)
+    else:
+        close = closes_from_ohlcv(ohlcv)
+        sma_short = compute_feature("sma", close, period=short_period)
+        sma_long = compute_feature("sma", close, period=long_period)
+
+    # Son iki değeri al (kesişim kontrolü için)
+    return sma_crossover_signal_from_values(sma_short[-2], sma_long[-2], sma_short[-1], sma_long[-1])
@@ -1,8 +1,7 @@
 # strategy_generator.py
 
 from itertools import product
-from db import get_strategy_by_name, create_strategy
-import json
+from db import get_strategy_names, upsert_strategies
 
 strategies_config = [
     {
@@ -31,28 +30,56 @@ def generate_variants(strategy):
     for combo in product(*values):
         yield dict(zip(keys, combo))
 
-def store_strategies():
-    total_added = 0
+def variant_name(strategy_name, params):
+    """Strateji ismini parametrelerle birlikte unique yapıyoruz"""
+    return f"{strategy_name}_" + "_".join(f"{k}{v}" for k, v in params.items())
+
+def local_strategy_variants():
+    """Parametre gridinden, DB kaydı olmayan (id=None) strateji varyantları"""
+    variants = []
     for strat in strategies_config:
         for params in generate_variants(strat):
-            # Strateji ismini parametrelerle birlikte unique yapıyoruz
-            variant_name = f"{strat['name']}_" + "_".join(f"{k}{v}" for k, v in params.items())
+            variants.append({"id": None, "name": variant_name(strat["name"], params), "parameters": params})
+    return variants
+
+def load_strategy_variants():
+    """Kayıtlı strateji varyantları; DB'ye ulaşılamazsa parametre gridinden üret"""
+    try:
+        from db import get_strategies
+        strategies = get_strategies()
+        if strategies:
+            return strategies
+    except Exception as e:
+        print(f"[STRATEGY] Stratejiler DB'den alınamadı ({e}), yerel grid kullanılıyor")
+    return local_strategy_variants()
+
+def store_strategies(chunk_size=500):
+    """
+    Gridin eksik varyantlarını ekler: mevcut isimler tek sorguda alınır, eksikler
+    yerelde bulunur ve chunk'lar halinde toplu upsert edilir (varyant başına istek yok).
+    """
+    existing = get_strategy_names()
+
+    rows = []
+    skipped = 0
+    for strat in strategies_config:
+        for params in generate_variants(strat):
+            name = variant_name(strat["name"], params)
 
             # Aynı strateji zaten varsa eklemiyoruz
-            if get_strategy_by_name(variant_name):
-                print(f"[SKIP] {variant_name} zaten var.")
+            if name in existing:
+                skipped += 1
                 continue
+            existing.add(name)
+            rows.append({"name": name, "description": strat["description"], "parameters": params})
+
+    if skipped:
+        print(f"[SKIP] {skipped} strateji zaten var.")
 
-            # Supabase'e ekle
-            create_strategy(
-                name=variant_name,
-                description=strat["description"],
-                parameters=params
-            )
-            print(f"[ADD] {variant_name} eklendi.")
-            total_added += 1
+    # Supabase'e chunk'lar halinde ekle
+    upsert_strategies(rows, chunk_size)
 
-    print(f"[INFO] Toplam {total_added} yeni strateji eklendi.")
+    print(f"[INFO] Toplam {len(rows)} yeni strateji eklendi.")
 
 if __name__ == "__main__":
     store_strategies()
@@ -0,0 +1,6 @@
+# tests/conftest.py - Kök dizindeki modüller (indicators, send_signal, ...) import edilebilsin
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
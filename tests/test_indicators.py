@@ -0,0 +1,93 @@
+# tests/test_indicators.py - indicators.py ile pandas_ta karşılaştırması
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+ta = pytest.importorskip("pandas_ta")
+
+N_BARS = 1000
+RTOL = 1e-10  # Kümülatif toplam kullanan SMA/Bollinger/VWAP için yuvarlama payı
+
+@pytest.fixture(scope="module")
+def ohlcv():
+    """Seed'li rastgele yürüyüş; saatlik barlar"""
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, N_BARS)))
+    high = close * (1 + rng.uniform(0, 0.01, N_BARS))
+    low = close * (1 - rng.uniform(0, 0.01, N_BARS))
+    volume = rng.uniform(1, 100, N_BARS)
+    timestamps = 1_600_000_000_000 + np.arange(N_BARS, dtype=np.int64) * 3_600_000
+    index = pd.to_datetime(timestamps, unit="ms")
+    series = {name: pd.Series(values, index=index)
+              for name, values in (("high", high), ("low", low), ("close", close), ("volume", volume))}
+    return {"high": high, "low": low, "close": close, "volume": volume,
+            "timestamps": timestamps, "series": series}
+
+def assert_matches(ours, reference, rtol=RTOL, start=0):
+    """NaN konumları ve start'tan sonraki değerler aynı olmalı"""
+    reference = np.asarray(reference, dtype=float)
+    np.testing.assert_array_equal(np.isnan(ours[start:]), np.isnan(reference[start:]))
+    np.testing.assert_allclose(ours[start:], reference[start:], rtol=rtol, atol=0, equal_nan=True)
+
+@pytest.mark.parametrize("period", [5, 20, 50])
+def test_sma(ohlcv, period):
+    assert_matches(indicators.sma(ohlcv["close"], period), ta.sma(ohlcv["series"]["close"], period))
+
+@pytest.mark.parametrize("period", [5, 20, 50])
+def test_ema(ohlcv, period):
+    assert_matches(indicators.ema(ohlcv["close"], period), ta.ema(ohlcv["series"]["close"], period))
+
+@pytest.mark.parametrize("period", [7, 14, 21])
+def test_rsi_after_warmup(ohlcv, period):
+    # Isınma barlarında NaN bırakılır; pandas_ta orada değer üretebilir
+    ours = indicators.rsi(ohlcv["close"], period)
+    assert np.isnan(ours[:period]).all()
+    assert_matches(ours, ta.rsi(ohlcv["series"]["close"], period), start=period)
+
+def test_macd(ohlcv):
+    line, signal, histogram = indicators.macd(ohlcv["close"], 12, 26, 9)
+    reference = ta.macd(ohlcv["series"]["close"], 12, 26, 9)
+    assert_matches(line, reference["MACD_12_26_9"])
+    assert_matches(histogram, reference["MACDh_12_26_9"])
+    assert_matches(signal, reference["MACDs_12_26_9"])
+
+def test_bollinger_bands(ohlcv):
+    lower, mid, upper = indicators.bollinger_bands(ohlcv["close"], 20, 2.0)
+    reference = ta.bbands(ohlcv["series"]["close"], 20, 2.0)
+    assert_matches(lower, reference.iloc[:, 0], rtol=1e-9)
+    assert_matches(mid, reference.iloc[:, 1], rtol=1e-9)
+    assert_matches(upper, reference.iloc[:, 2], rtol=1e-9)
+
+def test_atr(ohlcv):
+    s = ohlcv["series"]
+    assert_matches(indicators.atr(ohlcv["high"], ohlcv["low"], ohlcv["close"], 14),
+                   ta.atr(s["high"], s["low"], s["close"], 14))
+
+def test_vwap_daily_anchor(ohlcv):
+    s = ohlcv["series"]
+    ours = indicators.vwap(ohlcv["high"], ohlcv["low"], ohlcv["close"], ohlcv["volume"], ohlcv["timestamps"])
+    assert_matches(ours, ta.vwap(s["high"], s["low"], s["close"], s["volume"], anchor="D"), rtol=1e-9)
+
+def test_rsi_multi_period_matrix(ohlcv):
+    # 3 sembol x N bar matrisi, 3 periyot -> (3 periyot, 3 sembol, N bar)
+    rng = np.random.default_rng(11)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (3, N_BARS)), axis=1))
+    periods = [7, 14, 21]
+    ours = indicators.rsi(close, periods)
+    assert ours.shape == (len(periods), 3, N_BARS)
+
+    for p_index, period in enumerate(periods):
+        for row in range(3):
+            np.testing.assert_array_equal(ours[p_index, row], indicators.rsi(close[row], period))
+            assert_matches(ours[p_index, row], ta.rsi(pd.Series(close[row]), period), start=period)
+
+def test_sma_multi_period_matrix(ohlcv):
+    close = np.vstack([ohlcv["close"], ohlcv["close"][::-1]])
+    ours = indicators.sma(close, [10, 50])
+    assert ours.shape == (2, 2, N_BARS)
+    for p_index, period in enumerate([10, 50]):
+        for row in range(2):
+            assert_matches(ours[p_index, row], ta.sma(pd.Series(close[row]), period))
@@ -0,0 +1,116 @@
+# tests/test_send_signal.py - TelegramDispatcher, yerel sahte Bot API sunucusuna karşı
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from send_signal import TelegramDispatcher
+
+class FakeTelegram(BaseHTTPRequestHandler):
+    """sendMessage isteklerini kaydeder; rate_limited sayısı kadar önce 429 döner"""
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            if server.rate_limited > 0:
+                server.rate_limited -= 1
+                status, body = 429, {"ok": False, "parameters": {"retry_after": 0}}
+            else:
+                server.messages.append((time.monotonic(), self.path, payload))
+                status, body = 200, {"ok": True, "result": {}}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def fake_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTelegram)
+    server.lock = threading.Lock()
+    server.messages = []
+    server.rate_limited = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def make_dispatcher(fake_api, monkeypatch):
+    monkeypatch.setenv("TELEGRAM_API_URL", f"http://127.0.0.1:{fake_api.server_port}")
+    created = []
+
+    def make(**kwargs):
+        kwargs.setdefault("min_interval", 0.0)
+        dispatcher = TelegramDispatcher(bot_token="TOKEN", chat_id="42", **kwargs)
+        created.append(dispatcher)
+        return dispatcher
+
+    yield make
+    for dispatcher in created:
+        dispatcher.writer.close(timeout=5)
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_env_override_and_payload(fake_api, make_dispatcher):
+    dispatcher = make_dispatcher()
+    assert dispatcher.send("merhaba")
+    assert dispatcher.flush(5)
+
+    [(_, path, payload)] = fake_api.messages
+    assert path == "/botTOKEN/sendMessage"
+    assert payload == {"chat_id": "42", "text": "merhaba"}
+    assert dispatcher.sent == 1
+
+def test_non_coalesced_message_skips_digest_window(fake_api, make_dispatcher):
+    dispatcher = make_dispatcher(digest_window=5.0)
+    start = time.monotonic()
+    dispatcher.send("✅ BUY BTC/USDT")
+
+    assert wait_for(lambda: len(fake_api.messages) == 1, timeout=1.0)
+    assert fake_api.messages[0][0] - start < 1.0
+
+def test_hold_messages_are_coalesced_into_digest(fake_api, make_dispatcher):
+    dispatcher = make_dispatcher(digest_window=0.3)
+    for symbol in ("BTC", "ETH", "BNB"):
+        dispatcher.send(f"HOLD {symbol}", coalesce=True)
+
+    assert wait_for(lambda: len(fake_api.messages) == 1)
+    time.sleep(0.1)
+    [(_, _, payload)] = fake_api.messages
+    assert payload["text"].startswith("📋 Özet (3 bildirim)")
+    assert all(f"HOLD {symbol}" in payload["text"] for symbol in ("BTC", "ETH", "BNB"))
+
+def test_urgent_message_ends_pending_digest(fake_api, make_dispatcher):
+    dispatcher = make_dispatcher(digest_window=5.0)
+    dispatcher.send("HOLD BTC", coalesce=True)
+    time.sleep(0.1)
+    start = time.monotonic()
+    dispatcher.send("❌ Emir reddedildi")
+
+    assert wait_for(lambda: len(fake_api.messages) == 2, timeout=1.0)
+    assert fake_api.messages[-1][0] - start < 1.0
+    texts = [payload["text"] for _, _, payload in fake_api.messages]
+    assert texts == ["HOLD BTC", "❌ Emir reddedildi"]
+
+def test_rate_limit_is_retried(fake_api, make_dispatcher):
+    fake_api.rate_limited = 2
+    dispatcher = make_dispatcher()
+    dispatcher.send("tekrar")
+    assert dispatcher.flush(5)
+
+    assert [payload["text"] for _, _, payload in fake_api.messages] == ["tekrar"]
+    assert dispatcher.sent == 1 and dispatcher.failed == 0
@@ -0,0 +1,128 @@
+# trade_log.py - Sabit genişlikli alanlarla kompakt işlem kaydı
+
+import base64
+import zlib
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+LONG, SHORT = 1, -1
+SIDES = {"long": LONG, "short": SHORT}
+
+# Her işlem 73 byte; zamanlar epoch milisaniye, indikatör değeri yoksa NaN
+TRADE_DTYPE = np.dtype([
+    ("entry_idx", "<i4"),
+    ("exit_idx", "<i4"),
+    ("entry_time", "<i8"),
+    ("exit_time", "<i8"),
+    ("entry_price", "<f8"),
+    ("exit_price", "<f8"),
+    ("size", "<f8"),
+    ("side", "<i1"),
+    ("pnl", "<f8"),
+    ("return_pct", "<f8"),
+    ("indicator_value", "<f8"),
+])
+
+MAGIC = b"TLG1"
+
+class TradeLog:
+    """
+    İşlemleri NumPy structured array'de tutar. Kapasite doldukça ikiye katlanır,
+    bu yüzden append amortize O(1)'dir; `array` dolu kısmın kopyasız görünümüdür.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._data = np.zeros(max(capacity, 1), dtype=TRADE_DTYPE)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.array[field]
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._data[:self._size]
+
+    def append(self, entry_idx: int, exit_idx: int, entry_time: int, exit_time: int,
+               entry_price: float, exit_price: float, size: float, side: int, pnl: float,
+               return_pct: float, indicator_value: Optional[float] = None):
+        if self._size == len(self._data):
+            # Boş bir kayıttan geri yüklenen log'un kapasitesi 0 olabilir
+            grown = np.zeros(max(1, len(self._data) * 2), dtype=TRADE_DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+        self._data[self._size] = (
+            entry_idx, exit_idx, entry_time, exit_time, entry_price, exit_price, size,
+            side, pnl, return_pct, np.nan if indicator_value is None else indicator_value
+        )
+        self._size += 1
+
+    @property
+    def hold_time_hours(self) -> np.ndarray:
+        return (self["exit_time"] - self["entry_time"]) / 3_600_000
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "TradeLog":
+        log = cls.__new__(cls)
+        log._data = np.ascontiguousarray(array, dtype=TRADE_DTYPE)
+        log._size = len(log._data)
+        return log
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "TradeLog":
+        """Eski dict tabanlı kayıtlardan ('side': 'long'/'short', zamanlar epoch ms)"""
+        log = cls()
+        for r in records:
+            log.append(r.get("entry_idx", -1), r.get("exit_idx", -1), r["entry_time"],
+                       r["exit_time"], r["entry_price"], r["exit_price"],
+                       r.get("size", r.get("position_size")), SIDES.get(r["side"], r["side"]),
+                       r["pnl"], r["return_pct"], r.get("indicator_value"))
+        return log
+
+    def to_dataframe(self):
+        """Sütunlar structured array alanlarının görünümleridir (veri kopyalanmaz)"""
+        import pandas as pd
+
+        array = self.array
+        return pd.DataFrame({name: array[name] for name in TRADE_DTYPE.names}, copy=False)
+
+    def to_bytes(self, level: int = 6) -> bytes:
+        """
+        Byte-shuffle + zlib: kayıtlar byte konumuna göre yeniden dizilir, böylece
+        benzer byte'lar (fiyatların üst byte'ları, artan zaman damgaları) yan yana
+        gelir ve çok daha iyi sıkışır.
+        """
+        raw = self.array.view(np.uint8).reshape(self._size, TRADE_DTYPE.itemsize)
+        shuffled = np.ascontiguousarray(raw.T).tobytes()
+        return MAGIC + self._size.to_bytes(4, "little") + zlib.compress(shuffled, level)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "TradeLog":
+        if payload[:4] != MAGIC:
+            raise ValueError("Geçersiz trade log verisi")
+        size = int.from_bytes(payload[4:8], "little")
+        shuffled = np.frombuffer(zlib.decompress(payload[8:]), dtype=np.uint8)
+        raw = np.ascontiguousarray(shuffled.reshape(TRADE_DTYPE.itemsize, size).T)
+        return cls.from_array(raw.view(TRADE_DTYPE).reshape(size))
+
+    def to_base64(self) -> str:
+        """JSON/DB alanlarında saklamak için"""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, text: str) -> "TradeLog":
+        return cls.from_bytes(base64.b64decode(text))
+
+    def __getstate__(self):
+        return self.to_bytes()
+
+    def __setstate__(self, state):
+        restored = TradeLog.from_bytes(state)
+        self._data, self._size = restored._data, restored._size
@@ -0,0 +1,254 @@
+# var_engine.py
+
+import numpy as np
+from statistics import NormalDist
+from typing import Dict, List, Any, Optional
+
+class VaREngine:
+    """
+    Varlık bazlı getirileri kayan bir matris (window x varlık) içinde tutar ve
+    portföy VaR/CVaR değerlerini (historical + parametric) NumPy ile hesaplar.
+
+    Matris yeni barlar geldikçe artımlı güncellenir: eski satır ring buffer'dan
+    düşer, ortalama/kovaryans için tutulan toplamlar sadece değişen satır kadar
+    güncellenir. Böylece her risk kararında geçmişi yeniden hesaplamaya gerek kalmaz.
+    """
+
+    def __init__(self, window=500, confidence=0.95, min_observations=30):
+        self.window = window
+        self.confidence = confidence
+        self.min_observations = min_observations
+        self.z_score = NormalDist().inv_cdf(confidence)
+        self.cvar_factor = NormalDist().pdf(self.z_score) / (1 - confidence)
+
+        self.symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+
+        # Ring buffer: getiri matrisi ve satır zaman damgaları
+        self._returns = np.full((window, 0), np.nan)
+        self._timestamps = np.zeros(window, dtype=np.int64)
+        self._complete = np.zeros(window, dtype=bool)
+        self._row_of_ts: Dict[int, int] = {}
+        self._head = 0
+        self._count = 0
+
+        # Tamamlanmış satırlar için artımlı toplamlar (ortalama / kovaryans)
+        self._sum = np.zeros(0)
+        self._sum_outer = np.zeros((0, 0))
+        self._n_complete = 0
+
+        # Sembol bazlı son kapanış ve zaman damgası
+        self._last_close: Dict[str, float] = {}
+        self._last_ts: Dict[str, int] = {}
+
+    # --- Veri güncelleme ---
+
+    def add_symbol(self, symbol: str):
+        """Yeni bir varlık sütunu ekle"""
+        if symbol in self._index:
+            return
+
+        self._index[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        self._returns = np.hstack([self._returns, np.full((self.window, 1), np.nan)])
+
+        # Yeni sütun boş olduğu için hiçbir satır artık tam değil
+        k = len(self.symbols)
+        self._complete[:] = False
+        self._sum = np.zeros(k)
+        self._sum_outer = np.zeros((k, k))
+        self._n_complete = 0
+
+    def update(self, symbol: str, ohlcv: List[Dict]):
+        """
+        Mum verisinden sadece yeni barları işle.
+        Aynı veri tekrar verilirse (her döngüde 500 mum çekilse bile) sadece
+        son bilinen zaman damgasından sonraki barlar eklenir.
+        """
+        self.add_symbol(symbol)
+
+        last_ts = self._last_ts.get(symbol)
+        last_close = self._last_close.get(symbol)
+
+        for candle in ohlcv:
+            ts = int(candle["timestamp"])
+            close = float(candle["close"])
+
+            if last_ts is not None and ts <= last_ts:
+                continue
+
+            if last_close is not None and last_close > 0:
+                self._set_return(symbol, ts, close / last_close - 1)
+
+            last_ts = ts
+            last_close = close
+
+        if last_ts is not None:
+            self._last_ts[symbol] = last_ts
+            self._last_close[symbol] = last_close
+
+    def on_bar(self, symbol: str, timestamp: int, close: float):
+        """Tek bir kapanan bar için artımlı güncelleme"""
+        self.update(symbol, [{"timestamp": timestamp, "close": close}])
+
+    def _set_return(self, symbol: str, ts: int, value: float):
+        row = self._row_of_ts.get(ts)
+
+        if row is None:
+            newest_ts = self._timestamps[(self._head - 1) % self.window] if self._count else None
+            if newest_ts is not None and ts < newest_ts:
+                if self._count == self.window or ts < self._timestamps[self._oldest_row()]:
+                    return  # Pencereden eski bar, yok say
+            row = self._push_row(ts)
+
+        col = self._index[symbol]
+        self._returns[row, col] = value
+
+        if not self._complete[row] and not np.isnan(self._returns[row]).any():
+            self._complete[row] = True
+            r = self._returns[row]
+            self._sum += r
+            self._sum_outer += np.outer(r, r)
+            self._n_complete += 1
+
+    def _oldest_row(self) -> int:
+        return (self._head - self._count) % self.window
+
+    def _push_row(self, ts: int) -> int:
+        row = self._head
+
+        if self._count == self.window:
+            # En eski satırı düşür
+            if self._complete[row]:
+                r = self._returns[row]
+                self._sum -= r
+                self._sum_outer -= np.outer(r, r)
+                self._n_complete -= 1
+            self._row_of_ts.pop(int(self._timestamps[row]), None)
+        else:
+            self._count += 1
+
+        self._returns[row] = np.nan
+        self._timestamps[row] = ts
+        self._complete[row] = False
+        self._row_of_ts[ts] = row
+        self._head = (self._head + 1) % self.window
+        return row
+
+    # --- Hesaplama ---
+
+    @property
+    def observations(self) -> int:
+        return self._n_complete
+
+    def is_ready(self) -> bool:
+        return self._n_complete >= self.min_observations
+
+    def exposure_vector(self, exposures: Dict[str, float]) -> Optional[np.ndarray]:
+        """Sembol -> dolar pozisyon sözlüğünü vektöre çevir (bilinmeyen sembol varsa None)"""
+        w = np.zeros(len(self.symbols))
+        for symbol, value in exposures.items():
+            if not value:
+                continue
+            col = self._index.get(symbol)
+            if col is None:
+                return None
+            w[col] = value
+        return w
+
+    def _moments(self):
+        """Tamamlanmış satırların ortalama vektörü ve kovaryans matrisi"""
+        n = self._n_complete
+        mean = self._sum / n
+        cov = (self._sum_outer - n * np.outer(mean, mean)) / max(n - 1, 1)
+        return mean, cov
+
+    def _historical(self, losses: np.ndarray) -> Dict[str, float]:
+        n = len(losses)
+        k = min(int(np.ceil(self.confidence * n)) - 1, n - 1)
+        var = np.partition(losses, k)[k]
+        tail = losses[losses >= var]
+        return {"var": max(float(var), 0.0), "cvar": max(float(tail.mean()), 0.0)}
+
+    def _parametric(self, mu: float, variance: float) -> Dict[str, float]:
+        sigma = float(np.sqrt(max(variance, 0.0)))
+        return {
+            "var": max(self.z_score * sigma - mu, 0.0),
+            "cvar": max(self.cvar_factor * sigma - mu, 0.0)
+        }
+
+    def historical_var(self, w: np.ndarray) -> Dict[str, float]:
+        """Historical VaR/CVaR (dolar cinsinden, pozitif = kayıp)"""
+        return self._historical(-(self._returns[self._complete] @ w))
+
+    def parametric_var(self, w: np.ndarray) -> Dict[str, float]:
+        """Normal dağılım varsayımı ile VaR/CVaR (dolar cinsinden)"""
+        mean, cov = self._moments()
+        return self._parametric(float(w @ mean), float(w @ cov @ w))
+
+    def portfolio_var(self, exposures: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """Verilen pozisyonlar için historical ve parametric VaR/CVaR"""
+        if not self.is_ready():
+            return None
+
+        w = self.exposure_vector(exposures)
+        if w is None:
+            return None
+
+        historical = self.historical_var(w)
+        parametric = self.parametric_var(w)
+
+        return {
+            "historical_var": historical["var"],
+            "historical_cvar": historical["cvar"],
+            "parametric_var": parametric["var"],
+            "parametric_cvar": parametric["cvar"],
+            # Karar için en kötümser tahmini kullan
+            "var": max(historical["var"], parametric["var"]),
+            "cvar": max(historical["cvar"], parametric["cvar"]),
+            "confidence": self.confidence,
+            "observations": self._n_complete
+        }
+
+    def max_order_scale(self, base_exposures: Dict[str, float], symbol: str,
+                        order_value: float, var_budget: float, iterations: int = 20) -> float:
+        """
+        Mevcut pozisyonlara emir eklendiğinde VaR bütçesini aşmayan en büyük
+        emir oranını (0-1) ikili arama ile bul.
+        """
+        w = self.exposure_vector(base_exposures)
+        col = self._index.get(symbol)
+        if w is None or col is None:
+            return 1.0
+
+        order = np.zeros(len(self.symbols))
+        order[col] = order_value
+
+        # Getiri matrisi ve momentler bir kez hazırlanır, arama sadece vektör toplar
+        complete_returns = self._returns[self._complete]
+        base_pnl = complete_returns @ w
+        order_pnl = complete_returns @ order
+        mean, cov = self._moments()
+        base_mu, order_mu = float(w @ mean), float(order @ mean)
+        var_ww, var_wo, var_oo = float(w @ cov @ w), float(w @ cov @ order), float(order @ cov @ order)
+
+        def var_at(scale):
+            historical = self._historical(-(base_pnl + scale * order_pnl))
+            parametric = self._parametric(base_mu + scale * order_mu,
+                                          var_ww + 2 * scale * var_wo + scale * scale * var_oo)
+            return max(historical["var"], parametric["var"])
+
+        if var_at(1.0) <= var_budget:
+            return 1.0
+        if var_at(0.0) > var_budget:
+            return 0.0
+
+        low, high = 0.0, 1.0
+        for _ in range(iterations):
+            mid = (low + high) / 2
+            if var_at(mid) <= var_budget:
+                low = mid
+            else:
+                high = mid
+
+        return low